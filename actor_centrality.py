@@ -0,0 +1,269 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import psycopg
+import scipy.sparse as sp
+from db_connections import connect_read, connect_write, record_write
+import collab_graph_store
+import collab_csr
+
+# Importance scores for every actor in the collaboration graph, computed
+# once and stored in `actor_centrality` so the graph views and charts can
+# rank and filter actors without recomputing anything.
+#
+#   weighted_degree  total shared movies with all collaborators
+#   pagerank         power iteration on the weighted adjacency matrix
+#   eigenvector      power iteration on the weighted adjacency matrix
+#   betweenness      Brandes' algorithm from a random sample of sources,
+#                    split across worker processes (hop distance, so
+#                    edge weights are ignored)
+#
+# Edges come from the persisted graph store (collab_graph_store.py), so a
+# run only pays for an incremental refresh plus the matrix work. When the
+# memory-mapped CSR copy (collab_csr.py) is current it is used directly,
+# and the betweenness workers map the same files instead of receiving a
+# pickled copy of the matrix.
+
+PAGERANK_DAMPING = 0.85
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-8
+BETWEENNESS_SAMPLES = int(os.getenv("MOVIES_BETWEENNESS_SAMPLES", "256"))
+WORKERS = int(os.getenv("MOVIES_CENTRALITY_WORKERS", str(os.cpu_count() or 1)))
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS actor_centrality (
+        star_id INT PRIMARY KEY REFERENCES stars(id) ON DELETE CASCADE,
+        weighted_degree INT NOT NULL,
+        pagerank DOUBLE PRECISION NOT NULL,
+        eigenvector DOUBLE PRECISION NOT NULL,
+        betweenness DOUBLE PRECISION NOT NULL,
+        computed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+"""
+
+METRICS = ("weighted_degree", "pagerank", "eigenvector", "betweenness")
+
+
+def build_matrix(edges):
+    # edges: {(star_id, star_id): shared_movies} -> (symmetric CSR, star ids)
+    star_ids = np.array(sorted({s for pair in edges for s in pair}), dtype=np.int64)
+    pairs = np.array(list(edges.keys()), dtype=np.int64).reshape(-1, 2)
+    weights = np.fromiter(edges.values(), dtype=np.float64, count=len(edges))
+
+    rows = np.searchsorted(star_ids, pairs[:, 0])
+    cols = np.searchsorted(star_ids, pairs[:, 1])
+    n = len(star_ids)
+    matrix = sp.coo_matrix(
+        (np.concatenate([weights, weights]), (np.concatenate([rows, cols]), np.concatenate([cols, rows]))),
+        shape=(n, n),
+    ).tocsr()
+    return matrix, star_ids
+
+def pagerank(matrix, damping=PAGERANK_DAMPING):
+    n = matrix.shape[0]
+    out_weight = np.asarray(matrix.sum(axis=1)).ravel()
+    inverse = np.divide(1.0, out_weight, out=np.zeros(n), where=out_weight > 0)
+    transition = sp.diags(inverse) @ matrix   # row-stochastic
+    dangling = out_weight == 0
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(MAX_ITERATIONS):
+        updated = damping * (transition.T @ rank + rank[dangling].sum() / n) + (1 - damping) / n
+        if np.abs(updated - rank).sum() < n * TOLERANCE:
+            return updated
+        rank = updated
+    return rank
+
+def eigenvector(matrix):
+    # Power iteration on A + I: same eigenvectors, but converges on
+    # bipartite-like components where plain A would oscillate
+    n = matrix.shape[0]
+    vector = np.full(n, 1.0 / np.sqrt(n))
+    for _ in range(MAX_ITERATIONS):
+        updated = matrix @ vector + vector
+        norm = np.linalg.norm(updated)
+        if norm == 0:
+            return updated
+        updated /= norm
+        if np.abs(updated - vector).sum() < n * TOLERANCE:
+            return updated
+        vector = updated
+    return vector
+
+_worker_graph = None  # (offsets, neighbors) of the CSR structure
+
+def _init_worker(offsets=None, neighbors=None, csr_path=None):
+    # With csr_path the arrays are the memory-mapped files themselves, so
+    # every worker shares one copy of the graph through the page cache
+    global _worker_graph
+    if csr_path:
+        csr = collab_csr.CollabCSR(csr_path)
+        offsets, neighbors = csr.offsets, csr.neighbors
+    _worker_graph = (offsets, neighbors)
+
+def _neighbours_of(rows):
+    # (neighbour indices, the row each came from) for all of `rows`
+    offsets, neighbors = _worker_graph
+    starts, ends = offsets[rows], offsets[rows + 1]
+    counts = (ends - starts).astype(np.int64)
+    first = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    positions = np.repeat(starts - first, counts) + np.arange(counts.sum())
+    return neighbors[positions], np.repeat(rows, counts)
+
+def _brandes_from(sources):
+    # Level-synchronous BFS + dependency accumulation over the CSR arrays;
+    # each step gathers a level's neighbours and sums with bincount, so it
+    # stays in numpy (hop distance: edge weights are not read)
+    n = len(_worker_graph[0]) - 1
+    total = np.zeros(n)
+
+    for source in sources:
+        distance = np.full(n, -1, dtype=np.int64)
+        sigma = np.zeros(n)
+        distance[source] = 0
+        sigma[source] = 1.0
+        levels = [np.array([source])]
+
+        while True:
+            reached_nodes, owners = _neighbours_of(levels[-1])
+            reached = np.bincount(reached_nodes, weights=sigma[owners], minlength=n)
+            new = (reached > 0) & (distance < 0)
+            if not new.any():
+                break
+            distance[new] = len(levels)
+            sigma[new] = reached[new]
+            levels.append(np.flatnonzero(new))
+
+        delta = np.zeros(n)
+        coefficient = np.zeros(n)
+        for depth in range(len(levels) - 1, 0, -1):
+            children, parents = levels[depth], levels[depth - 1]
+            coefficient[children] = (1.0 + delta[children]) / sigma[children]
+            neighbours, owners = _neighbours_of(parents)
+            sums = np.bincount(owners, weights=coefficient[neighbours], minlength=n)
+            delta[parents] += sigma[parents] * sums[parents]
+            coefficient[children] = 0.0
+        delta[source] = 0.0
+        total += delta
+
+    return total
+
+def approximate_betweenness(matrix, samples=BETWEENNESS_SAMPLES, workers=WORKERS, seed=42, csr_path=None):
+    n = matrix.shape[0]
+    if n < 3:
+        return np.zeros(n)
+
+    matrix = matrix.tocsr()
+    rng = np.random.default_rng(seed)
+    sources = rng.choice(n, size=min(samples, n), replace=False)
+
+    chunks = [chunk for chunk in np.array_split(sources, max(1, workers)) if len(chunk)]
+    if len(chunks) == 1:
+        _init_worker(matrix.indptr, matrix.indices)
+        total = _brandes_from(chunks[0])
+    else:
+        initargs = (None, None, csr_path) if csr_path else (matrix.indptr, matrix.indices)
+        with ProcessPoolExecutor(len(chunks), initializer=_init_worker, initargs=initargs) as pool:
+            total = sum(pool.map(_brandes_from, chunks))
+
+    # Scale the sample up to all sources, count each undirected pair once
+    # and normalise like networkx (by the number of pairs excluding the node)
+    total *= n / len(sources) / 2
+    return total / ((n - 1) * (n - 2) / 2)
+
+def compute_centrality(edges, samples=BETWEENNESS_SAMPLES, workers=WORKERS, csr=None):
+    if csr is not None:
+        matrix, star_ids = csr.to_scipy(), np.asarray(csr.star_ids)
+    else:
+        matrix, star_ids = build_matrix(edges)
+    timings = {}
+
+    started = time.perf_counter()
+    scores = {"weighted_degree": np.asarray(matrix.sum(axis=1)).ravel().astype(np.int64)}
+    timings["weighted_degree"] = time.perf_counter() - started
+
+    for name, compute in (
+        ("pagerank", lambda: pagerank(matrix)),
+        ("eigenvector", lambda: eigenvector(matrix)),
+        ("betweenness", lambda: approximate_betweenness(matrix, samples, workers, csr_path=csr.path if csr is not None else None)),
+    ):
+        started = time.perf_counter()
+        scores[name] = compute()
+        timings[name] = time.perf_counter() - started
+
+    return star_ids, scores, timings
+
+def store_centrality(star_ids, scores):
+    with connect_write() as conn:
+        with conn.cursor() as cur:
+            cur.execute(CREATE_TABLE_SQL)
+            cur.execute("TRUNCATE actor_centrality;")
+            with cur.copy(f"COPY actor_centrality (star_id, {', '.join(METRICS)}) FROM STDIN") as copy:
+                for i, star_id in enumerate(star_ids):
+                    copy.write_row((
+                        int(star_id),
+                        int(scores["weighted_degree"][i]),
+                        float(scores["pagerank"][i]),
+                        float(scores["eigenvector"][i]),
+                        float(scores["betweenness"][i]),
+                    ))
+        conn.commit()
+        record_write(conn)
+
+def fetch_top_actors(metric="pagerank", limit=30):
+    # [(actor_name, score)] best first; raises psycopg.Error if the table
+    # has not been computed yet
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric}")
+
+    with connect_read() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT s.actor_name, c.{metric}
+                FROM actor_centrality c
+                JOIN stars s ON s.id = c.star_id
+                ORDER BY c.{metric} DESC, s.actor_name
+                LIMIT %s;
+            """, (limit,))
+            return cur.fetchall()
+
+def main(samples=None, workers=None, top=10):
+    samples = samples or BETWEENNESS_SAMPLES
+    workers = workers or WORKERS
+    try:
+        store, stats = collab_graph_store.refresh_store()
+    except psycopg.Error as e:
+        print("❌ Graph refresh failed.")
+        print("Error:", e)
+        return
+
+    if not store["edges"]:
+        print("No collaborations to analyse.")
+        return
+
+    csr = collab_csr.load_csr()
+    if csr is not None and csr.meta["watermark"] != store["watermark"]:
+        csr = None
+    star_ids, scores, timings = compute_centrality(store["edges"], samples, workers, csr)
+    print(f"\n📈 Centrality ({'memory-mapped CSR' if csr is not None else 'in-memory'}) for {len(star_ids):,} actors, {len(store['edges']):,} edges:")
+    for name, seconds in timings.items():
+        print(f"  - {name}: {seconds:.2f}s")
+
+    try:
+        store_centrality(star_ids, scores)
+    except psycopg.Error as e:
+        print("❌ Failed to store centrality scores.")
+        print("Error:", e)
+        return
+
+    names = store["names"]
+    order = np.argsort(-scores["pagerank"])[:top]
+    print(f"\n✅ Stored in actor_centrality. Top {len(order)} by PageRank:")
+    for i in order:
+        print(f"  - {names.get(int(star_ids[i]), star_ids[i])}: pagerank {scores['pagerank'][i]:.5f}, "
+              f"betweenness {scores['betweenness'][i]:.5f}, degree {scores['weighted_degree'][i]}")
+
+if __name__ == "__main__":
+    main(samples=int(sys.argv[1]) if len(sys.argv) > 1 else BETWEENNESS_SAMPLES)
@@ -1,22 +1,10 @@
-import os
 import psycopg
 from collections import defaultdict
-from dotenv import load_dotenv
-
-# Load values from .env file
-load_dotenv()
-
-DB_CONNECTION = {
-    "dbname": os.getenv("PGDATABASE", "Movies"),
-    "user": os.getenv("PGUSER", "postgres"),
-    "password": os.getenv("PGPASSWORD", ""),
-    "host": os.getenv("PGHOST", "localhost"),
-    "port": os.getenv("PGPORT", "5432"),
-}
+from db_connections import connect_read
 
 def fetch_actor_pairs():
     try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
+        with connect_read() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     SELECT
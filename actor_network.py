@@ -1,46 +1,38 @@
-import os
 import psycopg
 import networkx as nx
 import matplotlib.pyplot as plt
 import time
-from dotenv import load_dotenv
+from db_connections import connect_read
+import collab_graph_store
+import graph_render
+import perf_phases
+import chart_sampling
+from movie_aggregates import SAMPLE_SQL
 
-# Load values from .env file
-load_dotenv()
-
-DB_CONNECTION = {
-    "dbname": os.getenv("PGDATABASE", "Movies"),
-    "user": os.getenv("PGUSER", "postgres"),
-    "password": os.getenv("PGPASSWORD", ""),
-    "host": os.getenv("PGHOST", "localhost"),
-    "port": os.getenv("PGPORT", "5432"),
-}
-
-def fetch_actor_pairs():
+def fetch_sampled_pairs(sample):
+    # Co-appearances within the sampled movies only (see chart_sampling.py)
     try:
-        conn = psycopg.connect(**DB_CONNECTION)
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT
-                    s1.actor_name AS actor_1,
-                    s2.actor_name AS actor_2,
-                    COUNT(*) AS shared_movies
-                FROM appearances a1
-                JOIN appearances a2
-                    ON a1.movie_id = a2.movie_id AND a1.star_id < a2.star_id
-                JOIN stars s1 ON a1.star_id = s1.id
-                JOIN stars s2 ON a2.star_id = s2.id
-                GROUP BY s1.actor_name, s2.actor_name
-                HAVING COUNT(*) > 0
-                ORDER BY shared_movies DESC;
-            """)
-            return cur.fetchall()
+        with connect_read() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    SELECT s1.actor_name, s2.actor_name, COUNT(*) AS shared_movies
+                    FROM {SAMPLE_SQL}
+                    JOIN appearances a1 ON a1.movie_id = sample.id
+                    JOIN appearances a2
+                        ON a2.movie_id = a1.movie_id AND a1.star_id < a2.star_id
+                    JOIN stars s1 ON a1.star_id = s1.id
+                    JOIN stars s2 ON a2.star_id = s2.id
+                    GROUP BY s1.actor_name, s2.actor_name
+                    ORDER BY shared_movies DESC;
+                """, sample.params())
+                return cur.fetchall()
 
     except psycopg.Error as e:
         print("❌ Database query failed.")
         print("Error:", e)
         return []
 
+@perf_phases.timed("graph_build")
 def build_graph(pairs):
     G = nx.Graph()
     
@@ -49,35 +41,57 @@ def build_graph(pairs):
 
     return G
 
-def draw_graph(G):
+@perf_phases.timed("render")
+def draw_graph(G, sample=None):
     #for sd in range(101,201):
         sd=73
         print(f"This is using seed #: {sd}")
+
+        # Lay out and draw only what fits the render budget
+        with perf_phases.phase("transform"):
+            G, culled = graph_render.apply_budget(G)
+
         plt.figure(figsize=(12, 8))
-        pos = nx.spring_layout(G, seed=sd, k=0.5)  # Consistent layout  ok seeds: 8
-        edges = G.edges(data=True)
+        with perf_phases.phase("layout"):
+            pos = nx.spring_layout(G, seed=sd, k=0.5)  # Consistent layout  ok seeds: 8
 
         # Line width based on number of shared movies
-        weights = [data['weight'] for _, _, data in edges]
-
-        nx.draw_networkx_nodes(G, pos, node_size=200, node_color='lightblue')
-        nx.draw_networkx_edges(G, pos, width=weights, alpha=0.6)
-        nx.draw_networkx_labels(G, pos, font_size=10, font_family="sans-serif")
+        graph_render.draw_budgeted(G, pos, node_color='lightblue', node_size=200, edge_alpha=0.6, font_size=10)
 
-        plt.title("Actor Collaboration Network")
+        plt.title(f"Actor Collaboration Network{graph_render.culled_note(culled)}")
         plt.axis("off")
+        if sample is not None:
+            sample.annotate()
         plt.tight_layout()
-        plt.show()
+        chart_sampling.show(sample)
         
 
-def main():
-    pairs = fetch_actor_pairs()
+@perf_phases.profiled("actor_network")
+def main(preview=None, sample_size=chart_sampling.PREVIEW_SIZE, preview_only=False):
+    # preview=<method>: draw the pairs from a sample of movies first, then
+    # the full graph unless preview_only
+    sample = None
+    if preview:
+        try:
+            sample = chart_sampling.sample_movies(preview, sample_size)
+        except psycopg.Error as e:
+            print("❌ Failed to sample movies.")
+            print("Error:", e)
+            return
+        if not preview_only:
+            sample.follow = (collab_graph_store.fetch_actor_pairs,
+                             lambda pairs: draw_graph(build_graph(pairs)) if pairs else print("No data to display."))
+
+    # Incrementally refreshed from the persisted graph store
+    with perf_phases.phase("fetch"):
+        pairs = fetch_sampled_pairs(sample) if sample is not None else collab_graph_store.fetch_actor_pairs()
+    perf_phases.count("pairs", len(pairs))
     if not pairs:
         print("No data to display.")
         return
 
     G = build_graph(pairs)
-    draw_graph(G)
+    draw_graph(G, sample)
 
 if __name__ == "__main__":
     main()
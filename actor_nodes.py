@@ -1,26 +1,25 @@
-import os
 import sys
+import threading
+import queue
+from collections import OrderedDict
 import psycopg
 import networkx as nx
 import matplotlib.pyplot as plt
 from thefuzz import process
 from collections import defaultdict
-from dotenv import load_dotenv
+from db_connections import connect_read
+import graph_render
+import change_counters
+import perf_phases
 
-# Load values from .env file
-load_dotenv()
-
-DB_CONNECTION = {
-    "dbname": os.getenv("PGDATABASE", "Movies"),
-    "user": os.getenv("PGUSER", "postgres"),
-    "password": os.getenv("PGPASSWORD", ""),
-    "host": os.getenv("PGHOST", "localhost"),
-    "port": os.getenv("PGPORT", "5432"),
-}
+EGO_CACHE_SIZE = 32          # ego graphs (with layouts) kept in memory
+PREFETCH_LISTED = 20         # sample-list actors warmed up at start
+PREFETCH_NEIGHBOURS = 5      # strongest collaborators warmed up after each view
 
+@perf_phases.timed("fetch")
 def get_all_actor_names():
     try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
+        with connect_read() as conn:
             with conn.cursor() as cur:
                 cur.execute("SELECT DISTINCT actor_name FROM stars ORDER BY actor_name;")
                 return [row[0] for row in cur.fetchall()]
@@ -28,9 +27,10 @@ def get_all_actor_names():
         print("❌ Failed to fetch actor names:", e)
         return []
 
-def get_collaborators(actor_name):
+@perf_phases.timed("fetch")
+def get_collaborators(actor_name, min_lsn=None):
     try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
+        with connect_read(min_lsn=min_lsn) as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     SELECT
@@ -51,11 +51,12 @@ def get_collaborators(actor_name):
         print("❌ Error fetching collaborators:", e)
         return []
 
-def build_rel_graph(center_actor):
+@perf_phases.timed("graph_build")
+def build_rel_graph(center_actor, min_lsn=None):
     G = nx.Graph()
     G.add_node(center_actor, layer=0)
 
-    first_degree = get_collaborators(center_actor)
+    first_degree = get_collaborators(center_actor, min_lsn)
     first_degree_names = set()
 
     # First-degree edges
@@ -66,7 +67,7 @@ def build_rel_graph(center_actor):
 
     # Second-degree
     for actor in first_degree_names:
-        second_degree = get_collaborators(actor)
+        second_degree = get_collaborators(actor, min_lsn)
         for coactor, movies, count in second_degree:
             if coactor == center_actor or coactor in first_degree_names:
                 continue  # Already in graph or directly connected to center
@@ -74,33 +75,140 @@ def build_rel_graph(center_actor):
             G.add_edge(actor, coactor, weight=count, movies=movies)
     return G
 
-def draw_graph(G, center_actor):
-    pos = nx.spring_layout(G, seed=42, k=1.2)
+def first_degree_by_weight(G, center_actor):
     layers = nx.get_node_attributes(G, 'layer')
+    return sorted(
+        (n for n in G.nodes if layers.get(n) == 1),
+        key=lambda n: -G[center_actor][n]["weight"] if G.has_edge(center_actor, n) else 0,
+    )
 
-    plt.figure(figsize=(12, 8))
+@perf_phases.timed("transform")
+def budget_graph(G, center_actor):
+    # Cut the ego graph down to the render budget before it is laid out, so
+    # layout and drawing cost stay fixed; the centre and its direct
+    # collaborators go first. Returns (subgraph, culled counts).
+    return graph_render.apply_budget(G, keep=[center_actor] + first_degree_by_weight(G, center_actor))
+
+@perf_phases.timed("layout")
+def compute_layout(G):
+    return nx.spring_layout(G, seed=42, k=1.2)
+
+def catalog_version():
+    # (token, min_lsn) from the change counters (change_counters.py); used to
+    # drop stale graphs. None when it cannot be checked; the cache then
+    # keeps its graphs.
+    try:
+        return change_counters.catalog_version()
+    except psycopg.Error as e:
+        print("❌ Failed to check for changes:", e)
+        return None
+
+class EgoGraphCache:
+    # LRU of built ego graphs with their layouts, shared with the prefetch
+    # thread. Graphs being built are tracked so a lookup waits for the
+    # in-flight build instead of starting a second one.
+    def __init__(self, size=EGO_CACHE_SIZE):
+        self.size = size
+        self.version = None
+        self.min_lsn = None   # graphs are read at or after this WAL position
+        self._graphs = OrderedDict()
+        self._building = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, version):
+        # version: (token, min_lsn) from catalog_version()
+        if version is None:
+            return False
+        token, min_lsn = version
+        with self._lock:
+            if token == self.version:
+                return False
+            self.version, self.min_lsn = token, min_lsn
+            self._graphs.clear()
+            return True
 
-    # Draw nodes with color by layer
-    for layer, color in zip((0, 1, 2), ('deepskyblue', 'mediumseagreen', 'lightgray')):
-        nodes = [n for n in G.nodes if layers.get(n) == layer]
-        nx.draw_networkx_nodes(G, pos, nodelist=nodes, node_color=color, node_size=500)
+    def get(self, actor_name, wait=True):
+        with self._lock:
+            if actor_name in self._graphs:
+                self._graphs.move_to_end(actor_name)
+                return self._graphs[actor_name]
+            event = self._building.get(actor_name)
+            if event is None:
+                self._building[actor_name] = threading.Event()
+                return None
+        if not wait:
+            return False
+        event.wait()
+        return self.get(actor_name)
 
-    # Edges
-    weights = [G[u][v]["weight"] for u, v in G.edges()]
-    nx.draw_networkx_edges(G, pos, width=[w * 1.3 for w in weights], alpha=0.4, connectionstyle="arc3,rad=0.15", arrows=True)
+    def put(self, actor_name, entry, version):
+        with self._lock:
+            event = self._building.pop(actor_name, None)
+            if entry is not None and version == self.version:
+                self._graphs[actor_name] = entry
+                self._graphs.move_to_end(actor_name)
+                while len(self._graphs) > self.size:
+                    self._graphs.popitem(last=False)
+        if event:
+            event.set()
 
-    # Labels
-    nx.draw_networkx_labels(G, pos, font_size=9)
+def get_ego_graph(cache, actor_name, wait=True):
+    # (graph, budgeted graph, its layout, culled counts) from the cache,
+    # building it on a miss. With wait=False returns False instead of
+    # blocking when another thread is building it.
+    entry = cache.get(actor_name, wait)
+    if entry is not None:
+        return entry
+
+    version, min_lsn = cache.version, cache.min_lsn
+    entry = None
+    try:
+        G = build_rel_graph(actor_name, min_lsn)
+        H, culled = budget_graph(G, actor_name)
+        entry = (G, H, compute_layout(H), culled)
+    finally:
+        cache.put(actor_name, entry, version)
+    return entry
 
-    # Edge labels
-    edge_labels = {(u, v): G[u][v]["movies"] for u, v in G.edges()}
-    nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_size=7, label_pos=0.5)
+def start_prefetcher(cache):
+    requests = queue.Queue()
 
-    plt.title(f"Actor Collaboration Map: {center_actor}", fontsize=14)
+    def worker():
+        while True:
+            actor_name = requests.get()
+            get_ego_graph(cache, actor_name, wait=False)
+
+    threading.Thread(target=worker, name="ego-prefetch", daemon=True).start()
+    return requests
+
+def prefetch_neighbours(requests, G, center_actor, limit=PREFETCH_NEIGHBOURS):
+    # The strongest collaborators are the likeliest next picks
+    neighbours = sorted(G[center_actor].items(), key=lambda item: -item[1]["weight"])
+    for actor, _ in neighbours[:limit]:
+        requests.put(actor)
+
+@perf_phases.timed("render")
+def draw_graph(H, center_actor, pos=None, culled=None):
+    # H is already cut to the render budget (budget_graph)
+    if pos is None:
+        pos = compute_layout(H)
+    layers = nx.get_node_attributes(H, 'layer')
+    first_degree = first_degree_by_weight(H, center_actor)
+    colors = {n: ('deepskyblue', 'mediumseagreen', 'lightgray')[layers.get(n, 2)] for n in H.nodes}
+
+    plt.figure(figsize=(12, 8))
+    graph_render.draw_budgeted(
+        H, pos, node_color=colors, node_size=500, width_scale=1.3, edge_alpha=0.4,
+        label_nodes=[center_actor] + first_degree, edge_label_attr="movies",
+    )
+
+    plt.title(f"Actor Collaboration Map: {center_actor}{graph_render.culled_note(culled) if culled else ''}",
+              fontsize=14)
     plt.axis("off")
     plt.tight_layout()
-    plt.show()
+    perf_phases.show()
 
+@perf_phases.profiled("actor_nodes")
 def main():
     print("🎬 Actor Collaboration Map Explorer")
     print("Type an actor name (or number), press Enter to reuse the last, or 'exit' to quit.\n")
@@ -116,7 +224,16 @@ def main():
         print(f"  {i:>2}. {name}")
     print("  ...\n")
 
+    cache = EgoGraphCache()
+    if not cache.invalidate(catalog_version()):
+        print("ℹ️ Change counters not installed ('python movies.py change-counters'); "
+              "cached graphs will not notice edits.\n")
+    prefetch = start_prefetcher(cache)
+    for name in all_actor_names[:PREFETCH_LISTED]:
+        prefetch.put(name)
+
     last_actor = None
+    recent = []
 
     while True:
         try:
@@ -152,14 +269,25 @@ def main():
 
             last_actor = actor_name
 
+            # The catalog changed since the graphs were built: start over,
+            # re-warming the actors viewed most recently
+            if cache.invalidate(catalog_version()):
+                print("🔄 Catalog changed; cached graphs cleared.")
+                for name in recent[-PREFETCH_NEIGHBOURS:]:
+                    prefetch.put(name)
+
+            recent = [name for name in recent if name != actor_name] + [actor_name]
+
             print(f"\nBuilding graph for {actor_name}...\n")
-            G = build_rel_graph(actor_name)
+            G, H, pos, culled = get_ego_graph(cache, actor_name)
 
             print("Graph includes:")
             print(f"  - {len(G.nodes())} actors")
             print(f"  - {len(G.edges())} relationships\n")
 
-            draw_graph(G, actor_name)
+            if actor_name in G:
+                prefetch_neighbours(prefetch, G, actor_name)
+            draw_graph(H, actor_name, pos, culled)
 
         except KeyboardInterrupt:
             print("\nExiting...")
@@ -1,46 +1,9 @@
-import os
 import psycopg
 import networkx as nx
 import matplotlib.pyplot as plt
 from operator import itemgetter
-from dotenv import load_dotenv
-
-# Load values from .env file
-load_dotenv()
-
-DB_CONNECTION = {
-    "dbname": os.getenv("PGDATABASE", "Movies"),
-    "user": os.getenv("PGUSER", "postgres"),
-    "password": os.getenv("PGPASSWORD", ""),
-    "host": os.getenv("PGHOST", "localhost"),
-    "port": os.getenv("PGPORT", "5432"),
-}
-
-
-def fetch_actor_pairs():
-    try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT
-                        s1.actor_name AS actor_1,
-                        s2.actor_name AS actor_2,
-                        COUNT(*) AS shared_movies
-                    FROM appearances a1
-                    JOIN appearances a2
-                        ON a1.movie_id = a2.movie_id AND a1.star_id < a2.star_id
-                    JOIN stars s1 ON a1.star_id = s1.id
-                    JOIN stars s2 ON a2.star_id = s2.id
-                    GROUP BY s1.actor_name, s2.actor_name
-                    HAVING COUNT(*) > 0
-                    ORDER BY shared_movies DESC;
-                """)
-                return cur.fetchall()
-
-    except psycopg.Error as e:
-        print("❌ Database query failed.")
-        print("Error:", e)
-        return []
+import collab_graph_store
+import actor_centrality
 
 def build_graph(pairs):
     G = nx.Graph()
@@ -72,16 +35,23 @@ def draw_graph(G):
     plt.show()
 
 def main():
-    pairs = fetch_actor_pairs()
+    # Incrementally refreshed from the persisted graph store
+    pairs = collab_graph_store.fetch_actor_pairs()
     if not pairs:
         print("No data to display.")
         return
 
     full_graph = build_graph(pairs)
 
-    # Optional: Limit to top 30 most connected actors for clarity
-    top_nodes = sorted(full_graph.degree, key=itemgetter(1), reverse=True)[:30]
-    filtered_graph = full_graph.subgraph([node for node, _ in top_nodes])
+    # Optional: Limit to the top 30 actors by stored PageRank for clarity,
+    # or by degree when `python movies.py centrality` hasn't been run yet
+    try:
+        top_nodes = [name for name, _ in actor_centrality.fetch_top_actors("pagerank", 30) if name in full_graph]
+    except psycopg.Error:
+        top_nodes = []
+    if not top_nodes:
+        top_nodes = [node for node, _ in sorted(full_graph.degree, key=itemgetter(1), reverse=True)[:30]]
+    filtered_graph = full_graph.subgraph(top_nodes)
 
     draw_graph(filtered_graph)
 
@@ -1,32 +1,42 @@
-import os
 import psycopg
 import pandas as pd
 import matplotlib.pyplot as plt
-from dotenv import load_dotenv
+from db_connections import connect_read
 
-# Load values from .env file
-load_dotenv()
+# Mirrors actor_centrality.METRICS without importing numpy/scipy
+METRICS = ("weighted_degree", "pagerank", "eigenvector", "betweenness")
 
-DB_CONNECTION = {
-    "dbname": os.getenv("PGDATABASE", "Movies"),
-    "user": os.getenv("PGUSER", "postgres"),
-    "password": os.getenv("PGPASSWORD", ""),
-    "host": os.getenv("PGHOST", "localhost"),
-    "port": os.getenv("PGPORT", "5432"),
-}
-
-def plot_actor_appearance_counts():
+def plot_actor_appearance_counts(top=None, metric="pagerank"):
+    # top=N limits the chart to the N most important actors by a stored
+    # centrality metric (see actor_centrality.py)
     try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
+        with connect_read() as conn:
             with conn.cursor() as cur:
-                # Query actor appearance counts
-                cur.execute("""
-                    SELECT s.actor_name, COUNT(a.movie_id) AS role_count
-                    FROM stars s
-                    JOIN appearances a ON s.id = a.star_id
-                    GROUP BY s.actor_name
-                    ORDER BY role_count DESC;
-                """)
+                if top:
+                    if metric not in METRICS:
+                        print(f"⚠️ Unknown metric: {metric}")
+                        return
+                    cur.execute(f"""
+                        SELECT s.actor_name, COUNT(a.movie_id) AS role_count
+                        FROM stars s
+                        JOIN appearances a ON s.id = a.star_id
+                        WHERE s.id IN (
+                            SELECT star_id FROM actor_centrality
+                            ORDER BY {metric} DESC
+                            LIMIT %s
+                        )
+                        GROUP BY s.actor_name
+                        ORDER BY role_count DESC;
+                    """, (top,))
+                else:
+                    # Query actor appearance counts
+                    cur.execute("""
+                        SELECT s.actor_name, COUNT(a.movie_id) AS role_count
+                        FROM stars s
+                        JOIN appearances a ON s.id = a.star_id
+                        GROUP BY s.actor_name
+                        ORDER BY role_count DESC;
+                    """)
                 data = cur.fetchall()
 
         # Convert to DataFrame
@@ -0,0 +1,198 @@
+import psycopg
+from psycopg import sql
+from db_connections import BACKEND, connect_read, connect_write
+
+# Change counters for the caches (health report, ego graphs, graph store,
+# collaboration timeline). Statement-level triggers on movies, stars and
+# appearances add the number of rows each statement changed to a counter
+# per table and kind of change:
+#
+#   insert / update / delete   rows inserted, updated or deleted
+#                              (a TRUNCATE adds 1 to delete)
+#   release_year               movies whose year an update changed
+#
+# Row counts let the incremental refreshes check that every newly counted
+# insert is above their watermark (ids are not committed in order).
+#
+# The counters live in an ordinary table, so they commit together with the
+# change that bumped them and replicate like any other row. Each table has
+# SHARDS rows per kind, picked by backend pid, so parallel ingestion workers
+# rarely update the same counter row.
+#
+# Install once with: python movies.py change-counters
+
+TABLES = ("movies", "stars", "appearances")
+KINDS = ("insert", "update", "delete", "release_year")
+SHARDS = 16
+
+SETUP_SQL = f"""
+    CREATE TABLE IF NOT EXISTS table_changes (
+        table_name TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        shard INT NOT NULL,
+        changes BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (table_name, kind, shard)
+    );
+
+    CREATE OR REPLACE FUNCTION bump_table_changes(TEXT, TEXT, BIGINT) RETURNS void AS $$
+        INSERT INTO table_changes (table_name, kind, shard, changes)
+        VALUES ($1, $2, pg_backend_pid() % {SHARDS}, $3)
+        ON CONFLICT (table_name, kind, shard) DO UPDATE SET changes = table_changes.changes + $3;
+    $$ LANGUAGE sql;
+
+    -- TG_ARGV: logical table name, kind. Statements that matched no rows
+    -- (e.g. ON CONFLICT DO NOTHING hitting an existing row) add nothing.
+    CREATE OR REPLACE FUNCTION count_table_changes() RETURNS trigger AS $$
+    DECLARE
+        changed_rows BIGINT := 1;
+    BEGIN
+        IF TG_OP <> 'TRUNCATE' THEN
+            SELECT COUNT(*) INTO changed_rows FROM changed;
+        END IF;
+        IF changed_rows > 0 THEN
+            PERFORM bump_table_changes(TG_ARGV[0], TG_ARGV[1], changed_rows);
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION count_year_changes() RETURNS trigger AS $$
+    DECLARE
+        changed_rows BIGINT;
+    BEGIN
+        SELECT COUNT(*) INTO changed_rows
+        FROM old_rows o JOIN new_rows n ON n.id = o.id
+        WHERE n.release_year IS DISTINCT FROM o.release_year;
+        IF changed_rows > 0 THEN
+            PERFORM bump_table_changes(TG_ARGV[0], 'release_year', changed_rows);
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql;
+"""
+
+# (trigger name suffix, event, transition tables, function, kind)
+TRIGGERS = (
+    ("insert", "INSERT", "REFERENCING NEW TABLE AS changed", "count_table_changes", "insert"),
+    ("update", "UPDATE", "REFERENCING NEW TABLE AS changed", "count_table_changes", "update"),
+    ("delete", "DELETE", "REFERENCING OLD TABLE AS changed", "count_table_changes", "delete"),
+    ("truncate", "TRUNCATE", "", "count_table_changes", "delete"),
+)
+YEAR_TRIGGER = ("year", "UPDATE", "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows", "count_year_changes", None)
+
+
+def installed(cur):
+    # True when the counters table exists and every table has its triggers
+    cur.execute("""
+        SELECT to_regclass('table_changes') IS NOT NULL,
+               (SELECT COUNT(DISTINCT tgrelid) FROM pg_trigger
+                WHERE tgfoid = to_regproc('count_table_changes') AND tgrelid = ANY(%s::regclass[]));
+    """, (list(TABLES),))
+    table_exists, tables_with_triggers = cur.fetchone()
+    return table_exists and tables_with_triggers == len(TABLES)
+
+def install_triggers(cur, table, name=None):
+    # name: the table the changes are counted under, when it differs from
+    # table (partition_migration.py's *_part copies count as the originals)
+    name = name or table
+    triggers = TRIGGERS + ((YEAR_TRIGGER,) if name == "movies" else ())
+    for suffix, event, transition, function, kind in triggers:
+        trigger = sql.Identifier(f"{table}_count_{suffix}")
+        arguments = [sql.Literal(name)] + ([sql.Literal(kind)] if kind else [])
+        cur.execute(sql.SQL("DROP TRIGGER IF EXISTS {trigger} ON {table};").format(
+            trigger=trigger, table=sql.Identifier(table)))
+        cur.execute(sql.SQL(
+            "CREATE TRIGGER {trigger} AFTER {event} ON {table} {transition} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION {function}({arguments});"
+        ).format(
+            trigger=trigger,
+            event=sql.SQL(event),
+            table=sql.Identifier(table),
+            transition=sql.SQL(transition),
+            function=sql.Identifier(function),
+            arguments=sql.SQL(", ").join(arguments),
+        ))
+
+def install(conn):
+    with conn.transaction():
+        with conn.cursor() as cur:
+            cur.execute(SETUP_SQL)
+            for table in TABLES:
+                install_triggers(cur, table)
+
+def ensure_installed(conn):
+    # For the refresh jobs, which write anyway; returns True if it installed
+    with conn.cursor() as cur:
+        present = installed(cur)
+    conn.commit()
+    if not present:
+        install(conn)
+    return not present
+
+def read_counters(cur, tables=TABLES):
+    # {"table.kind": changes} for every table and kind, 0 when never bumped
+    cur.execute("""
+        SELECT table_name || '.' || kind, SUM(changes)::bigint
+        FROM table_changes
+        WHERE table_name = ANY(%s)
+        GROUP BY table_name, kind;
+    """, (list(tables),))
+    counters = {f"{table}.{kind}": 0 for table in tables for kind in KINDS}
+    counters.update(cur.fetchall())
+    return counters
+
+def refresh_plan(cur, table, watermark, seen, counters, rebuild_on):
+    # How to bring a copy built from `table` rows up to `watermark` up to
+    # date: (mode, high id, new rows) with mode "full", "delta" or
+    # "unchanged". seen: the counters the copy was built at (None if never
+    # built); rebuild_on: counters whose change needs a full rebuild (e.g.
+    # deletes). A delta also needs every insert counted since `seen` to sit
+    # above the watermark: ids are not committed in order, so a row that
+    # committed late below it forces a rebuild too. Only index lookups;
+    # run it in the same REPEATABLE READ snapshot as the refresh itself.
+    cur.execute(sql.SQL("SELECT COALESCE(MAX(id), 0) FROM {};").format(sql.Identifier(table)))
+    high = cur.fetchone()[0]
+    if seen is None or any(counters[key] != seen.get(key) for key in rebuild_on):
+        return "full", high, None
+
+    inserted = counters[f"{table}.insert"] - seen.get(f"{table}.insert", 0)
+    if not inserted and high == watermark:
+        return "unchanged", high, 0
+    cur.execute(sql.SQL("SELECT COUNT(*) FROM {} WHERE id > %s AND id <= %s;").format(sql.Identifier(table)),
+                (watermark, high))
+    if cur.fetchone()[0] != inserted:
+        return "full", high, None
+    return "delta", high, inserted
+
+def catalog_version(tables=TABLES):
+    # Cache token for reads of `tables`: (token, min_lsn) or None when it
+    # cannot be checked (counters not installed). The token is read on the
+    # primary; pass min_lsn to connect_read() so the cached data is read at
+    # or after that point, even from a lagging replica. On the DuckDB
+    # backend the snapshot only changes on sync-local, so its sync time is
+    # the token.
+    if BACKEND == "duckdb":
+        with connect_read() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT CAST(synced_at AS VARCHAR) FROM sync_info;")
+                return [cur.fetchone()[0]], None
+
+    with connect_write() as conn:
+        with conn.cursor() as cur:
+            if not installed(cur):
+                return None
+            counters = read_counters(cur, tables)
+            cur.execute("SELECT pg_current_wal_lsn()::text;")
+            min_lsn = cur.fetchone()[0]
+    return [counters[f"{table}.{kind}"] for table in tables for kind in KINDS], min_lsn
+
+def main():
+    try:
+        with connect_write() as conn:
+            install(conn)
+    except psycopg.Error as e:
+        print("❌ Failed to install the change counters.")
+        print("Error:", e)
+        return
+    print(f"✅ Change counters installed on {', '.join(TABLES)}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import math
+import os
+import random
+import threading
+import perf_phases
+
+# matplotlib and the database driver are imported where they are used, so
+# movies.py can build its --preview options from METHODS at startup
+
+# Preview mode for the chart scripts: draw from a sample of movies first,
+# then (by default) fetch the full data in a background thread and redraw
+# when it arrives. Closing the preview window cancels the full render.
+#
+#   tablesample  TABLESAMPLE SYSTEM: whole random pages, the cheapest read
+#   reservoir    exactly `size` movies, uniformly: a Bernoulli pre-sample
+#                streamed through a reservoir, so memory stays at `size` rows
+#   stratified   up to size / decades movies from every decade, so sparse
+#                eras still show up. Not a cheap read: two sequential passes
+#                over movies (decade sizes, then a per-decade Bernoulli
+#                pick), though without sorting, and returns ~`size` rows
+#
+# Every sampled movie carries a weight (1 / its chance of being picked) so
+# counts can be scaled back up to estimates of the full catalog. Queries
+# join the sample through movie_aggregates.SAMPLE_SQL + Sample.params().
+#
+# All three also run on the DuckDB backend (MOVIES_BACKEND=duckdb), which
+# spells TABLESAMPLE with the seed inside and has no planner row estimate.
+
+METHODS = ("tablesample", "reservoir", "stratified")
+PREVIEW_METHOD = os.getenv("MOVIES_PREVIEW_METHOD", "tablesample")
+PREVIEW_SIZE = int(os.getenv("MOVIES_PREVIEW_SIZE", "2000"))
+FETCH_SIZE = 5_000
+
+LABELS = {
+    "tablesample": "TABLESAMPLE SYSTEM",
+    "reservoir": "reservoir",
+    "stratified": "stratified by decade",
+}
+
+
+class Sample:
+    def __init__(self, method, ids, weights, population):
+        self.method = method
+        self.ids = ids
+        self.weights = weights
+        self.population = population
+        self.follow = None  # (fetch_full, draw_full) to render the full data afterwards
+
+    @property
+    def rate(self):
+        return len(self.ids) / self.population if self.population else 1.0
+
+    def params(self):
+        return {"sample_ids": self.ids, "sample_weights": self.weights}
+
+    def describe(self):
+        return (f"Preview: {LABELS[self.method]} sample of {len(self.ids):,} / ~{self.population:,} movies "
+                f"({self.rate:.1%})")
+
+    def annotate(self, fig=None):
+        import matplotlib.pyplot as plt
+        fig = fig or plt.gcf()
+        fig.text(0.995, 0.005, self.describe(), ha="right", va="bottom", fontsize=9, color="dimgray")
+
+
+def _estimated_rows(cur):
+    from db_connections import BACKEND
+    if BACKEND == "duckdb":
+        # Columnar count from block metadata, about as cheap as an estimate
+        cur.execute("SELECT COUNT(*) FROM movies;")
+        return cur.fetchone()[0]
+
+    # Planner estimate: free, and close enough to size a sample. Summed over
+    # the leaf partitions, since a partitioned parent keeps reltuples = -1.
+    cur.execute("""
+        SELECT SUM(GREATEST(c.reltuples, 0))::bigint, bool_and(c.reltuples < 0)
+        FROM pg_partition_tree('movies') t
+        JOIN pg_class c ON c.oid = t.relid
+        WHERE t.isleaf;
+    """)
+    estimate, never_analysed = cur.fetchone()
+    if estimate is None or never_analysed:
+        cur.execute("SELECT COUNT(*) FROM movies;")
+        estimate = cur.fetchone()[0]
+    return max(int(estimate), 0)
+
+def _year_filter(year_from, year_to):
+    conditions = []
+    if year_from is not None:
+        conditions.append("release_year >= %(year_from)s")
+    if year_to is not None:
+        conditions.append("release_year <= %(year_to)s")
+    return " AND ".join(conditions) or "true"
+
+def _sample_clause(method, percent, seed):
+    # TABLESAMPLE for movies; DuckDB only takes literals here
+    from db_connections import BACKEND
+    if BACKEND == "duckdb":
+        return f"TABLESAMPLE {float(percent)!r}% ({method}, {int(seed)})"
+    return f"TABLESAMPLE {method.upper()} (%(percent)s) REPEATABLE (%(seed)s)"
+
+def _tablesample(cur, size, seed, where, params):
+    population = _estimated_rows(cur)
+    percent = min(100.0, 100.0 * size / max(population, 1))
+    cur.execute(f"""
+        SELECT id FROM movies {_sample_clause("system", percent, seed)}
+        WHERE {where};
+    """, {**params, "percent": percent, "seed": seed})
+    ids = [row[0] for row in cur.fetchall()]
+    return ids, [100.0 / percent] * len(ids), population
+
+def _reservoir(conn, size, seed, where, params):
+    with conn.cursor() as cur:
+        population = _estimated_rows(cur)
+    # Oversample so the pre-sample almost always holds `size` rows
+    percent = min(100.0, 100.0 * 1.5 * size / max(population, 1))
+
+    rng = random.Random(seed)
+    reservoir, seen = [], 0
+    with conn.cursor(name="preview_sample") as cur:
+        cur.itersize = FETCH_SIZE
+        cur.execute(f"""
+            SELECT id FROM movies {_sample_clause("bernoulli", percent, seed)}
+            WHERE {where};
+        """, {**params, "percent": percent, "seed": seed})
+        for (movie_id,) in cur:
+            seen += 1
+            if len(reservoir) < size:
+                reservoir.append(movie_id)
+            else:
+                slot = rng.randrange(seen)
+                if slot < size:
+                    reservoir[slot] = movie_id
+
+    # P(picked) = P(in pre-sample) * P(kept by the reservoir)
+    chance = percent / 100.0 * (len(reservoir) / seen if seen else 1.0)
+    return reservoir, [1.0 / chance] * len(reservoir), population
+
+def _seed_fraction(seed):
+    # setseed() takes a value in [-1, 1] (PostgreSQL and DuckDB alike)
+    return (seed % 2_000_000) / 1_000_000 - 1
+
+def _stratified(cur, size, seed, where, params):
+    cur.execute(f"""
+        SELECT release_year / 10, COUNT(*) FROM movies
+        WHERE {where} AND release_year IS NOT NULL
+        GROUP BY 1;
+    """, params)
+    decade_movies = dict(cur.fetchall())
+    if not decade_movies:
+        return [], [], 0
+    per_decade = max(1, math.ceil(size / (max(decade_movies) - min(decade_movies) + 1)))
+
+    # Bernoulli pick per decade, oversampled so each usually yields
+    # per_decade rows, then trimmed; no ORDER BY random() over the table
+    decades = sorted(decade_movies)
+    cur.execute("SELECT setseed(%s);", (_seed_fraction(seed),))
+    cur.execute(f"""
+        SELECT m.id, r.decade
+        FROM movies m
+        JOIN (SELECT unnest(%(decades)s::int[]) AS decade, unnest(%(rates)s::float8[]) AS rate) AS r
+            ON r.decade = m.release_year / 10
+        WHERE {where} AND random() < r.rate;
+    """, {**params, "decades": decades,
+          "rates": [min(1.0, 1.5 * per_decade / decade_movies[d]) for d in decades]})
+    picked = {}
+    for movie_id, decade in cur.fetchall():
+        picked.setdefault(decade, []).append(movie_id)
+
+    rng = random.Random(seed)
+    ids, weights = [], []
+    for decade, movie_ids in picked.items():
+        if len(movie_ids) > per_decade:
+            movie_ids = rng.sample(movie_ids, per_decade)
+        ids.extend(movie_ids)
+        weights.extend([decade_movies[decade] / len(movie_ids)] * len(movie_ids))
+    return ids, weights, sum(decade_movies.values())
+
+def sample_movies(method=PREVIEW_METHOD, size=PREVIEW_SIZE, seed=42, year_from=None, year_to=None):
+    if method not in METHODS:
+        raise ValueError(f"Unknown sampling method: {method} (choose from {', '.join(METHODS)})")
+
+    from db_connections import connect_read
+    where = _year_filter(year_from, year_to)
+    params = {"year_from": year_from, "year_to": year_to}
+    with perf_phases.phase("sample"):
+        with connect_read() as conn:
+            if method == "reservoir":
+                ids, weights, population = _reservoir(conn, size, seed, where, params)
+            else:
+                with conn.cursor() as cur:
+                    sampler = _tablesample if method == "tablesample" else _stratified
+                    ids, weights, population = sampler(cur, size, seed, where, params)
+
+    if year_from is not None or year_to is not None:
+        population = round(sum(weights))  # the table estimate covers every year
+    perf_phases.count("sampled_movies", len(ids))
+    return Sample(method, ids, weights, population)
+
+def show(sample=None):
+    # perf_phases.show(), plus the background full render for a preview
+    if sample is None or sample.follow is None:
+        perf_phases.show()
+        return
+
+    import matplotlib.pyplot as plt
+    fetch_full, draw_full = sample.follow
+    result = {}
+
+    def fetch():
+        # Any failure is reported from the main thread below
+        try:
+            result["data"] = fetch_full()
+        except Exception as e:
+            result["error"] = e
+
+    worker = threading.Thread(target=fetch, daemon=True)
+    worker.start()
+
+    fig = plt.gcf()
+    with perf_phases.phase("full_fetch"):
+        plt.show(block=False)
+        while worker.is_alive() and plt.fignum_exists(fig.number):
+            plt.pause(0.1)
+    if not plt.fignum_exists(fig.number):
+        print("ℹ️ Preview closed; full render skipped.")
+        return
+
+    worker.join()
+    if "error" in result:
+        print("❌ Full render failed; keeping the preview.")
+        print("Error:", result["error"])
+        plt.show()
+        return
+    print("✅ Full data loaded; redrawing.")
+    plt.close(fig)
+    draw_full(result["data"])
@@ -1,21 +1,8 @@
-import os
-import psycopg
-from dotenv import load_dotenv
-
-# Load values from .env file
-load_dotenv()
-
-DB_CONNECTION = {
-    "dbname": os.getenv("PGDATABASE", "Movies"),
-    "user": os.getenv("PGUSER", "postgres"),
-    "password": os.getenv("PGPASSWORD", ""),
-    "host": os.getenv("PGHOST", "localhost"),
-    "port": os.getenv("PGPORT", "5432"),
-}
+from db_connections import connect_read
 
 def search_for_stars(name):
 
-    with psycopg.connect(**DB_CONNECTION) as conn:
+    with connect_read() as conn:
         with conn.cursor() as cur:
             cur.execute("SELECT * FROM stars WHERE actor_name =%s", (name,))
             star_data = cur.fetchall()
@@ -29,4 +16,5 @@ def search_for_stars(name):
             else:
                 print(name, "not found in list.")
 
-search_for_stars("Ellie Kemper")
\ No newline at end of file
+if __name__ == "__main__":
+    search_for_stars("Ellie Kemper")
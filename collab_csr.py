@@ -0,0 +1,259 @@
+import json
+import os
+import shutil
+import sys
+import numpy as np
+import psycopg
+import collab_graph_store
+
+# The collaboration graph as compressed sparse row arrays on disk:
+#
+#   offsets.npy    neighbours of node i are neighbors[offsets[i]:offsets[i + 1]]
+#   neighbors.npy  node indices, sorted within each row
+#   weights.npy    shared movies, aligned with neighbors
+#   star_ids.npy   node index -> stars.id (sorted, so lookups are a bisect)
+#   names.json     node index -> actor name
+#   meta.json      format version, sizes and the graph store watermark
+#
+# Built from the persisted graph store (collab_graph_store.py), so a
+# rebuild only costs an incremental refresh plus a sort. Readers open the
+# arrays with mmap, so any number of processes share one copy of the graph
+# through the page cache instead of each building networkx objects (a few
+# hundred bytes per edge).
+
+CSR_PATH = os.getenv("MOVIES_CSR_PATH", "collab_csr")
+CSR_VERSION = 1
+
+
+def build_csr(path=CSR_PATH, full=False):
+    store, _ = collab_graph_store.refresh_store(full=full)
+    edges = store["edges"]
+
+    star_ids = np.array(sorted({s for pair in edges for s in pair}), dtype=np.int64)
+    pairs = np.array(list(edges.keys()), dtype=np.int64).reshape(-1, 2)
+    shared = np.fromiter(edges.values(), dtype=np.int32, count=len(edges))
+
+    # Both directions, sorted by (row, column)
+    rows = np.searchsorted(star_ids, np.concatenate([pairs[:, 0], pairs[:, 1]]))
+    cols = np.searchsorted(star_ids, np.concatenate([pairs[:, 1], pairs[:, 0]]))
+    weights = np.concatenate([shared, shared])
+    order = np.lexsort((cols, rows))
+
+    n, nnz = len(star_ids), len(order)
+    index_dtype = np.int32 if nnz < 2**31 else np.int64
+    offsets = np.zeros(n + 1, dtype=index_dtype)
+    np.cumsum(np.bincount(rows, minlength=n), out=offsets[1:])
+
+    # Write next to the old copy and swap, so readers never see a mix
+    building = path + ".building"
+    shutil.rmtree(building, ignore_errors=True)
+    os.makedirs(building)
+    np.save(os.path.join(building, "offsets.npy"), offsets)
+    np.save(os.path.join(building, "neighbors.npy"), cols[order].astype(index_dtype))
+    np.save(os.path.join(building, "weights.npy"), weights[order])
+    np.save(os.path.join(building, "star_ids.npy"), star_ids)
+    with open(os.path.join(building, "names.json"), "w", encoding="utf-8") as f:
+        json.dump([store["names"].get(int(s), "") for s in star_ids], f)
+    meta = {"version": CSR_VERSION, "nodes": n, "edges": len(edges), "watermark": store["watermark"]}
+    with open(os.path.join(building, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    retired = path + ".old"
+    shutil.rmtree(retired, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, retired)
+    os.rename(building, path)
+    shutil.rmtree(retired, ignore_errors=True)
+    return meta
+
+
+class CollabCSR:
+    def __init__(self, path=CSR_PATH):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != CSR_VERSION:
+            raise ValueError(f"{path} was written by another version; rebuild it")
+
+        def array(name):
+            return np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+
+        self.path = path
+        self.offsets = array("offsets")
+        self.neighbors = array("neighbors")
+        self.weights = array("weights")
+        self.star_ids = array("star_ids")
+        self._names = None
+        self._name_index = None
+
+    @property
+    def names(self):
+        if self._names is None:
+            with open(os.path.join(self.path, "names.json"), encoding="utf-8") as f:
+                self._names = json.load(f)
+        return self._names
+
+    def __len__(self):
+        return len(self.star_ids)
+
+    def index_of(self, star_id):
+        i = int(np.searchsorted(self.star_ids, star_id))
+        if i == len(self.star_ids) or self.star_ids[i] != star_id:
+            raise KeyError(star_id)
+        return i
+
+    def indices_of_name(self, name):
+        # Every node with this name, in star id order; names are not unique
+        if self._name_index is None:
+            self._name_index = {}
+            for i, n in enumerate(self.names):
+                self._name_index.setdefault(n, []).append(i)
+        return self._name_index.get(name, [])
+
+    def row(self, i):
+        # (neighbour indices, weights) as zero-copy views
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.neighbors[start:end], self.weights[start:end]
+
+    def top_collaborators(self, i, k=10):
+        neighbors, weights = self.row(i)
+        if len(neighbors) > k:
+            best = np.argpartition(-weights, k)[:k]
+        else:
+            best = np.arange(len(neighbors))
+        best = best[np.lexsort((neighbors[best], -weights[best]))]
+        return [(int(neighbors[j]), int(weights[j])) for j in best]
+
+    def ego_graph(self, i, radius=2, max_nodes=None):
+        # Nodes within `radius` hops of i as {node: hops} in BFS order, and
+        # every edge among them as [(u, v, weight)], read off the mmap'd rows
+        depth = np.full(len(self), -1, dtype=np.int32)
+        depth[i] = 0
+        nodes = [i]
+        frontier = np.array([i])
+        for hops in range(1, radius + 1):
+            if not len(frontier) or (max_nodes and len(nodes) >= max_nodes):
+                break
+            starts, ends = self.offsets[frontier], self.offsets[frontier + 1]
+            reached = np.concatenate([self.neighbors[s:e] for s, e in zip(starts, ends)])
+            reached = reached[depth[reached] < 0]
+            _, first = np.unique(reached, return_index=True)
+            reached = reached[np.sort(first)]
+            if max_nodes:
+                reached = reached[:max_nodes - len(nodes)]
+            depth[reached] = hops
+            nodes.extend(int(v) for v in reached)
+            frontier = reached
+
+        edges = []
+        for u in nodes:
+            neighbors, weights = self.row(u)
+            inside = (neighbors > u) & (depth[neighbors] >= 0)
+            edges.extend((u, int(v), int(w)) for v, w in zip(neighbors[inside], weights[inside]))
+        return {u: int(depth[u]) for u in nodes}, edges
+
+    def shortest_path(self, source, target):
+        # Fewest hops between two node indices, or None
+        if source == target:
+            return [source]
+        parent = np.full(len(self), -1, dtype=np.int64)
+        parent[source] = source
+        frontier = np.array([source])
+        while len(frontier):
+            starts, ends = self.offsets[frontier], self.offsets[frontier + 1]
+            reached = np.concatenate([self.neighbors[s:e] for s, e in zip(starts, ends)])
+            owners = np.repeat(frontier, ends - starts)
+            fresh = parent[reached] < 0
+            reached, owners = reached[fresh], owners[fresh]
+            reached, first = np.unique(reached, return_index=True)
+            parent[reached] = owners[first]
+            if parent[target] >= 0:
+                path = [target]
+                while path[-1] != source:
+                    path.append(int(parent[path[-1]]))
+                return path[::-1]
+            frontier = reached
+        return None
+
+    def to_scipy(self):
+        # Zero-copy for offsets/neighbors/weights
+        import scipy.sparse as sp
+        n = len(self)
+        return sp.csr_matrix((self.weights, self.neighbors, self.offsets), shape=(n, n), copy=False)
+
+def load_csr(path=CSR_PATH):
+    # The CSR copy when it exists and matches the graph store, else None
+    try:
+        csr = CollabCSR(path)
+    except (OSError, ValueError):
+        return None
+    store = collab_graph_store.load_store()
+    if store and store["watermark"] != csr.meta["watermark"]:
+        return None
+    return csr
+
+def _resolve(csr, actor):
+    # Node index for an actor name, or "#<star id>" when names collide;
+    # prints why and returns None when there is no single match
+    if actor.startswith("#") and actor[1:].isdigit():
+        try:
+            return csr.index_of(int(actor[1:]))
+        except KeyError:
+            print(f"❌ Star ID not found in the graph: {actor[1:]}")
+            return None
+
+    matches = csr.indices_of_name(actor)
+    if not matches:
+        print(f"❌ Actor not found in the graph: {actor}")
+        return None
+    if len(matches) > 1:
+        print(f"⚠️ {len(matches)} actors are named {actor}. Pick one by star ID:")
+        for i in matches:
+            print(f"  - #{int(csr.star_ids[i])} ({int(csr.offsets[i + 1] - csr.offsets[i])} collaborators)")
+        return None
+    return matches[0]
+
+def main(actor=None, top=10, path_to=None, ego=None, path=CSR_PATH, full=False):
+    if actor is None:
+        try:
+            meta = build_csr(path, full=full)
+        except psycopg.Error as e:
+            print("❌ Graph refresh failed.")
+            print("Error:", e)
+            return
+        print(f"✅ CSR graph written to {path}/: {meta['nodes']:,} actors, {meta['edges']:,} edges "
+              f"(watermark {meta['watermark']})")
+        return
+
+    try:
+        csr = CollabCSR(path)
+    except (OSError, ValueError):
+        print(f"❌ No CSR graph at {path}/. Run 'python movies.py csr' first.")
+        return
+    i = _resolve(csr, actor)
+    if i is None:
+        return
+
+    if path_to:
+        target = _resolve(csr, path_to)
+        if target is None:
+            return
+        path_nodes = csr.shortest_path(i, target)
+        if path_nodes is None:
+            print(f"⚠️ {actor} and {path_to} are not connected.")
+        else:
+            print(f"\n🔗 {len(path_nodes) - 1} step(s): " + " → ".join(csr.names[n] for n in path_nodes))
+        return
+
+    if ego:
+        nodes, edges = csr.ego_graph(i, radius=ego)
+        print(f"\n🕸️ {actor} within {ego} step(s): {len(nodes) - 1:,} actors, {len(edges):,} edges")
+        for hops in range(1, ego + 1):
+            print(f"  - {hops} step(s): {sum(1 for d in nodes.values() if d == hops):,} actors")
+        return
+
+    print(f"\n🤝 Top {top} collaborators of {actor}:")
+    for j, shared in csr.top_collaborators(i, top):
+        print(f"  - {csr.names[j]}: {shared} movie(s)")
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,221 @@
+import os
+import pickle
+import sys
+import time
+import psycopg
+from db_connections import BACKEND, connect_read
+import change_counters
+import perf_phases
+import parallel_pair_counts
+
+# Persisted co-appearance graph, refreshed incrementally.
+#
+# The store keeps edge weights keyed by (star_id, star_id) plus the highest
+# appearances.id already folded in (the watermark). A refresh only counts
+# pairs that involve appearances above the watermark, so the work is
+# proportional to the new edits. Whether that is safe is decided from the
+# trigger-maintained change counters (change_counters.py), read in the same
+# snapshot as the rows: any update or delete of appearances (including
+# cascaded star/movie deletes), or a new row that committed below the
+# watermark, rebuilds the graph from scratch. Names are fetched only for
+# stars new to the graph, or all of them again after a star was updated or
+# deleted. Without the counters every refresh is a full rebuild.
+
+GRAPH_STORE_PATH = os.getenv("MOVIES_GRAPH_STORE", "collab_graph.pkl")
+STORE_VERSION = 3
+
+GRAPH_COUNTERS = (
+    "appearances.insert", "appearances.update", "appearances.delete",
+    "stars.update", "stars.delete",
+)
+REBUILD_ON = ("appearances.update", "appearances.delete")
+RENAME_ON = ("stars.update", "stars.delete")
+
+FULL_PAIRS_SQL = """
+    SELECT a1.star_id, a2.star_id, COUNT(*) AS shared_movies
+    FROM appearances a1
+    JOIN appearances a2
+        ON a1.movie_id = a2.movie_id AND a1.star_id < a2.star_id
+    WHERE a1.id <= %(high)s AND a2.id <= %(high)s
+    GROUP BY a1.star_id, a2.star_id;
+"""
+
+# Pairs gained by appearances in (low, high]. A pair where both sides are
+# new is counted once, from the side with the larger id.
+DELTA_PAIRS_SQL = """
+    WITH new AS (
+        SELECT id, movie_id, star_id
+        FROM appearances
+        WHERE id > %(low)s AND id <= %(high)s
+    )
+    SELECT LEAST(n.star_id, a.star_id), GREATEST(n.star_id, a.star_id), COUNT(*)
+    FROM new n
+    JOIN appearances a
+        ON a.movie_id = n.movie_id AND a.star_id <> n.star_id
+    WHERE a.id <= %(low)s OR (a.id > %(low)s AND a.id < n.id)
+    GROUP BY 1, 2;
+"""
+
+
+def load_store(path=GRAPH_STORE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        store = pickle.load(f)
+    return store if store.get("version") == STORE_VERSION else None
+
+@perf_phases.timed("save")
+def save_store(store, path=GRAPH_STORE_PATH):
+    # Write then rename so a crash never leaves a half-written store
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(store, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+def _fetch_names(cur, star_ids=None):
+    # All names, or only those of star_ids
+    if star_ids is None:
+        cur.execute("SELECT id, actor_name FROM stars;")
+    else:
+        cur.execute("SELECT id, actor_name FROM stars WHERE id = ANY(%s);", (list(star_ids),))
+    return dict(cur.fetchall())
+
+def _current_counters(cur):
+    # GRAPH_COUNTERS, or None when they are not installed. The DuckDB copy
+    # only changes on sync-local, so its sync time stands in for them.
+    if BACKEND == "duckdb":
+        cur.execute("SELECT CAST(synced_at AS VARCHAR) FROM sync_info;")
+        return {"synced_at": cur.fetchone()[0]}
+    if not change_counters.installed(cur):
+        return None
+    counters = change_counters.read_counters(cur, ("stars", "appearances"))
+    return {key: counters[key] for key in GRAPH_COUNTERS}
+
+def _plan(cur, store, counters):
+    # (mode, high, new appearances) as in change_counters.refresh_plan()
+    watermark = store["watermark"] if store else 0
+    seen = store["counters"] if store else None
+    if counters is not None and "synced_at" not in counters:
+        return change_counters.refresh_plan(cur, "appearances", watermark, seen, counters, REBUILD_ON)
+
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM appearances;")
+    high = cur.fetchone()[0]
+    if counters is not None and counters == seen:
+        return "unchanged", high, 0
+    return "full", high, None
+
+def _rebuild(cur, high, counters):
+    edges = {}
+    if parallel_pair_counts.PAIR_SHARDS > 1:
+        pairs = parallel_pair_counts.count_pairs(max_id=high)
+    else:
+        cur.execute(FULL_PAIRS_SQL, {"high": high})
+        pairs = cur
+    for star_1, star_2, shared in pairs:
+        edges[(star_1, star_2)] = shared
+
+    return {
+        "version": STORE_VERSION,
+        "watermark": high,
+        "counters": counters,
+        "edges": edges,
+        "names": _fetch_names(cur),
+        "refreshed_at": time.time(),
+    }
+
+def refresh_store(path=GRAPH_STORE_PATH, full=False):
+    # Returns (store, stats) where stats["mode"] is "full", "delta", "renamed"
+    # or "unchanged"; stats["counters"] is False without change counters
+    store = None if full else load_store(path)
+
+    with connect_read() as conn:
+        with conn.cursor() as cur:
+            if BACKEND != "duckdb":
+                # Counters, watermark check and pairs from one snapshot
+                cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ;")
+            counters = _current_counters(cur)
+            mode, high, new_appearances = _plan(cur, store, counters)
+
+            if mode == "full":
+                store = _rebuild(cur, high, counters)
+                cur.execute("SELECT COUNT(*) FROM appearances WHERE id <= %s;", (high,))
+                stats = {"mode": "full", "new_appearances": cur.fetchone()[0], "edges_changed": len(store["edges"])}
+            else:
+                edges = store["edges"]
+                new_stars = set()
+                changed = 0
+                if mode == "delta":
+                    cur.execute(DELTA_PAIRS_SQL, {"low": store["watermark"], "high": high})
+                    for star_1, star_2, shared in cur:
+                        if (star_1, star_2) not in edges:
+                            new_stars.update((star_1, star_2))
+                        edges[(star_1, star_2)] = edges.get((star_1, star_2), 0) + shared
+                        changed += 1
+
+                if any(counters.get(key) != store["counters"].get(key) for key in RENAME_ON):
+                    store["names"] = _fetch_names(cur)
+                    if mode == "unchanged":
+                        mode = "renamed"
+                else:
+                    new_stars.difference_update(store["names"])
+                    if new_stars:
+                        store["names"].update(_fetch_names(cur, new_stars))
+
+                store["watermark"] = high
+                store["counters"] = counters
+                store["refreshed_at"] = time.time()
+                stats = {"mode": mode, "new_appearances": new_appearances, "edges_changed": changed}
+
+    stats["counters"] = counters is not None
+    if stats["mode"] != "unchanged":
+        save_store(store, path)
+    return store, stats
+
+def named_pairs(store):
+    # Same shape as fetch_actor_pairs(): (actor_1, actor_2, shared_movies),
+    # merged by name like the original GROUP BY actor_name query
+    names = store["names"]
+    merged = {}
+    for (star_1, star_2), shared in store["edges"].items():
+        name_1, name_2 = names.get(star_1), names.get(star_2)
+        if name_1 is None or name_2 is None or name_1 == name_2:
+            continue
+        key = (name_1, name_2) if name_1 < name_2 else (name_2, name_1)
+        merged[key] = merged.get(key, 0) + shared
+
+    return sorted(
+        ((a, b, shared) for (a, b), shared in merged.items()),
+        key=lambda row: -row[2],
+    )
+
+def fetch_actor_pairs(path=GRAPH_STORE_PATH):
+    try:
+        store, stats = refresh_store(path)
+    except psycopg.Error as e:
+        print("❌ Graph refresh failed.")
+        print("Error:", e)
+        return []
+
+    print(f"🗂️ Collaboration graph: {stats['mode']} refresh, "
+          f"{stats['new_appearances']:,} appearances processed, {stats['edges_changed']:,} edges updated.")
+    return named_pairs(store)
+
+def main(full=False, path=GRAPH_STORE_PATH):
+    started = time.perf_counter()
+    try:
+        store, stats = refresh_store(path, full=full)
+    except psycopg.Error as e:
+        print("❌ Graph refresh failed.")
+        print("Error:", e)
+        return
+
+    print(f"✅ {stats['mode'].capitalize()} refresh in {time.perf_counter() - started:.2f}s")
+    print(f"  - appearances processed: {stats['new_appearances']:,}")
+    print(f"  - edges updated: {stats['edges_changed']:,}")
+    print(f"  - graph: {len(store['names']):,} actors, {len(store['edges']):,} edges (watermark {store['watermark']})")
+    if not stats["counters"]:
+        print("ℹ️ Change counters are not installed, so every refresh rebuilds the graph. "
+              "Install them with: python movies.py change-counters")
+
+if __name__ == "__main__":
+    main(full="--full" in sys.argv[1:])
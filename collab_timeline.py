@@ -0,0 +1,397 @@
+import json
+import sys
+import time
+import psycopg
+import matplotlib.pyplot as plt
+from db_connections import BACKEND, connect_read, connect_write, record_write
+import change_counters
+import perf_phases
+
+# Era-aware collaboration counts, kept in two tables:
+#
+#   collab_pair_years  (star_1, star_2, release_year) -> movies shared that
+#                      year; the per-year deltas of the collaboration graph
+#   actor_years        per actor and year: movies, shared credits and new
+#                      collaborators (first year the pair worked together),
+#                      plus running totals of all three up to that year
+#
+# A window such as 1990-2005 is answered from these instead of rescanning
+# appearances: actor totals are the running total at the window's end minus
+# the one just before it, pair counts are a sum over the pair's year rows.
+#
+# Like the graph store (collab_graph_store.py), a refresh only folds in
+# appearances above the stored watermark. What changed since the last
+# refresh comes from the change counters (change_counters.py): new
+# appearances are folded in; deleted or updated appearances, deleted movies
+# and changed release years rebuild everything. A query first compares the
+# counters with the stored ones (a read, no locks); only when they differ
+# does it refresh.
+
+SETUP_SQL = """
+    CREATE TABLE IF NOT EXISTS collab_pair_years (
+        star_1 INT NOT NULL,
+        star_2 INT NOT NULL,
+        release_year INT NOT NULL,
+        shared INT NOT NULL,
+        PRIMARY KEY (star_1, star_2, release_year)
+    );
+    CREATE INDEX IF NOT EXISTS collab_pair_years_year_idx ON collab_pair_years (release_year);
+    -- star_1 lookups use the primary key; delta refreshes also filter on star_2
+    CREATE INDEX IF NOT EXISTS collab_pair_years_star_2_idx ON collab_pair_years (star_2, release_year);
+
+    CREATE TABLE IF NOT EXISTS actor_years (
+        star_id INT NOT NULL,
+        release_year INT NOT NULL,
+        movies INT NOT NULL,
+        shared INT NOT NULL,
+        new_collaborators INT NOT NULL,
+        total_movies INT NOT NULL,
+        total_shared INT NOT NULL,
+        total_collaborators INT NOT NULL,
+        PRIMARY KEY (star_id, release_year)
+    );
+
+    CREATE TABLE IF NOT EXISTS collab_timeline_state (
+        singleton BOOLEAN PRIMARY KEY DEFAULT true CHECK (singleton),
+        watermark INT NOT NULL,
+        counters JSONB,
+        refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    ALTER TABLE collab_timeline_state
+        ADD COLUMN IF NOT EXISTS counters JSONB,
+        DROP COLUMN IF EXISTS appearance_count,
+        DROP COLUMN IF EXISTS appearance_sum;
+"""
+
+FULL_PAIR_YEARS_SQL = """
+    INSERT INTO collab_pair_years (star_1, star_2, release_year, shared)
+    SELECT a1.star_id, a2.star_id, m.release_year, COUNT(*)
+    FROM appearances a1
+    JOIN appearances a2
+        ON a1.movie_id = a2.movie_id AND a1.star_id < a2.star_id
+    JOIN movies m ON m.id = a1.movie_id
+    WHERE a1.id <= %(high)s AND a2.id <= %(high)s AND m.release_year IS NOT NULL
+    GROUP BY 1, 2, 3;
+"""
+
+# Same pairing rule as collab_graph_store.DELTA_PAIRS_SQL, split by year
+DELTA_PAIR_YEARS_SQL = """
+    WITH new AS (
+        SELECT id, movie_id, star_id
+        FROM appearances
+        WHERE id > %(low)s AND id <= %(high)s
+    )
+    INSERT INTO collab_pair_years (star_1, star_2, release_year, shared)
+    SELECT LEAST(n.star_id, a.star_id), GREATEST(n.star_id, a.star_id), m.release_year, COUNT(*)
+    FROM new n
+    JOIN appearances a
+        ON a.movie_id = n.movie_id AND a.star_id <> n.star_id
+    JOIN movies m ON m.id = n.movie_id
+    WHERE (a.id <= %(low)s OR (a.id > %(low)s AND a.id < n.id)) AND m.release_year IS NOT NULL
+    GROUP BY 1, 2, 3
+    ON CONFLICT (star_1, star_2, release_year)
+    DO UPDATE SET shared = collab_pair_years.shared + EXCLUDED.shared;
+"""
+
+# Actors whose yearly rows change when appearances in (low, high] arrive:
+# the new credits themselves and everyone they now share a movie with
+TOUCHED_SQL = """
+    CREATE TEMP TABLE timeline_touched ON COMMIT DROP AS
+    SELECT star_id FROM appearances WHERE id > %(low)s AND id <= %(high)s
+    UNION
+    SELECT a.star_id
+    FROM appearances n
+    JOIN appearances a ON a.movie_id = n.movie_id
+    WHERE n.id > %(low)s AND n.id <= %(high)s AND a.id <= %(high)s;
+"""
+
+# {only} limits the rebuild to timeline_touched (empty for a full rebuild)
+ACTOR_YEARS_SQL = """
+    WITH sides AS (
+        SELECT star_1 AS star_id, star_2 AS other, release_year, shared
+        FROM collab_pair_years WHERE true {only_1}
+        UNION ALL
+        SELECT star_2, star_1, release_year, shared
+        FROM collab_pair_years WHERE true {only_2}
+    ),
+    per_year AS (
+        SELECT star_id, release_year,
+               SUM(movies) AS movies, SUM(shared) AS shared, SUM(new) AS new_collaborators
+        FROM (
+            SELECT a.star_id, m.release_year, 1 AS movies, 0 AS shared, 0 AS new
+            FROM appearances a
+            JOIN movies m ON m.id = a.movie_id
+            WHERE a.id <= %(high)s AND m.release_year IS NOT NULL {only_a}
+            UNION ALL
+            SELECT star_id, release_year, 0, shared, 0 FROM sides
+            UNION ALL
+            SELECT star_id, MIN(release_year), 0, 0, 1 FROM sides GROUP BY star_id, other
+        ) contributions
+        GROUP BY star_id, release_year
+    )
+    INSERT INTO actor_years
+    SELECT star_id, release_year, movies, shared, new_collaborators,
+           SUM(movies) OVER running, SUM(shared) OVER running, SUM(new_collaborators) OVER running
+    FROM per_year
+    WINDOW running AS (PARTITION BY star_id ORDER BY release_year);
+"""
+
+ONLY_TOUCHED = "AND {column} IN (SELECT star_id FROM timeline_touched)"
+
+# Window totals per actor from the running totals: two index lookups per
+# actor instead of summing every year in the window
+WINDOW_ACTORS_SQL = """
+    WITH upto AS (
+        SELECT DISTINCT ON (star_id) star_id, total_movies, total_shared
+        FROM actor_years
+        WHERE release_year <= %(year_to)s
+        ORDER BY star_id, release_year DESC
+    ),
+    before AS (
+        SELECT DISTINCT ON (star_id) star_id, total_movies, total_shared
+        FROM actor_years
+        WHERE release_year < %(year_from)s
+        ORDER BY star_id, release_year DESC
+    ),
+    ranked AS (
+        SELECT upto.star_id,
+               upto.total_movies - COALESCE(before.total_movies, 0) AS movies,
+               upto.total_shared - COALESCE(before.total_shared, 0) AS shared
+        FROM upto
+        LEFT JOIN before USING (star_id)
+        ORDER BY shared DESC, movies DESC
+        LIMIT %(limit)s
+    )
+    SELECT s.actor_name, r.movies, r.shared, collaborators.n
+    FROM ranked r
+    JOIN stars s ON s.id = r.star_id
+    CROSS JOIN LATERAL (
+        SELECT COUNT(DISTINCT CASE WHEN p.star_1 = r.star_id THEN p.star_2 ELSE p.star_1 END) AS n
+        FROM collab_pair_years p
+        WHERE (p.star_1 = r.star_id OR p.star_2 = r.star_id)
+          AND p.release_year BETWEEN %(year_from)s AND %(year_to)s
+    ) collaborators
+    WHERE r.shared > 0
+    ORDER BY r.shared DESC, r.movies DESC, s.actor_name;
+"""
+
+WINDOW_PAIRS_SQL = """
+    SELECT s1.actor_name, s2.actor_name, p.shared
+    FROM (
+        SELECT star_1, star_2, SUM(shared) AS shared
+        FROM collab_pair_years
+        WHERE release_year BETWEEN %(year_from)s AND %(year_to)s
+        GROUP BY star_1, star_2
+        ORDER BY shared DESC
+        LIMIT %(limit)s
+    ) p
+    JOIN stars s1 ON s1.id = p.star_1
+    JOIN stars s2 ON s2.id = p.star_2
+    ORDER BY p.shared DESC, s1.actor_name, s2.actor_name;
+"""
+
+# {period} is release_year or its decade
+ACTOR_GROWTH_SQL = """
+    SELECT {period} AS period,
+           SUM(y.movies), SUM(y.shared), SUM(y.new_collaborators),
+           SUM(SUM(y.new_collaborators)) OVER (ORDER BY {period})
+    FROM actor_years y
+    JOIN stars s ON s.id = y.star_id
+    WHERE s.actor_name = %(actor)s
+    GROUP BY period
+    ORDER BY period;
+"""
+
+PERIODS = {"year": "y.release_year", "decade": "(y.release_year / 10) * 10"}
+
+
+# Counters the timeline depends on; any change but a new appearance
+# needs a full rebuild
+TIMELINE_COUNTERS = ("appearances.insert", "appearances.update", "appearances.delete",
+                     "movies.delete", "movies.release_year")
+REBUILD_ON = TIMELINE_COUNTERS[1:]
+
+def _state(cur):
+    # (watermark, counters at the last refresh or None)
+    cur.execute("SELECT watermark, counters FROM collab_timeline_state;")
+    return cur.fetchone() or (0, None)
+
+def _current_counters(cur):
+    counters = change_counters.read_counters(cur, ("movies", "appearances"))
+    return {key: counters[key] for key in TIMELINE_COUNTERS}
+
+def timeline_is_current(cur):
+    # Reads only: no DDL, locks or writes when nothing changed
+    cur.execute("SELECT to_regclass('collab_timeline_state') IS NOT NULL;")
+    if not cur.fetchone()[0] or not change_counters.installed(cur):
+        return False
+    return _state(cur)[1] == _current_counters(cur)
+
+def refresh_timeline(full=False):
+    # Returns stats with "mode": "full", "delta" or "unchanged"
+    unchanged = {"mode": "unchanged", "new_appearances": 0, "actors_updated": 0}
+    with connect_write() as conn:
+        if not full:
+            with conn.cursor() as cur:
+                current = timeline_is_current(cur)
+            conn.commit()
+            if current:
+                return unchanged
+
+        change_counters.ensure_installed(conn)
+        with conn.cursor() as cur:
+            cur.execute(SETUP_SQL)
+        conn.commit()
+
+        with conn.cursor() as cur:
+            # The counters and the rows they describe come from one snapshot.
+            # One refresh at a time; the lock is taken before the snapshot,
+            # so it includes whatever the refresh we waited for wrote.
+            # Readers keep seeing the last committed state.
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ;")
+            cur.execute("LOCK TABLE collab_timeline_state IN SHARE ROW EXCLUSIVE MODE;")
+            watermark, seen = _state(cur)
+            counters = _current_counters(cur)
+            mode, high, new_rows = change_counters.refresh_plan(
+                cur, "appearances", watermark, None if full else seen, counters, REBUILD_ON
+            )
+
+            if mode == "full":
+                cur.execute("TRUNCATE collab_pair_years, actor_years;")
+                cur.execute(FULL_PAIR_YEARS_SQL, {"high": high})
+                cur.execute(ACTOR_YEARS_SQL.format(only_1="", only_2="", only_a=""), {"high": high})
+                stats = {"mode": "full", "new_appearances": None, "actors_updated": cur.rowcount}
+
+            elif mode == "delta":
+                params = {"low": watermark, "high": high}
+                cur.execute(DELTA_PAIR_YEARS_SQL, params)
+                cur.execute(TOUCHED_SQL, params)
+                cur.execute("DELETE FROM actor_years WHERE star_id IN (SELECT star_id FROM timeline_touched);")
+                cur.execute(ACTOR_YEARS_SQL.format(
+                    only_1=ONLY_TOUCHED.format(column="star_1"),
+                    only_2=ONLY_TOUCHED.format(column="star_2"),
+                    only_a=ONLY_TOUCHED.format(column="a.star_id"),
+                ), params)
+                stats = {"mode": "delta", "new_appearances": new_rows, "actors_updated": cur.rowcount}
+
+            else:
+                stats = unchanged
+
+            cur.execute("""
+                INSERT INTO collab_timeline_state (watermark, counters, refreshed_at)
+                VALUES (%s, %s::jsonb, now())
+                ON CONFLICT (singleton) DO UPDATE
+                SET watermark = EXCLUDED.watermark,
+                    counters = EXCLUDED.counters,
+                    refreshed_at = EXCLUDED.refreshed_at;
+            """, (high, json.dumps(counters)))
+        conn.commit()
+        record_write(conn)
+    return stats
+
+def _year_span(cur, year_from, year_to):
+    if year_from is not None and year_to is not None:
+        return year_from, year_to
+    cur.execute("SELECT MIN(release_year), MAX(release_year) FROM actor_years;")
+    first, last = cur.fetchone()
+    return (first if year_from is None else year_from), (last if year_to is None else year_to)
+
+def window_summary(year_from=None, year_to=None, limit=10):
+    # (year_from, year_to, [(actor, movies, shared credits, collaborators)],
+    #  [(actor, actor, shared movies)]) for the window
+    with connect_read(read_your_writes=True) as conn:
+        with conn.cursor() as cur:
+            year_from, year_to = _year_span(cur, year_from, year_to)
+            params = {"year_from": year_from, "year_to": year_to, "limit": limit}
+            cur.execute(WINDOW_ACTORS_SQL, params)
+            actors = cur.fetchall()
+            cur.execute(WINDOW_PAIRS_SQL, params)
+            pairs = cur.fetchall()
+    return year_from, year_to, actors, pairs
+
+@perf_phases.timed("fetch")
+def actor_growth(actor, by="year"):
+    # [(period, movies, shared credits, new collaborators, collaborators so far)]
+    with connect_read(read_your_writes=True) as conn:
+        with conn.cursor() as cur:
+            period = PERIODS[by]
+            cur.execute(ACTOR_GROWTH_SQL.format(period=period), {"actor": actor})
+            return cur.fetchall()
+
+@perf_phases.timed("render")
+def plot_collaborator_growth(growth, year_from=None, year_to=None, by="year"):
+    # growth: {actor: actor_growth rows}
+    fig, ax = plt.subplots(figsize=(11, 6))
+    single = len(growth) == 1
+    for actor, rows in growth.items():
+        periods = [row[0] for row in rows]
+        line = ax.step(periods, [row[4] for row in rows], where="post", linewidth=2, label=actor)[0]
+        if single:
+            ax.bar(periods, [row[3] for row in rows], width=8 if by == "decade" else 0.8,
+                   color=line.get_color(), alpha=0.3, label="new collaborators")
+
+    if year_from is not None or year_to is not None:
+        ax.set_xlim(left=year_from, right=year_to)
+    ax.set_xlabel("Decade" if by == "decade" else "Year")
+    ax.set_ylabel("Collaborators")
+    ax.set_title("Collaborator network growth")
+    ax.grid(axis="y", linestyle="--", alpha=0.5)
+    ax.legend()
+    fig.tight_layout()
+    perf_phases.show()
+
+@perf_phases.profiled("collab_timeline")
+def main(actors=None, year_from=None, year_to=None, by="year", top=10, full=False, chart=False):
+    if BACKEND == "duckdb":
+        # The timeline tables live on the server and are not synced locally
+        print("❌ The collaboration timeline is not supported on the local backend (MOVIES_BACKEND=duckdb).")
+        return
+    started = time.perf_counter()
+    try:
+        stats = refresh_timeline(full)
+    except psycopg.Error as e:
+        print("❌ Timeline refresh failed.")
+        print("Error:", e)
+        return
+    if stats["mode"] == "full":
+        print(f"🗂️ Timeline: full refresh, {stats['actors_updated']:,} actor-years written "
+              f"in {time.perf_counter() - started:.2f}s")
+    elif stats["mode"] == "delta":
+        print(f"🗂️ Timeline: delta refresh, {stats['new_appearances']:,} appearances processed, "
+              f"{stats['actors_updated']:,} actor-years written in {time.perf_counter() - started:.2f}s")
+
+    try:
+        if not actors:
+            year_from, year_to, top_actors, top_pairs = window_summary(year_from, year_to, top)
+            if year_from is None or year_to is None:
+                print("No dated collaborations yet.")
+                return
+            print(f"\n🎬 {year_from}–{year_to}: most connected actors")
+            for name, movies, shared, collaborators in top_actors:
+                print(f"  - {name}: {shared} shared credits with {collaborators} collaborators over {movies} movie(s)")
+            print(f"\n🤝 {year_from}–{year_to}: strongest pairs")
+            for name_1, name_2, shared in top_pairs:
+                print(f"  - {name_1} & {name_2}: {shared} movie(s)")
+            return
+
+        growth = {}
+        for actor in actors:
+            rows = actor_growth(actor, by)
+            if not rows:
+                print(f"⚠️ No dated movies for {actor}.")
+                continue
+            growth[actor] = rows
+            print(f"\n📅 {actor} by {by}:")
+            for period, movies, shared, new, total in rows:
+                if (year_from is None or period >= year_from) and (year_to is None or period <= year_to):
+                    print(f"  {period}: {movies} movie(s), {new} new collaborator(s), {total} in total")
+    except psycopg.Error as e:
+        print("❌ Failed to query the timeline.")
+        print("Error:", e)
+        return
+
+    if chart and growth:
+        plot_collaborator_growth(growth, year_from, year_to, by)
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or None)
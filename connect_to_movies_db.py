@@ -1,6 +1,7 @@
 import os
 import psycopg
 from dotenv import load_dotenv
+from db_diagnostics import test_connection_and_list_tables
 
 # Load values from .env file
 load_dotenv()
@@ -13,58 +14,37 @@ DB_CONNECTION = {
     "port": os.getenv("PGPORT", "5432"),
 }
 
-def test_connection_and_list_tables():
-    try:
-        # Connect to the database
-        with psycopg.connect(**DB_CONNECTION) as conn:
-    
-            with conn.cursor() as cur:
-                # Run quick test query
-                cur.execute("SELECT version();")
-                version = cur.fetchone()[0]
-                print("Connection successful!")
-                print("PostgreSQL version:", version)
-
-                # List tables
-                cur.execute("""
-                            SELECT table_name
-                            FROM information_schema.tables
-                            WHERE table_schema = 'public'
-                            AND table_type = 'BASE TABLE';
-                            """)
-                
-                tables = cur.fetchall()
-                print("Tables in the database:")
-                for table in tables:
-                    print("-", table[0])
-        return True
-
-    except psycopg.Error as e:
-        print("Connection failed.")
-        print("Error:", e)
-
 def insert_into_database(movie_title, release_year, star_name):
 
     with psycopg.connect(**DB_CONNECTION) as conn:
 
         with conn.cursor() as cur:
-            cur.execute(
-                "INSERT INTO movies (title, release_year) VALUES (%s, %s) RETURNING id",
-                (movie_title, release_year)
-            )
-
-            # Get the ID of the inserted row
-            movies_inserted_id = cur.fetchone()[0]
-            print("Inserted row ID in movies db:", movies_inserted_id)
-
-            cur.execute(
-                "INSERT INTO stars (actor_name) VALUES (%s) RETURNING id",
-                (star_name)
-            )
-
-            # Get the ID of the inserted row
-            stars_inserted_id = cur.fetchone()[0]
-            print("Inserted in row ID in stars db:", stars_inserted_id)
+            # ON CONFLICT DO NOTHING on the unique keys (see unique_keys.py):
+            # safe to run again, or alongside other writers
+            cur.execute("""
+                INSERT INTO movies (title, release_year) VALUES (%s, %s)
+                ON CONFLICT (title, release_year) DO NOTHING
+                RETURNING id
+            """, (movie_title, release_year))
+            row = cur.fetchone()
+            if row:
+                print("Inserted row ID in movies db:", row[0])
+            else:
+                cur.execute("SELECT id FROM movies WHERE title = %s AND release_year = %s",
+                            (movie_title, release_year))
+                print("Movie already in db, ID:", cur.fetchone()[0])
+
+            cur.execute("""
+                INSERT INTO stars (actor_name) VALUES (%s)
+                ON CONFLICT (actor_name) DO NOTHING
+                RETURNING id
+            """, (star_name,))
+            row = cur.fetchone()
+            if row:
+                print("Inserted in row ID in stars db:", row[0])
+            else:
+                cur.execute("SELECT id FROM stars WHERE actor_name = %s", (star_name,))
+                print("Star already in db, ID:", cur.fetchone()[0])
 
     # Commit the transaction
     conn.commit()
@@ -0,0 +1,113 @@
+import os
+import psycopg
+from dotenv import load_dotenv
+
+# Load values from .env file
+load_dotenv()
+
+# Primary (read-write) server
+DB_CONNECTION = {
+    "dbname": os.getenv("PGDATABASE", "Movies"),
+    "user": os.getenv("PGUSER", "postgres"),
+    "password": os.getenv("PGPASSWORD", ""),
+    "host": os.getenv("PGHOST", "localhost"),
+    "port": os.getenv("PGPORT", "5432"),
+}
+
+# Optional read replica(s). PGREAD_HOST may list several hosts
+# ("replica1,replica2"); libpq then picks a standby among them.
+# Without PGREAD_HOST every read goes to the primary.
+DB_READ_CONNECTION = {
+    "dbname": os.getenv("PGREAD_DATABASE", DB_CONNECTION["dbname"]),
+    "user": os.getenv("PGREAD_USER", DB_CONNECTION["user"]),
+    "password": os.getenv("PGREAD_PASSWORD", DB_CONNECTION["password"]),
+    "host": os.getenv("PGREAD_HOST", DB_CONNECTION["host"]),
+    "port": os.getenv("PGREAD_PORT", DB_CONNECTION["port"]),
+}
+
+READ_REPLICA_CONFIGURED = bool(os.getenv("PGREAD_HOST"))
+
+# Default bounded staleness for reads, in seconds (empty = any lag is fine)
+MAX_REPLICA_LAG = float(os.getenv("PGREAD_MAX_LAG")) if os.getenv("PGREAD_MAX_LAG") else None
+
+# MOVIES_PARTITIONED=1 once partition_migration.py has swapped in the
+# partitioned tables: lets read sessions join and aggregate partition by
+# partition (both settings are off by default in PostgreSQL)
+PARTITIONED = os.getenv("MOVIES_PARTITIONED") == "1"
+READ_SESSION_OPTIONS = (
+    {"options": "-c enable_partitionwise_join=on -c enable_partitionwise_aggregate=on"} if PARTITIONED else {}
+)
+
+# "postgres" (default) or "duckdb" for offline read-only analytics
+BACKEND = os.getenv("MOVIES_BACKEND", "postgres").lower()
+
+# WAL position of the last commit made through record_write() in this
+# process, used to give callers read-your-writes on the replica.
+_last_write_lsn = None
+
+
+def connect_write(**kwargs):
+    if READ_REPLICA_CONFIGURED:
+        kwargs.setdefault("target_session_attrs", "read-write")
+    return psycopg.connect(**DB_CONNECTION, **kwargs)
+
+def record_write(conn):
+    # Call after commit on a write connection; a no-op without a replica
+    global _last_write_lsn
+    if not READ_REPLICA_CONFIGURED:
+        return None
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_current_wal_lsn()::text;")
+        _last_write_lsn = cur.fetchone()[0]
+    conn.commit()
+    return _last_write_lsn
+
+def _replica_is_fresh(conn, max_lag, min_lsn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT
+                pg_is_in_recovery(),
+                CASE
+                    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                END,
+                %s::pg_lsn IS NULL OR pg_last_wal_replay_lsn() >= %s::pg_lsn
+        """, (min_lsn, min_lsn))
+        in_recovery, lag, caught_up = cur.fetchone()
+    conn.rollback()
+
+    if not in_recovery:
+        return True  # libpq fell back to a primary; it is never stale
+    if max_lag is not None and lag > max_lag:
+        return False
+    return caught_up
+
+def connect_read(max_lag=MAX_REPLICA_LAG, read_your_writes=False, min_lsn=None, **kwargs):
+    # With MOVIES_BACKEND=duckdb reads come from the local embedded copy
+    # (see local_backend.py) and never touch the server.
+    if BACKEND == "duckdb":
+        from local_backend import connect_local
+        return connect_local()
+
+    return connect_server_read(max_lag, read_your_writes, min_lsn, **kwargs)
+
+def connect_server_read(max_lag=MAX_REPLICA_LAG, read_your_writes=False, min_lsn=None, **kwargs):
+    # Read-only connection, routed to the replica when one is configured.
+    # max_lag bounds staleness in seconds; read_your_writes (or an explicit
+    # min_lsn) waits for nothing but falls back to the primary if the
+    # replica has not yet replayed this process's last recorded write.
+    if read_your_writes and min_lsn is None:
+        min_lsn = _last_write_lsn
+    kwargs = {**READ_SESSION_OPTIONS, **kwargs}
+
+    if READ_REPLICA_CONFIGURED:
+        conn = psycopg.connect(**DB_READ_CONNECTION, target_session_attrs="prefer-standby", **kwargs)
+        if (max_lag is None and min_lsn is None) or _replica_is_fresh(conn, max_lag, min_lsn):
+            conn.read_only = True
+            return conn
+        conn.close()
+
+    conn = psycopg.connect(**DB_CONNECTION, **kwargs)
+    conn.read_only = True
+    return conn
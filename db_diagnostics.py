@@ -0,0 +1,292 @@
+import json
+import re
+import statistics
+import sys
+import time
+import psycopg
+from db_connections import connect_write, connect_server_read, READ_REPLICA_CONFIGURED
+
+# What to look at first when the database gets slow:
+#
+#   latency   connection setup and SELECT 1 round trips (primary, and the
+#             read replica when one is configured)
+#   tables    size, row estimates, dead rows, sequential vs index scans and
+#             last (auto)vacuum/analyze for movies, stars and appearances;
+#             partitions are rolled up into their parent
+#   indexes   size and scan counts; unused non-unique indexes are flagged
+#   bloat     dead-row share, plus an estimate of wasted space from the
+#             planner's row count and average row width (no extension needed)
+#   missing   indexes the app's queries rely on, and tables read mostly by
+#             large sequential scans
+#
+# pg_stat counters are cumulative since the last stats reset, so compare two
+# runs rather than reading one in isolation.
+
+TABLES = ("movies", "stars", "appearances")
+
+# (table, leading column, what needs it)
+EXPECTED_INDEXES = (
+    ("appearances", "movie_id", "cast lookups and the co-appearance self-join"),
+    ("appearances", "star_id", "filmographies and star merges"),
+    ("stars", "actor_name", "name lookups during ingestion"),
+    ("movies", "title", "title lookups"),
+    ("movies", "release_year", "year filters in the charts"),
+)
+
+DEAD_ROW_WARN = 0.2
+BLOAT_WARN = 0.3
+BLOAT_MIN_BYTES = 8 * 1024 * 1024
+SEQ_SCAN_ROWS_WARN = 10_000
+
+TABLE_STATS_SQL = """
+    SELECT root.name,
+           COUNT(*) AS partitions,
+           SUM(pg_table_size(tree.relid))::bigint AS table_bytes,
+           SUM(pg_indexes_size(tree.relid))::bigint AS index_bytes,
+           SUM(GREATEST(c.reltuples, 0))::bigint AS estimated_rows,
+           SUM(s.n_live_tup)::bigint AS live_rows,
+           SUM(s.n_dead_tup)::bigint AS dead_rows,
+           SUM(s.seq_scan)::bigint AS seq_scans,
+           SUM(s.seq_tup_read)::bigint AS seq_rows_read,
+           SUM(s.idx_scan)::bigint AS index_scans,
+           MAX(GREATEST(s.last_vacuum, s.last_autovacuum)) AS last_vacuum,
+           MAX(GREATEST(s.last_analyze, s.last_autoanalyze)) AS last_analyze,
+           SUM(c.relpages)::bigint AS pages,
+           SUM(CEIL(GREATEST(c.reltuples, 0) * (COALESCE(w.row_width, 0) + 28)
+                    / (current_setting('block_size')::int - 24)))::bigint AS expected_pages
+    FROM unnest(%(tables)s::text[]) AS root(name)
+    CROSS JOIN LATERAL pg_partition_tree(to_regclass(root.name)) tree
+    JOIN pg_class c ON c.oid = tree.relid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_stat_user_tables s ON s.relid = tree.relid
+    LEFT JOIN LATERAL (
+        SELECT SUM(avg_width) AS row_width
+        FROM pg_stats
+        WHERE schemaname = n.nspname AND tablename = c.relname AND NOT inherited
+    ) w ON true
+    WHERE tree.isleaf
+    GROUP BY root.name
+    ORDER BY root.name;
+"""
+
+# Partition indexes are rolled up into the partitioned index they belong to
+INDEX_STATS_SQL = """
+    SELECT root.name,
+           COALESCE(pg_partition_root(ui.indexrelid), ui.indexrelid)::regclass::text AS index_name,
+           SUM(pg_relation_size(ui.indexrelid))::bigint AS bytes,
+           SUM(ui.idx_scan)::bigint AS scans,
+           SUM(ui.idx_tup_read)::bigint AS rows_read,
+           bool_or(ix.indisunique) AS is_unique
+    FROM unnest(%(tables)s::text[]) AS root(name)
+    CROSS JOIN LATERAL pg_partition_tree(to_regclass(root.name)) tree
+    JOIN pg_stat_user_indexes ui ON ui.relid = tree.relid
+    JOIN pg_index ix ON ix.indexrelid = ui.indexrelid
+    GROUP BY 1, 2
+    ORDER BY 1, 2;
+"""
+
+INDEX_DEFS_SQL = """
+    SELECT tablename, indexdef
+    FROM pg_indexes
+    WHERE schemaname = current_schema() AND tablename = ANY(%(tables)s);
+"""
+
+
+def test_connection_and_list_tables(connect=connect_write):
+    try:
+        with connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT version();")
+                version = cur.fetchone()[0]
+                print("\n✅ Connection successful!")
+                print("PostgreSQL version:", version)
+
+                cur.execute("""
+                    SELECT table_name
+                    FROM information_schema.tables
+                    WHERE table_schema = 'public'
+                    AND table_type = 'BASE TABLE';
+                """)
+                tables = cur.fetchall()
+
+                if tables:
+                    print("\n📋 Tables in the database:")
+                    for table in tables:
+                        print("  -", table[0])
+                else:
+                    print("\n⚠️ No tables found in the public schema.")
+            return True
+
+    except psycopg.Error as e:
+        print("\n❌ Connection failed.")
+        print("Error:", e)
+        return False
+
+def _percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+    return {
+        "min_ms": round(ordered[0], 2),
+        "median_ms": round(statistics.median(ordered), 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+def measure_latency(connect, samples=20, connects=3):
+    if samples < 1 or connects < 1:
+        raise ValueError("samples and connects must be at least 1")
+    connect_ms, round_trip_ms = [], []
+    for attempt in range(connects):
+        started = time.perf_counter()
+        conn = connect()
+        connect_ms.append((time.perf_counter() - started) * 1000)
+        if attempt < connects - 1:
+            conn.close()
+
+    with conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1;")  # first statement pays for any lazy setup
+            for _ in range(samples):
+                started = time.perf_counter()
+                cur.execute("SELECT 1;")
+                cur.fetchone()
+                round_trip_ms.append((time.perf_counter() - started) * 1000)
+            cur.execute("SELECT version(), pg_is_in_recovery(), inet_server_addr()::text;")
+            version, in_recovery, address = cur.fetchone()
+
+    return {
+        "server": address or "local socket",
+        "version": version.split(" on ")[0],
+        "standby": in_recovery,
+        "connect": _percentiles(connect_ms),
+        "round_trip": _percentiles(round_trip_ms),
+    }
+
+def _table_findings(table):
+    findings = []
+    live, dead = table["live_rows"] or 0, table["dead_rows"] or 0
+    if live + dead and dead / (live + dead) > DEAD_ROW_WARN and dead > 1000:
+        findings.append(f"{dead / (live + dead):.0%} of rows are dead; VACUUM is falling behind")
+
+    pages, expected = table["pages"] or 0, table["expected_pages"] or 0
+    if pages and table["table_bytes"] > BLOAT_MIN_BYTES and expected < pages * (1 - BLOAT_WARN):
+        findings.append(f"~{1 - expected / pages:.0%} estimated bloat; consider VACUUM FULL or pg_repack")
+
+    seq_scans, seq_rows = table["seq_scans"] or 0, table["seq_rows_read"] or 0
+    if seq_scans and seq_rows / seq_scans > SEQ_SCAN_ROWS_WARN and seq_scans > (table["index_scans"] or 0):
+        findings.append(f"{seq_scans:,} sequential scans averaging {seq_rows // seq_scans:,} rows "
+                        f"outnumber index scans")
+
+    if table["last_analyze"] is None:
+        findings.append("never analyzed; planner estimates are guesses")
+    return findings
+
+def _missing_indexes(cur):
+    cur.execute(INDEX_DEFS_SQL, {"tables": list(TABLES)})
+    # Only btree indexes serve the equality/range lookups listed in
+    # EXPECTED_INDEXES on the bare column; an index on lower(title), like
+    # title_search's trigram index, does not
+    leading = {}
+    for table, definition in cur.fetchall():
+        match = re.search(r"USING btree \((.+)\)", definition)
+        if match:
+            first = match.group(1).split(",")[0].strip()
+            leading.setdefault(table, set()).add(first.split(" ")[0])
+
+    missing = []
+    for table, column, reason in EXPECTED_INDEXES:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL, COALESCE(pg_get_partkeydef(to_regclass(%s)), '');",
+                    (table, table))
+        exists, partition_key = cur.fetchone()
+        # Range partitions on the column prune just as well as an index
+        range_key = partition_key.startswith("RANGE") and column in partition_key
+        if exists and column not in leading.get(table, ()) and not range_key:
+            missing.append({"table": table, "column": column, "reason": reason})
+    return missing
+
+def collect_diagnostics(samples=20):
+    report = {"latency": {"primary": measure_latency(connect_write, samples)}}
+    if READ_REPLICA_CONFIGURED:
+        report["latency"]["read"] = measure_latency(connect_server_read, samples)
+
+    with connect_write() as conn:
+        with conn.cursor() as cur:
+            cur.execute(TABLE_STATS_SQL, {"tables": list(TABLES)})
+            columns = [d.name for d in cur.description]
+            tables = [dict(zip(columns, row)) for row in cur.fetchall()]
+            for table in tables:
+                table["findings"] = _table_findings(table)
+
+            cur.execute(INDEX_STATS_SQL, {"tables": list(TABLES)})
+            columns = [d.name for d in cur.description]
+            indexes = [dict(zip(columns, row)) for row in cur.fetchall()]
+            for index in indexes:
+                index["unused"] = not index["is_unique"] and not index["scans"]
+
+            missing = _missing_indexes(cur)
+            cur.execute("SELECT stats_reset FROM pg_stat_database WHERE datname = current_database();")
+            stats_reset = cur.fetchone()[0]
+
+    report.update({"tables": tables, "indexes": indexes, "missing_indexes": missing, "stats_reset": stats_reset})
+    return report
+
+def _size(n):
+    n = float(n or 0)
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:,.0f} {unit}" if unit == "B" else f"{n:,.1f} {unit}"
+        n /= 1024
+    return f"{n:,.1f} TB"
+
+def print_diagnostics(report):
+    for role, latency in report["latency"].items():
+        standby = ", standby" if latency["standby"] else ""
+        print(f"\n⏱️ Latency ({role}: {latency['server']}{standby}, {latency['version']})")
+        for name in ("connect", "round_trip"):
+            p = latency[name]
+            print(f"  - {name.replace('_', ' ')}: median {p['median_ms']} ms, p95 {p['p95_ms']} ms, "
+                  f"min {p['min_ms']} ms, max {p['max_ms']} ms")
+
+    since = f" (counters since {report['stats_reset']:%Y-%m-%d %H:%M})" if report["stats_reset"] else ""
+    print(f"\n📊 Tables{since}")
+    for t in report["tables"]:
+        partitions = f", {t['partitions']} partitions" if t["partitions"] > 1 else ""
+        print(f"  {t['name']}: {_size(t['table_bytes'])} data + {_size(t['index_bytes'])} indexes{partitions}")
+        print(f"    ~{t['estimated_rows']:,} rows ({t['live_rows'] or 0:,} live, {t['dead_rows'] or 0:,} dead), "
+              f"{t['seq_scans'] or 0:,} seq scans, {t['index_scans'] or 0:,} index scans")
+        vacuumed = f"{t['last_vacuum']:%Y-%m-%d %H:%M}" if t["last_vacuum"] else "never"
+        analyzed = f"{t['last_analyze']:%Y-%m-%d %H:%M}" if t["last_analyze"] else "never"
+        print(f"    last vacuum {vacuumed}, last analyze {analyzed}")
+        for finding in t["findings"]:
+            print(f"    ⚠️ {finding}")
+
+    print("\n🗂️ Indexes")
+    for i in report["indexes"]:
+        flag = "  ⚠️ unused" if i["unused"] else ""
+        print(f"  - {i['name']}.{i['index_name']}: {_size(i['bytes'])}, {i['scans'] or 0:,} scans{flag}")
+
+    if report["missing_indexes"]:
+        print("\n🔎 Missing indexes")
+        for m in report["missing_indexes"]:
+            print(f"  ⚠️ {m['table']}({m['column']}): needed for {m['reason']}")
+    else:
+        print("\n✅ All expected indexes are present.")
+
+def main(samples=20, as_json=False):
+    if samples < 1:
+        print("❌ --samples must be at least 1.")
+        return
+
+    try:
+        report = collect_diagnostics(samples)
+    except psycopg.Error as e:
+        print("❌ Diagnostics failed.")
+        print("Error:", e)
+        return
+
+    if as_json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print_diagnostics(report)
+
+if __name__ == "__main__":
+    main(as_json="--json" in sys.argv[1:])
@@ -1,37 +1,20 @@
-import os
 import psycopg
-import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import math
-from dotenv import load_dotenv
+import movie_aggregates
 
-# Load values from .env file
-load_dotenv()
+# Longest title list drawn in a single box
+MAX_TITLES_PER_BOX = 40
 
-DB_CONNECTION = {
-    "dbname": os.getenv("PGDATABASE", "Movies"),
-    "user": os.getenv("PGUSER", "postgres"),
-    "password": os.getenv("PGPASSWORD", ""),
-    "host": os.getenv("PGHOST", "localhost"),
-    "port": os.getenv("PGPORT", "5432"),
-}
-
-def five_year_box_visual_colored():
+def five_year_box_visual_colored(year_from=None, year_to=None):
     try:
-        # Fetch movies
-        with psycopg.connect(**DB_CONNECTION) as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT title, release_year FROM movies ORDER BY release_year;")
-                movies = cur.fetchall()
-
-        # Prepare DataFrame
-        df = pd.DataFrame(movies, columns=["Title", "Year"])
-        df["IntervalStart"] = (df["Year"] // 5) * 5
-        df["Label"] = df["IntervalStart"].astype(str) + "–" + (df["IntervalStart"] + 4).astype(str)
-
-        grouped = df.groupby("Label")
-        intervals = sorted(grouped.groups.keys(), key=lambda x: int(x.split("–")[0]))
+        # Intervals and their title lists are grouped server-side
+        intervals = movie_aggregates.movies_by_interval(width=5, max_titles=MAX_TITLES_PER_BOX,
+                                                       year_from=year_from, year_to=year_to)
+        if not intervals:
+            print("⚠️ No data to display.")
+            return
         num_intervals = len(intervals)
 
         # Choose a color palette (soft pastel tones)
@@ -43,9 +26,9 @@ def five_year_box_visual_colored():
         fig, axes = plt.subplots(rows, cols, figsize=(16, rows * 4))
         axes = axes.flatten()
 
-        for idx, label in enumerate(intervals):
+        for idx, (interval_start, movie_count, movie_lines) in enumerate(intervals):
             ax = axes[idx]
-            group_df = grouped.get_group(label)
+            label = f"{interval_start}–{interval_start + 4}"
 
             color = colors[idx % len(colors)]
             ax.set_facecolor(color)
@@ -55,8 +38,9 @@ def five_year_box_visual_colored():
                                         facecolor=color, edgecolor='none', zorder=0)
             ax.add_patch(background)
 
-            movie_lines = [f"{row['Title']} ({row['Year']})" for _, row in group_df.iterrows()]
             text = "\n".join(movie_lines)
+            if movie_count > len(movie_lines):
+                text += f"\n… and {movie_count - len(movie_lines)} more"
             ax.text(0.01, 0.98, text, va='top', ha='left', fontsize=10, family="monospace", zorder=1)
 
             ax.set_title(label, fontsize=12, weight="bold")
@@ -0,0 +1,256 @@
+import json
+import re
+import sys
+import unicodedata
+import zlib
+from collections import defaultdict
+from itertools import combinations
+import psycopg
+from thefuzz import fuzz
+from db_connections import connect_write
+
+# Finds duplicate rows in `stars` without comparing every pair of names.
+# Each star gets a handful of blocking keys (normalised name, phonetic key,
+# min-hashed trigram bands) and only stars that share a key are compared.
+# Merging re-points `appearances` to one surviving star and deletes the
+# rest, all in a single transaction. Without --apply it only reports.
+#
+# A similar score alone is not enough: "Michael B. Jordan" and "Michael
+# Jordan" share a phonetic key and score ~93. Names must also have the same
+# number of words with the same initials. Union-find can still chain
+# A ~ B ~ C into one group where A and C do not match; such groups are
+# reported but never merged by --apply.
+
+SIMILARITY_THRESHOLD = 90
+MAX_BLOCK_SIZE = 200      # larger blocks are too generic to be useful
+MINHASH_BANDS = 4
+MINHASH_ROWS = 2
+
+
+def normalize_name(name):
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(ch for ch in name if not unicodedata.combining(ch))
+    name = re.sub(r"[^\w\s]", " ", name.lower())
+    return " ".join(name.split())
+
+def soundex(word):
+    codes = {
+        **dict.fromkeys("bfpv", "1"), **dict.fromkeys("cgjkqsxz", "2"),
+        **dict.fromkeys("dt", "3"), "l": "4", **dict.fromkeys("mn", "5"), "r": "6",
+    }
+    word = "".join(ch for ch in word if ch.isalpha())
+    if not word:
+        return ""
+
+    result = word[0].upper()
+    previous = codes.get(word[0], "")
+    for ch in word[1:]:
+        code = codes.get(ch, "")
+        if code and code != previous:
+            result += code
+        if ch not in "hw":
+            previous = code
+    return (result + "000")[:4]
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def blocking_keys(normalized):
+    tokens = normalized.split()
+    compact = "".join(tokens)
+    keys = {
+        ("exact", compact),                               # "Di Caprio" == "DiCaprio"
+        ("tokens", " ".join(sorted(tokens))),             # "Pacino Al" == "Al Pacino"
+    }
+    if len(tokens) >= 2:
+        keys.add(("phonetic", soundex(tokens[0]) + soundex(tokens[-1])))
+
+    # Min-hash bands over character trigrams: names with a high trigram
+    # overlap are very likely to share at least one band
+    grams = _trigrams(compact)
+    if grams:
+        for band in range(MINHASH_BANDS):
+            signature = tuple(
+                min(zlib.crc32(f"{band * MINHASH_ROWS + row}:{g}".encode()) for g in grams)
+                for row in range(MINHASH_ROWS)
+            )
+            keys.add(("ngram", band, signature))
+    return keys
+
+def _shape(normalized):
+    # Word count and initials, in any order ("pacino al" == "al pacino")
+    tokens = normalized.split()
+    return len(tokens), sorted(token[0] for token in tokens)
+
+def names_match(a, b, threshold=SIMILARITY_THRESHOLD):
+    # a, b: normalized names
+    if a.replace(" ", "") == b.replace(" ", ""):
+        return True
+    return _shape(a) == _shape(b) and fuzz.token_sort_ratio(a, b) >= threshold
+
+def fetch_stars(conn):
+    # Server-side cursor so millions of stars are streamed, not buffered
+    with conn.cursor(name="dedupe_stars") as cur:
+        cur.itersize = 50_000
+        cur.execute("""
+            SELECT s.id, s.actor_name, COUNT(a.star_id) AS appearances
+            FROM stars s
+            LEFT JOIN appearances a ON s.id = a.star_id
+            GROUP BY s.id, s.actor_name;
+        """)
+        for row in cur:
+            yield row
+
+def find_duplicate_clusters(stars, threshold=SIMILARITY_THRESHOLD):
+    names = {}
+    appearances = {}
+    blocks = defaultdict(list)
+
+    for star_id, actor_name, count in stars:
+        normalized = normalize_name(actor_name)
+        names[star_id] = (actor_name, normalized)
+        appearances[star_id] = count
+        for key in blocking_keys(normalized):
+            blocks[key].append(star_id)
+
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    compared = set()
+    skipped_blocks = 0
+    for key, members in blocks.items():
+        if len(members) < 2:
+            continue
+        if key[0] == "exact":
+            # Same name once spacing, case, accents and punctuation are ignored
+            for other in members[1:]:
+                parent[find(other)] = find(members[0])
+            continue
+        if len(members) > MAX_BLOCK_SIZE:
+            skipped_blocks += 1
+            continue
+
+        for a, b in combinations(members, 2):
+            pair = (a, b) if a < b else (b, a)
+            if pair in compared or find(a) == find(b):
+                continue
+            compared.add(pair)
+            if names_match(names[a][1], names[b][1], threshold):
+                parent[find(a)] = find(b)
+
+    clusters = defaultdict(list)
+    for star_id in parent:
+        clusters[find(star_id)].append(star_id)
+
+    merges = []
+    for members in clusters.values():
+        if len(members) < 2:
+            continue
+        # Keep the most-used spelling; the lowest id breaks ties
+        members.sort(key=lambda s: (-appearances[s], s))
+        keep = members[0]
+        merges.append({
+            "keep": {"id": keep, "name": names[keep][0], "appearances": appearances[keep]},
+            "drop": [
+                {"id": s, "name": names[s][0], "appearances": appearances[s]}
+                for s in members[1:]
+            ],
+            # Only reached through other members; needs a manual look
+            "chained": not all(names_match(names[keep][1], names[s][1], threshold) for s in members[1:]),
+        })
+
+    stats = {
+        "stars": len(names),
+        "pairs_compared": len(compared),
+        "skipped_blocks": skipped_blocks,
+        "clusters": len(merges),
+        "stars_to_remove": sum(len(m["drop"]) for m in merges if not m["chained"]),
+        "chained_clusters": sum(m["chained"] for m in merges),
+    }
+    return merges, stats
+
+def apply_merges(conn, merges):
+    with conn.transaction():
+        with conn.cursor() as cur:
+            cur.execute("CREATE TEMP TABLE star_merge (drop_id INT PRIMARY KEY, keep_id INT NOT NULL) ON COMMIT DROP;")
+            with cur.copy("COPY star_merge (drop_id, keep_id) FROM STDIN") as copy:
+                for merge in merges:
+                    for dropped in merge["drop"]:
+                        copy.write_row((dropped["id"], merge["keep"]["id"]))
+            cur.execute("ANALYZE star_merge;")
+
+            # Re-point appearances to the surviving star, skipping links it
+            # already has. NOT EXISTS rather than ON CONFLICT: this runs
+            # before `unique-keys` on databases that still need deduping.
+            cur.execute("""
+                INSERT INTO appearances (movie_id, star_id)
+                SELECT DISTINCT a.movie_id, m.keep_id
+                FROM appearances a
+                JOIN star_merge m ON a.star_id = m.drop_id
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM appearances x
+                    WHERE x.movie_id = a.movie_id AND x.star_id = m.keep_id
+                );
+            """)
+            relinked = cur.rowcount
+            cur.execute("DELETE FROM appearances a USING star_merge m WHERE a.star_id = m.drop_id;")
+            cur.execute("DELETE FROM stars s USING star_merge m WHERE s.id = m.drop_id;")
+            removed = cur.rowcount
+    return relinked, removed
+
+def print_report(merges, stats, limit=50):
+    print(f"\n🔎 Scanned {stats['stars']:,} stars, compared {stats['pairs_compared']:,} candidate pairs.")
+    if stats["skipped_blocks"]:
+        print(f"⚠️ Skipped {stats['skipped_blocks']} oversized blocks (over {MAX_BLOCK_SIZE} names).")
+
+    if not merges:
+        print("✅ No duplicate stars found.")
+        return
+
+    print(f"\n👥 {stats['clusters']:,} duplicate groups, {stats['stars_to_remove']:,} stars to merge:")
+    for merge in merges[:limit]:
+        keep = merge["keep"]
+        chained = " ⛓️ chained match, not merged" if merge["chained"] else ""
+        print(f"  - keep {keep['name']} (ID {keep['id']}, {keep['appearances']} appearances){chained}")
+        for dropped in merge["drop"]:
+            print(f"      ← {dropped['name']} (ID {dropped['id']}, {dropped['appearances']} appearances)")
+    if len(merges) > limit:
+        print(f"  ... and {len(merges) - limit:,} more groups")
+    if stats["chained_clusters"]:
+        print(f"\n⚠️ {stats['chained_clusters']:,} groups only match through other names; "
+              f"--apply leaves them alone. Merge them by hand if they really are one person.")
+
+def main(apply=False, threshold=SIMILARITY_THRESHOLD, report=None):
+    try:
+        with connect_write() as conn:
+            merges, stats = find_duplicate_clusters(fetch_stars(conn), threshold)
+            conn.commit()  # close the read transaction used by the named cursor
+
+            print_report(merges, stats)
+            if report:
+                with open(report, "w", encoding="utf-8") as f:
+                    json.dump({"stats": stats, "merges": merges}, f, indent=2)
+                print(f"\n📝 Full report written to: {report}")
+
+            if not merges:
+                return
+            if not apply:
+                print("\nℹ️ Dry run — nothing changed. Re-run with --apply to merge.")
+                return
+
+            relinked, removed = apply_merges(conn, [m for m in merges if not m["chained"]])
+            print(f"\n✅ Merged duplicates: {relinked:,} appearances re-linked, {removed:,} stars removed.")
+
+    except psycopg.Error as e:
+        print("❌ Duplicate merge failed; no changes were made.")
+        print("Error:", e)
+
+if __name__ == "__main__":
+    main(apply="--apply" in sys.argv[1:])
@@ -0,0 +1,185 @@
+import csv
+import gzip
+import os
+import struct
+import sys
+import time
+from xml.sax.saxutils import escape, quoteattr
+import psycopg
+from db_connections import connect_read
+
+# Streams the co-appearance network to a file for external tools (Gephi,
+# Cytoscape, igraph, ...). Nodes and edges are read through server-side
+# cursors and written as they arrive, so memory stays flat no matter how
+# many edges there are. A ".gz" suffix compresses any format.
+#
+#   graphml / gexf  nodes and edges in one XML file
+#   csv             edge list (source,target,weight) + <file>.nodes.csv
+#   bin             packed little-endian uint32 source, uint32 target,
+#                   uint32 weight records after an 8-byte header
+#                   (b"MVEL", uint32 version) + <file>.nodes.csv
+
+FORMATS = ("graphml", "gexf", "csv", "bin")
+BINARY_MAGIC = b"MVEL"
+BINARY_VERSION = 1
+FETCH_SIZE = 20_000
+
+NODES_SQL = """
+    SELECT s.id, s.actor_name, COUNT(*) AS appearances
+    FROM stars s
+    JOIN appearances a ON s.id = a.star_id
+    GROUP BY s.id, s.actor_name;
+"""
+
+EDGES_SQL = """
+    SELECT a1.star_id, a2.star_id, COUNT(*) AS shared_movies
+    FROM appearances a1
+    JOIN appearances a2
+        ON a1.movie_id = a2.movie_id AND a1.star_id < a2.star_id
+    GROUP BY a1.star_id, a2.star_id
+    HAVING COUNT(*) >= %s;
+"""
+
+
+def _stream(conn, name, query, params=None):
+    with conn.cursor(name=name) as cur:
+        cur.itersize = FETCH_SIZE
+        cur.execute(query, params)
+        yield from cur
+
+def _open(path, binary=False):
+    opener = gzip.open if path.endswith(".gz") else open
+    if binary:
+        return opener(path, "wb")
+    return opener(path, "wt", encoding="utf-8", newline="")
+
+def _format_from_path(path):
+    base = path[:-3] if path.endswith(".gz") else path
+    extension = base.rsplit(".", 1)[-1].lower()
+    return {"graphml": "graphml", "gexf": "gexf", "csv": "csv", "bin": "bin", "edges": "bin"}.get(extension)
+
+def _nodes_path(path, compressed):
+    # collab.csv.gz -> collab.nodes.csv(.gz); only the file name's extension
+    # is replaced, so the node list never overwrites the edge file
+    nodes_path = os.path.splitext(path[:-3] if path.endswith(".gz") else path)[0] + ".nodes.csv"
+    return nodes_path + ".gz" if compressed and path.endswith(".gz") else nodes_path
+
+def write_nodes_csv(conn, path):
+    nodes = 0
+    with _open(path) as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "appearances"])
+        for row in _stream(conn, "export_nodes", NODES_SQL):
+            writer.writerow(row)
+            nodes += 1
+    return nodes
+
+def write_csv(conn, path, min_weight):
+    nodes = write_nodes_csv(conn, _nodes_path(path, compressed=True))
+
+    edges = 0
+    with _open(path) as f:
+        writer = csv.writer(f)
+        writer.writerow(["source", "target", "weight"])
+        for row in _stream(conn, "export_edges", EDGES_SQL, (min_weight,)):
+            writer.writerow(row)
+            edges += 1
+    return nodes, edges
+
+def write_binary(conn, path, min_weight):
+    nodes = write_nodes_csv(conn, _nodes_path(path, compressed=False))
+
+    record = struct.Struct("<III")
+    edges = 0
+    with _open(path, binary=True) as f:
+        f.write(BINARY_MAGIC + struct.pack("<I", BINARY_VERSION))
+        buffer = bytearray()
+        for row in _stream(conn, "export_edges", EDGES_SQL, (min_weight,)):
+            buffer += record.pack(*row)
+            edges += 1
+            if len(buffer) >= record.size * FETCH_SIZE:
+                f.write(buffer)
+                buffer.clear()
+        f.write(buffer)
+    return nodes, edges
+
+def write_graphml(conn, path, min_weight):
+    nodes = edges = 0
+    with _open(path) as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+        f.write('  <key id="name" for="node" attr.name="name" attr.type="string"/>\n')
+        f.write('  <key id="appearances" for="node" attr.name="appearances" attr.type="int"/>\n')
+        f.write('  <key id="weight" for="edge" attr.name="weight" attr.type="int"/>\n')
+        f.write('  <graph id="collaborations" edgedefault="undirected">\n')
+
+        for star_id, name, appearances in _stream(conn, "export_nodes", NODES_SQL):
+            f.write(f'    <node id="n{star_id}"><data key="name">{escape(name)}</data>'
+                    f'<data key="appearances">{appearances}</data></node>\n')
+            nodes += 1
+
+        for source, target, weight in _stream(conn, "export_edges", EDGES_SQL, (min_weight,)):
+            f.write(f'    <edge source="n{source}" target="n{target}"><data key="weight">{weight}</data></edge>\n')
+            edges += 1
+
+        f.write("  </graph>\n</graphml>\n")
+    return nodes, edges
+
+def write_gexf(conn, path, min_weight):
+    nodes = edges = 0
+    with _open(path) as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<gexf xmlns="http://gexf.net/1.3" version="1.3">\n')
+        f.write('  <graph defaultedgetype="undirected" mode="static">\n')
+        f.write('    <attributes class="node">\n')
+        f.write('      <attribute id="appearances" title="appearances" type="integer"/>\n')
+        f.write('    </attributes>\n')
+
+        f.write("    <nodes>\n")
+        for star_id, name, appearances in _stream(conn, "export_nodes", NODES_SQL):
+            f.write(f'      <node id="{star_id}" label={quoteattr(name)}><attvalues>'
+                    f'<attvalue for="appearances" value="{appearances}"/></attvalues></node>\n')
+            nodes += 1
+        f.write("    </nodes>\n")
+
+        f.write("    <edges>\n")
+        for source, target, weight in _stream(conn, "export_edges", EDGES_SQL, (min_weight,)):
+            f.write(f'      <edge id="{edges}" source="{source}" target="{target}" weight="{weight}"/>\n')
+            edges += 1
+        f.write("    </edges>\n")
+
+        f.write("  </graph>\n</gexf>\n")
+    return nodes, edges
+
+WRITERS = {
+    "graphml": write_graphml,
+    "gexf": write_gexf,
+    "csv": write_csv,
+    "bin": write_binary,
+}
+
+def export_network(path, fmt=None, min_weight=1):
+    fmt = fmt or _format_from_path(path)
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown format for '{path}'; use one of: {', '.join(FORMATS)}")
+
+    with connect_read() as conn:
+        return WRITERS[fmt](conn, path, min_weight)
+
+def main(path="collab_network.graphml", fmt=None, min_weight=1):
+    started = time.perf_counter()
+    try:
+        nodes, edges = export_network(path, fmt, min_weight)
+    except ValueError as e:
+        print(f"⚠️ {e}")
+        return
+    except psycopg.Error as e:
+        print("❌ Network export failed.")
+        print("Error:", e)
+        return
+
+    print(f"\n✅ Exported {nodes:,} actors and {edges:,} collaborations to: {path}")
+    print(f"   ({time.perf_counter() - started:.1f}s)")
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "collab_network.graphml")
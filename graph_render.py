@@ -0,0 +1,109 @@
+import os
+import networkx as nx
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+
+# Level-of-detail drawing for the NetworkX views. A dense neighbourhood
+# can have thousands of edges, each with a long movie list as its label,
+# and drawing all of them one artist at a time takes minutes. Here the
+# graph is first cut down to a fixed budget (most connected nodes,
+# heaviest edges, a handful of labels), then drawn with one collection
+# per primitive type, so the draw time has a fixed upper bound.
+
+MAX_NODES = int(os.getenv("MOVIES_RENDER_MAX_NODES", "150"))
+MAX_EDGES = int(os.getenv("MOVIES_RENDER_MAX_EDGES", "400"))
+MAX_NODE_LABELS = int(os.getenv("MOVIES_RENDER_MAX_NODE_LABELS", "40"))
+MAX_EDGE_LABELS = int(os.getenv("MOVIES_RENDER_MAX_EDGE_LABELS", "15"))
+LABEL_MAX_CHARS = 40
+
+
+def truncate_label(text, max_chars=LABEL_MAX_CHARS):
+    # "A, B, C, D" -> "A, B, … (+2)" so long movie lists stay readable
+    text = str(text)
+    if len(text) <= max_chars:
+        return text
+
+    items = text.split(", ")
+    kept = []
+    for item in items:
+        if len(", ".join(kept + [item])) > max_chars - 8:
+            break
+        kept.append(item)
+    if not kept:
+        return text[:max_chars - 1] + "…"
+    return ", ".join(kept) + f", … (+{len(items) - len(kept)})"
+
+def apply_budget(G, max_nodes=MAX_NODES, max_edges=MAX_EDGES, keep=()):
+    # Keeps the nodes in `keep` (in order), then the ones with the largest
+    # weighted degree, then the heaviest edges between them.
+    # Returns (subgraph, culled counts).
+    strength = dict(G.degree(weight="weight"))
+    ranked = sorted(G.nodes, key=lambda n: -strength[n])
+
+    chosen = set()
+    for n in list(keep) + ranked:
+        if len(chosen) >= max_nodes:
+            break
+        if n in G:
+            chosen.add(n)
+
+    edges = sorted(
+        G.subgraph(chosen).edges(data=True),
+        key=lambda e: -e[2].get("weight", 1),
+    )[:max_edges]
+
+    H = nx.Graph()
+    H.add_nodes_from((n, G.nodes[n]) for n in chosen)
+    H.add_edges_from(edges)
+
+    culled = {
+        "nodes": G.number_of_nodes() - H.number_of_nodes(),
+        "edges": G.number_of_edges() - H.number_of_edges(),
+    }
+    return H, culled
+
+def draw_budgeted(G, pos, ax=None, node_color="lightblue", node_size=200, width_scale=1.0,
+                  edge_alpha=0.5, label_nodes=None, max_node_labels=MAX_NODE_LABELS,
+                  edge_label_attr=None, max_edge_labels=MAX_EDGE_LABELS, font_size=9):
+    # node_color may be one colour or {node: colour}. Labels go to the
+    # nodes in label_nodes (in order) first, then the best-connected ones.
+    ax = ax or plt.gca()
+    nodes = list(G.nodes)
+    if not nodes:
+        return
+
+    # Edges: one LineCollection instead of one artist per edge
+    edges = list(G.edges(data=True))
+    if edges:
+        segments = [(pos[u], pos[v]) for u, v, _ in edges]
+        widths = [d.get("weight", 1) * width_scale for _, _, d in edges]
+        ax.add_collection(LineCollection(segments, linewidths=widths, colors="gray", alpha=edge_alpha, zorder=1))
+
+    # Nodes: one scatter call
+    colors = [node_color.get(n, "lightgray") for n in nodes] if isinstance(node_color, dict) else node_color
+    xy = [pos[n] for n in nodes]
+    ax.scatter([p[0] for p in xy], [p[1] for p in xy], s=node_size, c=colors, zorder=2)
+
+    # Node labels: a fixed number, most important first
+    strength = dict(G.degree(weight="weight"))
+    ordered = [n for n in (label_nodes or []) if n in G]
+    first = set(ordered)
+    ordered += sorted((n for n in nodes if n not in first), key=lambda n: -strength[n])
+    for n in ordered[:max_node_labels]:
+        x, y = pos[n]
+        ax.text(x, y, truncate_label(n), fontsize=font_size, ha="center", va="center", zorder=3)
+
+    # Edge labels: only the heaviest edges, truncated
+    if edge_label_attr:
+        heaviest = sorted(edges, key=lambda e: -e[2].get("weight", 1))[:max_edge_labels]
+        for u, v, d in heaviest:
+            (x1, y1), (x2, y2) = pos[u], pos[v]
+            ax.text((x1 + x2) / 2, (y1 + y2) / 2, truncate_label(d.get(edge_label_attr, "")),
+                    fontsize=max(font_size - 2, 6), ha="center", va="center", color="dimgray", zorder=3,
+                    bbox={"boxstyle": "round,pad=0.15", "fc": "white", "ec": "none", "alpha": 0.7})
+
+    ax.autoscale_view()
+
+def culled_note(culled):
+    parts = [f"{count:,} {kind}" for kind, count in culled.items() if count]
+    return f" (hidden: {', '.join(parts)})" if parts else ""
@@ -1,21 +1,8 @@
-import os
-import psycopg
-from dotenv import load_dotenv
-
-# Load values from .env file
-load_dotenv()
-
-DB_CONNECTION = {
-    "dbname": os.getenv("PGDATABASE", "Movies"),
-    "user": os.getenv("PGUSER", "postgres"),
-    "password": os.getenv("PGPASSWORD", ""),
-    "host": os.getenv("PGHOST", "localhost"),
-    "port": os.getenv("PGPORT", "5432"),
-}
+from db_connections import connect_read
 
 def list_all_titles_in_movies(sort):
 
-    with psycopg.connect(**DB_CONNECTION) as conn:
+    with connect_read() as conn:
 
         with conn.cursor() as cur:
 
@@ -33,6 +20,7 @@ def list_all_titles_in_movies(sort):
 
 
 
-print("List all titles in movies database.")
-sort_method = input("Choose a sort method (name, year, none): ")
-list_all_titles_in_movies(sort_method)
\ No newline at end of file
+if __name__ == "__main__":
+    print("List all titles in movies database.")
+    sort_method = input("Choose a sort method (name, year, none): ")
+    list_all_titles_in_movies(sort_method)
@@ -0,0 +1,192 @@
+import contextlib
+import os
+import re
+import sys
+import tempfile
+import time
+import psycopg
+
+# Embedded DuckDB copy of the movie database for offline, single-process
+# analytics. sync_from_postgres() snapshots movies, stars and appearances
+# into a local file; connect_local() opens it behind a small adapter that
+# looks like a psycopg connection, so the read-only scripts run unchanged
+# with MOVIES_BACKEND=duckdb. duckdb is optional (pip install duckdb) and
+# only imported here.
+
+DUCKDB_PATH = os.getenv("MOVIES_DUCKDB_PATH", "movies.duckdb")
+
+TABLES = {
+    "movies": {"id": "INTEGER", "title": "VARCHAR", "release_year": "INTEGER"},
+    "stars": {"id": "INTEGER", "actor_name": "VARCHAR"},
+    "appearances": {"id": "INTEGER", "movie_id": "INTEGER", "star_id": "INTEGER"},
+}
+
+# PostgreSQL behaviour the shared queries rely on
+SESSION_SETUP = [
+    "SET integer_division = true",
+    """CREATE OR REPLACE TEMP MACRO width_bucket(v, lo, hi, n) AS
+        CASE WHEN v < lo THEN 0
+             WHEN v >= hi THEN n + 1
+             ELSE CAST(floor((v - lo) * n / (hi - lo)) AS INTEGER) + 1 END""",
+]
+
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s|%%")
+
+
+def _translate(query):
+    # psycopg placeholders -> DuckDB ($name for %(name)s, ? for %s)
+    def replace(match):
+        if match.group(1):
+            return "$" + match.group(1)
+        return "?" if match.group(0) == "%s" else "%"
+    return _PLACEHOLDER.sub(replace, query)
+
+
+class LocalCursor:
+    def __init__(self, duck, connection=None):
+        self._cur = duck.cursor()
+        self.connection = connection
+        self.itersize = 2000
+        self.rowcount = -1
+
+    def execute(self, query, params=None):
+        import duckdb
+        try:
+            self._cur.execute(_translate(query), params if params is not None else [])
+        except duckdb.Error as e:
+            raise psycopg.Error(f"[duckdb] {e}") from e
+        return self
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def fetchmany(self, size=None):
+        return self._cur.fetchmany(size or self.itersize)
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany()
+            if not rows:
+                return
+            yield from rows
+
+    def close(self):
+        self._cur.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LocalConnection:
+    def __init__(self, duck):
+        self._duck = duck
+        self.read_only = True
+
+    def cursor(self, name=None):
+        # Named (server-side) cursors are just regular cursors here
+        return LocalCursor(self._duck, self)
+
+    def transaction(self):
+        # Read-only: nothing to roll back
+        return contextlib.nullcontext()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self._duck.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def connect_local(path=DUCKDB_PATH):
+    try:
+        import duckdb
+    except ImportError:
+        raise psycopg.OperationalError("MOVIES_BACKEND=duckdb needs duckdb: pip install duckdb")
+
+    if not os.path.exists(path):
+        raise psycopg.OperationalError(
+            f"Local database '{path}' not found. Run 'python movies.py sync-local' first."
+        )
+    duck = duckdb.connect(path, read_only=True)
+    for statement in SESSION_SETUP:
+        duck.execute(statement)
+    return LocalConnection(duck)
+
+def sync_from_postgres(path=DUCKDB_PATH):
+    import duckdb
+    from db_connections import connect_server_read
+
+    # Build into a temporary file and swap it in, so readers never see a
+    # half-synced database
+    target_dir = os.path.dirname(os.path.abspath(path))
+    fd, building = tempfile.mkstemp(suffix=".duckdb", dir=target_dir)
+    os.close(fd)
+    os.remove(building)
+
+    counts = {}
+    try:
+        with connect_server_read() as conn, duckdb.connect(building) as duck:
+            with conn.cursor() as cur:
+                for table, columns in TABLES.items():
+                    column_list = ", ".join(columns)
+                    column_types = ", ".join(f"'{name}': '{kind}'" for name, kind in columns.items())
+                    fd, csv_name = tempfile.mkstemp(suffix=".csv")
+                    try:
+                        with os.fdopen(fd, "wb") as csv_file:
+                            with cur.copy(f"COPY (SELECT {column_list} FROM {table}) TO STDOUT (FORMAT CSV)") as copy:
+                                for chunk in copy:
+                                    csv_file.write(chunk)
+
+                        csv_path = csv_name.replace("'", "''")
+                        duck.execute(
+                            f"CREATE TABLE {table} AS "
+                            f"SELECT * FROM read_csv('{csv_path}', header = false, columns = {{{column_types}}})"
+                        )
+                    finally:
+                        os.remove(csv_name)
+                    counts[table] = duck.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+            duck.execute("CREATE TABLE sync_info AS SELECT now() AS synced_at")
+    except BaseException:
+        # Drop the half-built file; the current database stays in place
+        if os.path.exists(building):
+            os.remove(building)
+        raise
+
+    os.replace(building, path)
+    return counts
+
+def main(path=DUCKDB_PATH):
+    started = time.perf_counter()
+    try:
+        counts = sync_from_postgres(path)
+    except ImportError:
+        print("❌ duckdb is not installed. Run: pip install duckdb")
+        return
+    except psycopg.Error as e:
+        print("❌ Sync failed.")
+        print("Error:", e)
+        return
+
+    print(f"✅ Synced to {path} in {time.perf_counter() - started:.1f}s:")
+    for table, count in counts.items():
+        print(f"  - {table}: {count:,} rows")
+    print("\nRun read-only tools against it with MOVIES_BACKEND=duckdb.")
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else DUCKDB_PATH)
@@ -0,0 +1,205 @@
+from db_connections import connect_read
+
+# Shared server-side aggregations for the chart scripts. Every function
+# returns pre-binned rows, so the amount of data sent over the wire depends
+# on the number of bins, not on the size of the catalog.
+# Errors are raised as psycopg.Error for the calling script to report.
+#
+# year_from / year_to (inclusive, either may be None) become plain
+# comparisons on release_year, so on the partitioned layout
+# (partition_migration.py) only the matching decade partitions are read.
+
+PER_MOVIE_CAST_SQL = """
+    SELECT m.id, m.title, m.release_year, COUNT(a.star_id) AS actor_count
+    FROM movies m
+    LEFT JOIN appearances a ON m.id = a.movie_id
+    {where}
+    GROUP BY m.id, m.title, m.release_year
+"""
+
+# Sampled movies with their weights (see chart_sampling.py); the params
+# come from Sample.params(). Two unnests in one select list are zipped on
+# both PostgreSQL and DuckDB, which has no multi-argument unnest.
+SAMPLE_SQL = "(SELECT unnest(%(sample_ids)s::int[]) AS id, unnest(%(sample_weights)s::float8[]) AS weight) AS sample"
+
+SAMPLED_CAST_SQL = f"""
+    SELECT m.id, m.title, m.release_year, sample.weight, COUNT(a.star_id) AS actor_count
+    FROM {SAMPLE_SQL}
+    JOIN movies m ON m.id = sample.id
+    LEFT JOIN appearances a ON a.movie_id = m.id
+    GROUP BY m.id, m.title, m.release_year, sample.weight
+"""
+
+
+def _fetchall(query, params=None):
+    with connect_read() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            return cur.fetchall()
+
+def year_range(year_from=None, year_to=None, column="release_year", dated=False):
+    # (WHERE clause or "", params); dated=True also leaves out movies
+    # without a release year
+    conditions, params = ([f"{column} IS NOT NULL"] if dated else []), {}
+    if year_from is not None:
+        conditions.append(f"{column} >= %(year_from)s")
+        params["year_from"] = year_from
+    if year_to is not None:
+        conditions.append(f"{column} <= %(year_to)s")
+        params["year_to"] = year_to
+    return ("WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+def movie_count(year_from=None, year_to=None):
+    where_sql, params = year_range(year_from, year_to)
+    return _fetchall(f"SELECT COUNT(*) FROM movies {where_sql};", params)[0][0]
+
+def movies_per_year(year_from=None, year_to=None):
+    # GROUPING SETS returns the per-year counts and the grand total in one
+    # scan; generate_series fills the gaps so every year in range has a row.
+    # Undated movies have no bar, so they are not in the total either.
+    where_sql, params = year_range(year_from, year_to, dated=True)
+    rows = _fetchall(f"""
+        WITH counts AS (
+            SELECT release_year, COUNT(*) AS movies, GROUPING(release_year) AS is_total
+            FROM movies
+            {where_sql}
+            GROUP BY GROUPING SETS ((release_year), ())
+        ),
+        span AS (
+            SELECT MIN(release_year) AS first_year, MAX(release_year) AS last_year
+            FROM counts WHERE is_total = 0
+        )
+        SELECT y.year, COALESCE(c.movies, 0), false
+        FROM span, generate_series(span.first_year, span.last_year) AS y(year)
+        LEFT JOIN counts c ON c.release_year = y.year AND c.is_total = 0
+        UNION ALL
+        SELECT NULL, movies, true FROM counts WHERE is_total = 1
+        ORDER BY 3, 1;
+    """, params)
+    year_counts = [(year, count) for year, count, is_total in rows if not is_total]
+    total = next((count for _, count, is_total in rows if is_total), 0)
+    return year_counts, total
+
+def movies_by_interval(width=5, max_titles=None, year_from=None, year_to=None):
+    # One row per interval with its (optionally truncated) title list;
+    # undated movies belong to no interval
+    where_sql, params = year_range(year_from, year_to, dated=True)
+    return _fetchall(f"""
+        SELECT
+            interval_start,
+            COUNT(*) AS movies,
+            (ARRAY_AGG(title || ' (' || release_year::text || ')' ORDER BY release_year, title))[1:COALESCE(%(max_titles)s::int, COUNT(*)::int)]
+        FROM (
+            SELECT title, release_year, (release_year / %(width)s) * %(width)s AS interval_start
+            FROM movies
+            {where_sql}
+        ) m
+        GROUP BY interval_start
+        ORDER BY interval_start;
+    """, {"width": width, "max_titles": max_titles, **params})
+
+def year_actor_bins(year_from=None, year_to=None):
+    # (release year, cast size, movies) cells for the timeline density raster
+    where_sql, params = year_range(year_from, year_to, "m.release_year")
+    return _fetchall(f"""
+        SELECT release_year, actor_count, COUNT(*) AS movies
+        FROM ({PER_MOVIE_CAST_SQL.format(where=where_sql)}) per_movie
+        WHERE release_year IS NOT NULL  -- the raster has no row for undated movies
+        GROUP BY release_year, actor_count;
+    """, params)
+
+def top_movies_by_cast(limit=10, year_from=None, year_to=None):
+    where_sql, params = year_range(year_from, year_to, "m.release_year")
+    return _fetchall(f"""
+        SELECT title, release_year, actor_count
+        FROM ({PER_MOVIE_CAST_SQL.format(where=where_sql)}) per_movie
+        WHERE actor_count > 0
+        ORDER BY actor_count DESC, release_year
+        LIMIT %(limit)s;
+    """, {"limit": limit, **params})
+
+def treemap_level(decade=None, year=None, min_share=0.01, max_blocks=60):
+    # Top level: one block per decade; drill into a decade for years,
+    # into a year for movies. Size is the number of credited actors.
+    if year is not None:
+        label_sql = "m.title"
+        key_sql = "m.id"
+        where_sql = "WHERE m.release_year = %(year)s"
+    elif decade is not None:
+        label_sql = "m.release_year::text"
+        key_sql = "m.release_year"
+        where_sql = "WHERE m.release_year >= %(decade)s AND m.release_year < %(decade)s + 10"
+    else:
+        label_sql = "((m.release_year / 10) * 10)::text || 's'"
+        key_sql = "(m.release_year / 10) * 10"
+        where_sql = ""
+
+    # Blocks below min_share of the level total (or past max_blocks) are
+    # collapsed into a single "Other" row inside the query.
+    return _fetchall(f"""
+        WITH blocks AS (
+            SELECT {key_sql} AS key, MIN({label_sql}) AS label,
+                   COUNT(DISTINCT m.id) AS movies, COUNT(a.star_id) AS actors
+            FROM movies m
+            LEFT JOIN appearances a ON m.id = a.movie_id
+            {where_sql}
+            GROUP BY {key_sql}
+        ),
+        ranked AS (
+            SELECT *,
+                   ROW_NUMBER() OVER (ORDER BY actors DESC, key) AS rank,
+                   SUM(actors) OVER () AS total
+            FROM blocks
+        )
+        SELECT key, label, movies, actors
+        FROM (
+            SELECT
+                CASE WHEN keep THEN key::text END AS key,
+                CASE WHEN keep THEN label ELSE 'Other' END AS label,
+                SUM(movies) AS movies,
+                SUM(actors) AS actors
+            FROM (
+                SELECT *, (rank <= %(max_blocks)s AND actors >= total * %(min_share)s) AS keep
+                FROM ranked
+            ) flagged
+            GROUP BY 1, 2
+        ) level
+        ORDER BY key IS NULL, actors DESC;
+    """, {"decade": decade, "year": year, "min_share": min_share, "max_blocks": max_blocks})
+
+def sampled_movies_per_year(sample_params):
+    # Estimated movies per year, scaled up from a sample
+    rows = _fetchall(f"""
+        SELECT m.release_year, SUM(sample.weight)
+        FROM {SAMPLE_SQL}
+        JOIN movies m ON m.id = sample.id
+        WHERE m.release_year IS NOT NULL
+        GROUP BY m.release_year
+        ORDER BY m.release_year;
+    """, sample_params)
+    return [(year, round(weight)) for year, weight in rows]
+
+def sampled_movies_with_cast(sample_params):
+    return _fetchall(f"""
+        SELECT title, release_year, actor_count
+        FROM ({SAMPLED_CAST_SQL}) per_movie
+        ORDER BY release_year;
+    """, sample_params)
+
+def sampled_year_actor_bins(sample_params):
+    # Same cells as year_actor_bins(), with estimated movie counts
+    return _fetchall(f"""
+        SELECT release_year, actor_count, ROUND(SUM(weight))::bigint AS movies
+        FROM ({SAMPLED_CAST_SQL}) per_movie
+        WHERE release_year IS NOT NULL
+        GROUP BY release_year, actor_count;
+    """, sample_params)
+
+def sampled_top_movies_by_cast(sample_params, limit=10):
+    return _fetchall(f"""
+        SELECT title, release_year, actor_count
+        FROM ({SAMPLED_CAST_SQL}) per_movie
+        WHERE actor_count > 0
+        ORDER BY actor_count DESC, release_year
+        LIMIT %(limit)s;
+    """, {**sample_params, "limit": limit})
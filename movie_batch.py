@@ -0,0 +1,177 @@
+import json
+import sys
+import time
+import psycopg
+from db_connections import connect_write, record_write
+from movie_database_cli import (
+    upsert_movie_star,
+    find_movies_by_title,
+    link_actors_to_movie,
+    fetch_actors_for_movie,
+    fetch_movies_for_actor,
+)
+
+
+# Non-interactive counterpart of movie_database_cli. Reads one JSON command
+# per line and writes one JSON result per line, e.g.
+#
+#   {"op": "add_movie", "title": "Heat", "year": 1995, "star": "Al Pacino"}
+#   {"op": "add_actors", "title": "Heat", "year": 1995, "actors": ["Val Kilmer"]}
+#   {"op": "list_actors", "title": "Heat"}
+#   {"op": "list_movies", "actor": "Al Pacino"}
+#
+# Everything runs over one connection. Commands are committed in
+# transactions of batch_size; each command runs in its own savepoint so a
+# bad command is reported and rolled back without losing the rest.
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class CommandError(Exception):
+    pass
+
+
+def _require(command, *fields):
+    missing = [field for field in fields if command.get(field) in (None, "", [])]
+    if missing:
+        raise CommandError(f"missing field(s): {', '.join(missing)}")
+
+def _resolve_movie(cur, command):
+    matches = find_movies_by_title(cur, command["title"])
+    if "year" in command:
+        matches = [m for m in matches if m[2] == int(command["year"])]
+
+    if not matches:
+        raise CommandError(f"no movie found with title: {command['title']}")
+    if len(matches) > 1:
+        years = ", ".join(str(year) for _, _, year in matches)
+        raise CommandError(f"multiple movies found for '{command['title']}' ({years}); add \"year\"")
+    return matches[0]
+
+def run_add_movie(cur, command):
+    _require(command, "title", "year", "star")
+    return upsert_movie_star(cur, command["title"], int(command["year"]), command["star"])
+
+def run_add_actors(cur, command):
+    _require(command, "title", "actors")
+    movie_id, title, year = _resolve_movie(cur, command)
+    return {
+        "movie_id": movie_id,
+        "title": title,
+        "year": year,
+        "actors": link_actors_to_movie(cur, movie_id, command["actors"]),
+    }
+
+def run_list_actors(cur, command):
+    _require(command, "title")
+    movie_id, title, year = _resolve_movie(cur, command)
+    return {"movie_id": movie_id, "title": title, "year": year, "actors": fetch_actors_for_movie(cur, movie_id)}
+
+def run_list_movies(cur, command):
+    _require(command, "actor")
+    movies = fetch_movies_for_actor(cur, command["actor"])
+    if movies is None:
+        raise CommandError(f"actor not found: {command['actor']}")
+    return {"actor": command["actor"], "movies": [{"title": t, "year": y} for t, y in movies]}
+
+OPERATIONS = {
+    "add_movie": run_add_movie,
+    "add_actors": run_add_actors,
+    "list_actors": run_list_actors,
+    "list_movies": run_list_movies,
+}
+
+
+# Expected JSON types of the command fields (year may be a number or a numeric string)
+FIELD_TYPES = {
+    "title": (str, "a string"),
+    "star": (str, "a string"),
+    "actor": (str, "a string"),
+    "year": ((int, str), "a number"),
+    "actors": (list, "a list of names"),
+}
+
+def _parse(line):
+    try:
+        command = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise CommandError(f"invalid JSON: {e}")
+    if not isinstance(command, dict) or command.get("op") not in OPERATIONS:
+        raise CommandError(f"unknown op; expected one of {', '.join(OPERATIONS)}")
+
+    # "year": null means no year was given
+    if command.get("year", "") is None:
+        del command["year"]
+    for field, (types, description) in FIELD_TYPES.items():
+        value = command.get(field)
+        if value is not None and not isinstance(value, types):
+            raise CommandError(f"\"{field}\" must be {description}")
+    if any(not isinstance(name, str) for name in command.get("actors") or []):
+        raise CommandError("\"actors\" must be a list of names")
+    return command
+
+def run_batch(lines, output, batch_size=DEFAULT_BATCH_SIZE):
+    summary = {"commands": 0, "ok": 0, "failed": 0, "transactions": 0}
+
+    def emit(record):
+        output.write(json.dumps(record, default=str) + "\n")
+
+    with connect_write(autocommit=True) as conn:
+        with conn.cursor() as cur:
+            pending = iter(enumerate(lines, start=1))
+            exhausted = False
+
+            while not exhausted:
+                in_batch = 0
+                with conn.transaction():
+                    for line_number, line in pending:
+                        if not line.strip():
+                            continue
+
+                        summary["commands"] += 1
+                        in_batch += 1
+                        try:
+                            command = _parse(line)
+                            with conn.transaction():
+                                result = OPERATIONS[command["op"]](cur, command)
+                            emit({"line": line_number, "op": command["op"], "ok": True, "result": result})
+                            summary["ok"] += 1
+                        except (CommandError, ValueError, psycopg.Error) as e:
+                            emit({"line": line_number, "ok": False, "error": str(e)})
+                            summary["failed"] += 1
+
+                        if in_batch >= batch_size:
+                            break
+                    else:
+                        exhausted = True
+
+                if in_batch:
+                    summary["transactions"] += 1
+
+        record_write(conn)
+
+    return summary
+
+def main(source="-", batch_size=DEFAULT_BATCH_SIZE):
+    started = time.perf_counter()
+    try:
+        if source == "-":
+            summary = run_batch(sys.stdin, sys.stdout, batch_size)
+        else:
+            with open(source, encoding="utf-8") as f:
+                summary = run_batch(f, sys.stdout, batch_size)
+    except psycopg.Error as e:
+        print("❌ Batch aborted.", file=sys.stderr)
+        print("Error:", e, file=sys.stderr)
+        return
+
+    elapsed = time.perf_counter() - started
+    rate = summary["commands"] / elapsed if elapsed else 0
+    print(
+        f"✅ {summary['ok']} ok, {summary['failed']} failed, "
+        f"{summary['transactions']} transaction(s), {rate:,.0f} commands/s",
+        file=sys.stderr,
+    )
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "-")
@@ -1,100 +1,259 @@
-import os
 import psycopg
 from collections import defaultdict
-from dotenv import load_dotenv
-
-# Load values from .env file
-load_dotenv()
-
-DB_CONNECTION = {
-    "dbname": os.getenv("PGDATABASE", "Movies"),
-    "user": os.getenv("PGUSER", "postgres"),
-    "password": os.getenv("PGPASSWORD", ""),
-    "host": os.getenv("PGHOST", "localhost"),
-    "port": os.getenv("PGPORT", "5432"),
-}
-
-def test_connection_and_list_tables():
-    try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT version();")
-                version = cur.fetchone()[0]
-                print("\n✅ Connection successful!")
-                print("PostgreSQL version:", version)
-
-                cur.execute("""
-                    SELECT table_name
-                    FROM information_schema.tables
-                    WHERE table_schema = 'public'
-                    AND table_type = 'BASE TABLE';
-                """)
-                tables = cur.fetchall()
-
-                if tables:
-                    print("\n📋 Tables in the database:")
-                    for table in tables:
-                        print("  -", table[0])
-                else:
-                    print("\n⚠️ No tables found in the public schema.")
-            return True
-
-    except psycopg.Error as e:
-        print("\n❌ Connection failed.")
-        print("Error:", e)
-        return False
+from db_connections import connect_read, connect_write, record_write
+from title_search import search_titles
+from db_diagnostics import test_connection_and_list_tables
+
+# The movie, star and appearance are each inserted with ON CONFLICT DO
+# NOTHING on their unique key (see unique_keys.py). A concurrent writer
+# adding the same row makes the insert wait, then skip it, so N workers can
+# ingest in parallel without duplicates. Rows that already exist are never
+# locked. UPSERT_MOVIE_STAR_SQL does all three in one data-modifying CTE, so
+# an edit is one round trip; each step reads the existing id only when its
+# insert returned nothing.
+UPSERT_MOVIE_STAR_SQL = """
+    WITH new_movie AS (
+        INSERT INTO movies (title, release_year) VALUES (%(title)s, %(year)s)
+        ON CONFLICT (title, release_year) DO NOTHING
+        RETURNING id
+    ),
+    movie AS (
+        SELECT id, true AS created FROM new_movie
+        UNION ALL
+        (SELECT id, false FROM movies
+         WHERE title = %(title)s AND release_year IS NOT DISTINCT FROM %(year)s
+           AND NOT EXISTS (SELECT 1 FROM new_movie)
+         LIMIT 1)
+    ),
+    new_star AS (
+        INSERT INTO stars (actor_name) VALUES (%(star)s)
+        ON CONFLICT (actor_name) DO NOTHING
+        RETURNING id
+    ),
+    star AS (
+        SELECT id, true AS created FROM new_star
+        UNION ALL
+        (SELECT id, false FROM stars
+         WHERE actor_name = %(star)s AND NOT EXISTS (SELECT 1 FROM new_star)
+         LIMIT 1)
+    ),
+    new_appearance AS (
+        INSERT INTO appearances (movie_id, star_id)
+        SELECT movie.id, star.id FROM movie, star
+        ON CONFLICT (movie_id, star_id) DO NOTHING
+        RETURNING id
+    ),
+    appearance AS (
+        SELECT id, true AS created FROM new_appearance
+        UNION ALL
+        (SELECT a.id, false FROM appearances a, movie, star
+         WHERE a.movie_id = movie.id AND a.star_id = star.id
+           AND NOT EXISTS (SELECT 1 FROM new_appearance)
+         LIMIT 1)
+    )
+    SELECT movie.id, COALESCE(movie.created, false),
+           star.id, COALESCE(star.created, false),
+           appearance.id, COALESCE(appearance.created, false)
+    FROM (SELECT) AS one
+    LEFT JOIN movie ON true
+    LEFT JOIN star ON true
+    LEFT JOIN appearance ON true;
+"""
+
+INSERT_STAR_SQL = """
+    INSERT INTO stars (actor_name) VALUES (%(star)s)
+    ON CONFLICT (actor_name) DO NOTHING
+    RETURNING id
+"""
+SELECT_STAR_SQL = "SELECT id FROM stars WHERE actor_name = %(star)s"
+INSERT_APPEARANCE_SQL = """
+    INSERT INTO appearances (movie_id, star_id) VALUES (%(movie_id)s, %(star_id)s)
+    ON CONFLICT (movie_id, star_id) DO NOTHING
+    RETURNING id
+"""
+
+# Every actor for one movie in a handful of statements. Names are
+# de-duplicated and rows are inserted in key order.
+INSERT_STARS_SQL = """
+    INSERT INTO stars (actor_name)
+    SELECT name FROM unnest(%s::text[]) AS n(name) ORDER BY name
+    ON CONFLICT (actor_name) DO NOTHING
+    RETURNING actor_name, id
+"""
+INSERT_APPEARANCES_SQL = """
+    INSERT INTO appearances (movie_id, star_id)
+    SELECT %s, star_id FROM unnest(%s::int[]) AS s(star_id) ORDER BY star_id
+    ON CONFLICT (movie_id, star_id) DO NOTHING
+    RETURNING star_id, id
+"""
+
+def insert_or_select(cur, insert_sql, select_sql, params):
+    # (id, created). Loops in the rare case the existing row is deleted
+    # between the two statements.
+    while True:
+        cur.execute(insert_sql, params)
+        row = cur.fetchone()
+        if row:
+            return row[0], True
+        cur.execute(select_sql, params)
+        row = cur.fetchone()
+        if row:
+            return row[0], False
+
+def upsert_movie_star(cur, movie_title, release_year, star_name):
+    # The lookups share the statement's snapshot, so a row committed by
+    # another writer while the insert waited is not visible to them and that
+    # step comes back NULL. Re-running the statement (new snapshot) picks it
+    # up; what this transaction already created is kept from the first pass.
+    params = {"title": movie_title, "year": release_year, "star": star_name}
+    created = [False, False, False]
+    while True:
+        cur.execute(UPSERT_MOVIE_STAR_SQL, params)
+        movie_id, movie_new, star_id, star_new, appearance_id, appearance_new = cur.fetchone()
+        created = [was or now for was, now in zip(created, (movie_new, star_new, appearance_new))]
+        if appearance_id is not None:
+            break
+    movie_created, star_created, appearance_created = created
+
+    return {
+        "movie_id": movie_id,
+        "movie_created": movie_created,
+        "star_id": star_id,
+        "star_created": star_created,
+        "appearance_id": appearance_id,
+        "appearance_created": appearance_created,
+    }
+
+def find_movies_by_title(cur, title):
+    cur.execute(
+        "SELECT id, title, release_year FROM movies WHERE title ILIKE %s",
+        (title,)
+    )
+    return cur.fetchall()
+
+def link_actors_to_movie(cur, movie_id, actor_list):
+    # Input order, first occurrence of each name
+    names = list(dict.fromkeys(name.strip() for name in actor_list if name.strip()))
+    if not names:
+        return []
+
+    star_ids, created = {}, set()
+    while len(star_ids) < len(names):
+        missing = [name for name in names if name not in star_ids]
+        cur.execute(INSERT_STARS_SQL, (missing,))
+        for actor_name, star_id in cur.fetchall():
+            star_ids[actor_name] = star_id
+            created.add(actor_name)
+        cur.execute("SELECT actor_name, id FROM stars WHERE actor_name = ANY(%s)",
+                    ([name for name in missing if name not in star_ids],))
+        star_ids.update(cur.fetchall())
+
+    cur.execute(INSERT_APPEARANCES_SQL, (movie_id, sorted(set(star_ids.values()))))
+    appearance_ids = dict(cur.fetchall())
+    linked = set(appearance_ids)
+    existing = [star_id for star_id in star_ids.values() if star_id not in appearance_ids]
+    if existing:
+        cur.execute("SELECT star_id, id FROM appearances WHERE movie_id = %s AND star_id = ANY(%s)",
+                    (movie_id, existing))
+        appearance_ids.update(cur.fetchall())
+
+    return [
+        {
+            "actor": name,
+            "star_id": star_ids[name],
+            "star_created": name in created,
+            "appearance_id": appearance_ids.get(star_ids[name]),
+            "linked": star_ids[name] in linked,
+        }
+        for name in names
+    ]
+
+def fetch_actors_for_movie(cur, movie_id):
+    cur.execute("""
+        SELECT s.actor_name
+        FROM appearances a
+        JOIN stars s ON a.star_id = s.id
+        WHERE a.movie_id = %s
+        ORDER BY s.actor_name;
+    """, (movie_id,))
+    return [row[0] for row in cur.fetchall()]
+
+def fetch_movies_for_actor(cur, actor_name):
+    # None when the actor is unknown, otherwise a (possibly empty) list
+    cur.execute("SELECT id FROM stars WHERE actor_name = %s", (actor_name,))
+    star = cur.fetchone()
+    if not star:
+        return None
+
+    cur.execute("""
+        SELECT m.title, m.release_year
+        FROM appearances a
+        JOIN movies m ON a.movie_id = m.id
+        WHERE a.star_id = %s
+        ORDER BY m.release_year, m.title;
+    """, (star[0],))
+    return cur.fetchall()
+
+def choose_movie(matches, title, header=None):
+    if len(matches) > 1:
+        print(header or f"\n⚠️ Multiple movies found for '{title}':")
+        for i, (mid, t, y) in enumerate(matches, 1):
+            print(f"  {i}. {t} ({y})")
+        selection = input("Select movie number: ").strip()
+        if not selection.isdigit() or int(selection) not in range(1, len(matches) + 1):
+            print("❌ Invalid selection.")
+            return None
+        return matches[int(selection) - 1]
+    return matches[0]
+
+def search_movie(cur, title):
+    # Exact (case-insensitive) matches win; otherwise offer the closest
+    # titles from the ranked search. Returns (id, title, year) or None.
+    candidates = search_titles(cur, title)
+    exact = [c[:3] for c in candidates if c[3] == "exact"]
+    if exact:
+        return choose_movie(exact, title)
+
+    if not candidates:
+        print(f"❌ No movie found with title: {title}")
+        return None
+
+    if len(candidates) == 1:
+        movie_id, found_title, year = candidates[0][:3]
+        confirm = input(f"Did you mean '{found_title}' ({year})? (Y/n): ").strip().lower()
+        if confirm in ("", "y", "yes"):
+            return candidates[0][:3]
+        print("No movie selected.")
+        return None
+
+    return choose_movie(
+        [c[:3] for c in candidates], title,
+        header=f"\n🔎 No exact match for '{title}'. Closest titles:",
+    )
 
 def insert_into_database(movie_title, release_year, star_name):
     try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
+        with connect_write() as conn:
             with conn.cursor() as cur:
-                # Check or insert movie
-                cur.execute(
-                    "SELECT id FROM movies WHERE title = %s AND release_year = %s",
-                    (movie_title, release_year)
-                )
-                movie = cur.fetchone()
-                if movie:
-                    movie_id = movie[0]
-                    print(f"🎬 Movie '{movie_title}' already exists (ID {movie_id}).")
-                else:
-                    cur.execute(
-                        "INSERT INTO movies (title, release_year) VALUES (%s, %s) RETURNING id",
-                        (movie_title, release_year)
-                    )
-                    movie_id = cur.fetchone()[0]
-                    print(f"🎬 Inserted movie '{movie_title}' (ID {movie_id}).")
-
-                # Check or insert star
-                cur.execute("SELECT id FROM stars WHERE actor_name = %s", (star_name,))
-                star = cur.fetchone()
-                if star:
-                    star_id = star[0]
-                    print(f"⭐ Star '{star_name}' already exists (ID {star_id}).")
-                else:
-                    cur.execute(
-                        "INSERT INTO stars (actor_name) VALUES (%s) RETURNING id",
-                        (star_name,)
-                    )
-                    star_id = cur.fetchone()[0]
-                    print(f"⭐ Inserted new star '{star_name}' (ID {star_id}).")
-
-                # Link in appearances
-                cur.execute(
-                    "SELECT id FROM appearances WHERE movie_id = %s AND star_id = %s",
-                    (movie_id, star_id)
-                )
-                if cur.fetchone():
-                    print(f"🔁 Appearance already recorded for '{star_name}' in '{movie_title}'.")
-                else:
-                    cur.execute(
-                        "INSERT INTO appearances (movie_id, star_id) VALUES (%s, %s) RETURNING id",
-                        (movie_id, star_id)
-                    )
-                    appearance_id = cur.fetchone()[0]
-                    print(f"🎭 Linked appearance (ID {appearance_id}) of '{star_name}' in '{movie_title}'.")
+                result = upsert_movie_star(cur, movie_title, release_year, star_name)
 
             conn.commit()
+            record_write(conn)
+
+        if result["movie_created"]:
+            print(f"🎬 Inserted movie '{movie_title}' (ID {result['movie_id']}).")
+        else:
+            print(f"🎬 Movie '{movie_title}' already exists (ID {result['movie_id']}).")
+
+        if result["star_created"]:
+            print(f"⭐ Inserted new star '{star_name}' (ID {result['star_id']}).")
+        else:
+            print(f"⭐ Star '{star_name}' already exists (ID {result['star_id']}).")
+
+        if result["appearance_created"]:
+            print(f"🎭 Linked appearance (ID {result['appearance_id']}) of '{star_name}' in '{movie_title}'.")
+        else:
+            print(f"🔁 Appearance already recorded for '{star_name}' in '{movie_title}'.")
 
     except psycopg.Error as e:
         print("\n❌ Insert failed.")
@@ -105,66 +264,28 @@ def insert_into_database(movie_title, release_year, star_name):
 
 def add_actors_to_movie(title, actor_list):
     try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
+        with connect_write() as conn:
             with conn.cursor() as cur:
-                # Find movie(s) by title only
-                cur.execute(
-                    "SELECT id, title, release_year FROM movies WHERE title ILIKE %s",
-                    (title,)
-                )
-                matches = cur.fetchall()
-
-                if not matches:
-                    print(f"❌ No movie found with title: {title}")
+                # Find the movie by (partial) title
+                selected = search_movie(cur, title)
+                if not selected:
                     return
+                movie_id, movie_title, movie_year = selected
 
-                if len(matches) > 1:
-                    print(f"\n⚠️ Multiple movies found for '{title}':")
-                    for i, (mid, t, y) in enumerate(matches, 1):
-                        print(f"  {i}. {t} ({y})")
-                    selection = input("Select movie number: ").strip()
-                    if not selection.isdigit() or int(selection) not in range(1, len(matches) + 1):
-                        print("❌ Invalid selection.")
-                        return
-                    movie_id, movie_title, movie_year = matches[int(selection) - 1]
-                else:
-                    movie_id, movie_title, movie_year = matches[0]
-
-                for actor_name in actor_list:
-                    actor_name = actor_name.strip()
-                    if not actor_name:
-                        continue
-
-                    # Check or insert star
-                    cur.execute("SELECT id FROM stars WHERE actor_name = %s", (actor_name,))
-                    star = cur.fetchone()
-                    if star:
-                        star_id = star[0]
-                        print(f"⭐ Found existing star: {actor_name} (ID {star_id})")
+                for link in link_actors_to_movie(cur, movie_id, actor_list):
+                    actor_name = link["actor"]
+                    if link["star_created"]:
+                        print(f"🌟 Inserted new star: {actor_name} (ID {link['star_id']})")
                     else:
-                        cur.execute(
-                            "INSERT INTO stars (actor_name) VALUES (%s) RETURNING id",
-                            (actor_name,)
-                        )
-                        star_id = cur.fetchone()[0]
-                        print(f"🌟 Inserted new star: {actor_name} (ID {star_id})")
-
-                    # Link to movie
-                    cur.execute(
-                        "SELECT id FROM appearances WHERE movie_id = %s AND star_id = %s",
-                        (movie_id, star_id)
-                    )
-                    if cur.fetchone():
-                        print(f"🔁 Already linked: {actor_name} in '{movie_title}'")
+                        print(f"⭐ Found existing star: {actor_name} (ID {link['star_id']})")
+
+                    if link["linked"]:
+                        print(f"✅ Linked {actor_name} to '{movie_title}' (Appearance ID: {link['appearance_id']})")
                     else:
-                        cur.execute(
-                            "INSERT INTO appearances (movie_id, star_id) VALUES (%s, %s) RETURNING id",
-                            (movie_id, star_id)
-                        )
-                        new_id = cur.fetchone()[0]
-                        print(f"✅ Linked {actor_name} to '{movie_title}' (Appearance ID: {new_id})")
+                        print(f"🔁 Already linked: {actor_name} in '{movie_title}'")
 
             conn.commit()
+            record_write(conn)
 
     except psycopg.Error as e:
         print("❌ Error during actor linking.")
@@ -175,45 +296,22 @@ def add_actors_to_movie(title, actor_list):
 
 def list_actors_for_movie(title):
     try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
+        with connect_read(read_your_writes=True) as conn:
             with conn.cursor() as cur:
-                # Search by title only
-                cur.execute(
-                    "SELECT id, title, release_year FROM movies WHERE title ILIKE %s",
-                    (title,)
-                )
-                movies = cur.fetchall()
-                if not movies:
-                    print(f"❌ No movies found with title: {title}")
+                # Search by (partial) title
+                selected = search_movie(cur, title)
+                if not selected:
                     return
-
-                if len(movies) > 1:
-                    print(f"\n⚠️ Multiple movies found for '{title}':")
-                    for i, (movie_id, t, y) in enumerate(movies, 1):
-                        print(f"  {i}. {t} ({y})")
-                    selection = input("Select movie number: ").strip()
-                    if not selection.isdigit() or int(selection) not in range(1, len(movies)+1):
-                        print("❌ Invalid selection.")
-                        return
-                    movie_id, selected_title, selected_year = movies[int(selection)-1]
-                else:
-                    movie_id, selected_title, selected_year = movies[0]
+                movie_id, selected_title, selected_year = selected
 
                 # Get actors
-                cur.execute("""
-                    SELECT s.actor_name
-                    FROM appearances a
-                    JOIN stars s ON a.star_id = s.id
-                    WHERE a.movie_id = %s
-                    ORDER BY s.actor_name;
-                """, (movie_id,))
-                actors = cur.fetchall()
+                actors = fetch_actors_for_movie(cur, movie_id)
 
                 print(f"\n🎞️ Movie: {selected_title} ({selected_year})")
                 if actors:
                     print("👥 Actors in this movie:")
                     for actor in actors:
-                        print("  -", actor[0])
+                        print("  -", actor)
                 else:
                     print("⚠️ No actors recorded for this movie.")
 
@@ -225,28 +323,14 @@ def list_actors_for_movie(title):
 
 def list_movies_for_actor(actor_name):
     try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
+        with connect_read(read_your_writes=True) as conn:
             with conn.cursor() as cur:
-                # Look up star
-                cur.execute("SELECT id FROM stars WHERE actor_name = %s", (actor_name,))
-                star = cur.fetchone()
-                if not star:
+                # Look up star and all movies they appeared in
+                movies = fetch_movies_for_actor(cur, actor_name)
+                if movies is None:
                     print(f"❌ Actor not found: {actor_name}")
                     return
 
-                star_id = star[0]
-
-                # Get all movies they appeared in
-                cur.execute("""
-                    SELECT m.title, m.release_year
-                    FROM appearances a
-                    JOIN movies m ON a.movie_id = m.id
-                    WHERE a.star_id = %s
-                    ORDER BY m.release_year, m.title;
-                """, (star_id,))
-
-                movies = cur.fetchall()
-
                 print(f"\n🎭 Actor: {actor_name}")
                 if movies:
                     print("🎬 Movies featuring this actor:")
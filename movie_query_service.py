@@ -0,0 +1,336 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+import psycopg
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+from db_connections import DB_CONNECTION, DB_READ_CONNECTION, READ_REPLICA_CONFIGURED, READ_SESSION_OPTIONS
+
+# Small read-only HTTP/JSON service over the movie database, so dashboards
+# and scripts can share one warm process instead of paying interpreter
+# start-up and a new connection per lookup. Standard-library asyncio
+# server, psycopg_pool for connections (pip install psycopg_pool), an
+# in-memory TTL cache in front of the queries, and a semaphore so a burst
+# of requests queues here instead of piling onto the database.
+#
+#   GET /health
+#   GET /movies?limit=50&after=<id>&year=1995      catalog page
+#   GET /actors?limit=50&after=<id>                 catalog page
+#   GET /movie/actors?title=Heat[&year=1995]
+#   GET /actor/movies?name=Al Pacino
+#   GET /actor/collaborators?name=Al Pacino&limit=20
+#   GET /pair?a=Al Pacino&b=Robert De Niro
+
+HOST = os.getenv("MOVIES_SERVICE_HOST", "127.0.0.1")
+PORT = int(os.getenv("MOVIES_SERVICE_PORT", "8765"))
+POOL_MIN = int(os.getenv("MOVIES_POOL_MIN", "2"))
+POOL_MAX = int(os.getenv("MOVIES_POOL_MAX", "10"))
+MAX_CONCURRENT_QUERIES = int(os.getenv("MOVIES_MAX_CONCURRENT_QUERIES", str(POOL_MAX)))
+CACHE_TTL = float(os.getenv("MOVIES_CACHE_TTL", "30"))
+CACHE_ENTRIES = 1024
+MAX_PAGE_SIZE = 500
+IDLE_TIMEOUT = 15
+
+
+class BadRequest(Exception):
+    status = 400
+
+class NotFound(Exception):
+    status = 404
+
+
+class TTLCache:
+    # LRU with per-entry expiry. Identical requests that arrive while the
+    # first one is still running share its result instead of querying again.
+    def __init__(self, ttl=CACHE_TTL, size=CACHE_ENTRIES):
+        self.ttl = ttl
+        self.size = size
+        self._entries = OrderedDict()
+        self._pending = {}
+        self.hits = self.misses = 0
+
+    async def get_or_compute(self, key, compute):
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        if key in self._pending:
+            self.hits += 1
+            return await asyncio.shield(self._pending[key])
+
+        self.misses += 1
+        future = asyncio.ensure_future(compute())
+        self._pending[key] = future
+        try:
+            value = await future
+        finally:
+            self._pending.pop(key, None)
+
+        if self.ttl > 0:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return value
+
+
+def _param(params, name, required=True, kind=str, default=None):
+    values = params.get(name)
+    if not values or not values[0].strip():
+        if required:
+            raise BadRequest(f"Missing parameter: {name}")
+        return default
+    try:
+        return kind(values[0].strip())
+    except ValueError:
+        raise BadRequest(f"Invalid value for {name}: {values[0]!r}")
+
+def _page_size(params):
+    return max(1, min(_param(params, "limit", False, int, 50), MAX_PAGE_SIZE))
+
+
+async def list_movies(cur, params):
+    limit = _page_size(params)
+    after = _param(params, "after", False, int, 0)
+    year = _param(params, "year", False, int)
+    await cur.execute("""
+        SELECT id, title, release_year
+        FROM movies
+        WHERE id > %(after)s AND (%(year)s::int IS NULL OR release_year = %(year)s)
+        ORDER BY id
+        LIMIT %(limit)s;
+    """, {"after": after, "year": year, "limit": limit})
+    rows = await cur.fetchall()
+    return {
+        "items": [{"id": i, "title": t, "year": y} for i, t, y in rows],
+        "next": rows[-1][0] if len(rows) == limit else None,
+    }
+
+async def list_stars(cur, params):
+    limit = _page_size(params)
+    after = _param(params, "after", False, int, 0)
+    await cur.execute("""
+        SELECT id, actor_name FROM stars
+        WHERE id > %s
+        ORDER BY id
+        LIMIT %s;
+    """, (after, limit))
+    rows = await cur.fetchall()
+    return {
+        "items": [{"id": i, "name": n} for i, n in rows],
+        "next": rows[-1][0] if len(rows) == limit else None,
+    }
+
+async def actors_for_movie(cur, params):
+    title = _param(params, "title")
+    year = _param(params, "year", False, int)
+    await cur.execute("""
+        SELECT m.id, m.title, m.release_year,
+               COALESCE(ARRAY_AGG(s.actor_name ORDER BY s.actor_name) FILTER (WHERE s.id IS NOT NULL), '{}')
+        FROM movies m
+        LEFT JOIN appearances a ON a.movie_id = m.id
+        LEFT JOIN stars s ON s.id = a.star_id
+        WHERE lower(m.title) = lower(%(title)s) AND (%(year)s::int IS NULL OR m.release_year = %(year)s)
+        GROUP BY m.id, m.title, m.release_year
+        ORDER BY m.release_year, m.id;
+    """, {"title": title, "year": year})
+    rows = await cur.fetchall()
+    if not rows:
+        raise NotFound(f"No movie found with title '{title}'")
+    return [{"id": i, "title": t, "year": y, "actors": actors} for i, t, y, actors in rows]
+
+async def _require_actor(cur, name):
+    # 404 for unknown actors; a known actor with no rows gets an empty list
+    await cur.execute("SELECT EXISTS (SELECT 1 FROM stars WHERE actor_name = %s);", (name,))
+    if not (await cur.fetchone())[0]:
+        raise NotFound(f"No actor named '{name}'")
+
+async def movies_for_actor(cur, params):
+    name = _param(params, "name")
+    await cur.execute("""
+        SELECT m.title, m.release_year
+        FROM stars s
+        JOIN appearances a ON a.star_id = s.id
+        JOIN movies m ON m.id = a.movie_id
+        WHERE s.actor_name = %s
+        ORDER BY m.release_year, m.title;
+    """, (name,))
+    rows = await cur.fetchall()
+    if not rows:
+        await _require_actor(cur, name)
+    return {"actor": name, "movies": [{"title": t, "year": y} for t, y in rows]}
+
+async def collaborators(cur, params):
+    name = _param(params, "name")
+    limit = _page_size(params)
+    await cur.execute("""
+        SELECT s2.actor_name, COUNT(DISTINCT a1.movie_id) AS shared_movies
+        FROM stars s1
+        JOIN appearances a1 ON a1.star_id = s1.id
+        JOIN appearances a2 ON a2.movie_id = a1.movie_id AND a2.star_id <> a1.star_id
+        JOIN stars s2 ON s2.id = a2.star_id
+        WHERE s1.actor_name = %s
+        GROUP BY s2.actor_name
+        ORDER BY shared_movies DESC, s2.actor_name
+        LIMIT %s;
+    """, (name, limit))
+    rows = await cur.fetchall()
+    if not rows:
+        await _require_actor(cur, name)
+    return {"actor": name, "collaborators": [{"name": n, "shared_movies": c} for n, c in rows]}
+
+async def pair_stats(cur, params):
+    actor_a, actor_b = _param(params, "a"), _param(params, "b")
+    await cur.execute("""
+        SELECT m.title, m.release_year
+        FROM movies m
+        JOIN appearances a1 ON a1.movie_id = m.id
+        JOIN stars s1 ON s1.id = a1.star_id AND s1.actor_name = %s
+        JOIN appearances a2 ON a2.movie_id = m.id
+        JOIN stars s2 ON s2.id = a2.star_id AND s2.actor_name = %s
+        GROUP BY m.id, m.title, m.release_year
+        ORDER BY m.release_year, m.title;
+    """, (actor_a, actor_b))
+    rows = await cur.fetchall()
+    return {
+        "a": actor_a,
+        "b": actor_b,
+        "shared_movies": len(rows),
+        "movies": [{"title": t, "year": y} for t, y in rows],
+        "first_year": rows[0][1] if rows else None,
+        "last_year": rows[-1][1] if rows else None,
+    }
+
+ROUTES = {
+    "/movies": list_movies,
+    "/actors": list_stars,
+    "/movie/actors": actors_for_movie,
+    "/actor/movies": movies_for_actor,
+    "/actor/collaborators": collaborators,
+    "/pair": pair_stats,
+}
+
+
+class QueryService:
+    def __init__(self, pool, cache_ttl=CACHE_TTL, max_concurrent=MAX_CONCURRENT_QUERIES):
+        self.pool = pool
+        self.cache = TTLCache(cache_ttl)
+        self.limit = asyncio.Semaphore(max_concurrent)
+        self.requests = 0
+
+    async def run(self, handler, params):
+        async with self.limit:
+            async with self.pool.connection() as conn:
+                async with conn.cursor() as cur:
+                    return await handler(cur, params)
+
+    async def dispatch(self, target):
+        url = urlsplit(target)
+        if url.path == "/health":
+            return 200, {
+                "ok": True,
+                "requests": self.requests,
+                "cache": {"hits": self.cache.hits, "misses": self.cache.misses},
+                "pool": self.pool.get_stats(),
+            }
+
+        handler = ROUTES.get(url.path.rstrip("/") or "/")
+        if handler is None:
+            return 404, {"error": f"Unknown endpoint: {url.path}"}
+
+        params = parse_qs(url.query)
+        key = (url.path, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+        try:
+            return 200, await self.cache.get_or_compute(key, lambda: self.run(handler, params))
+        except (BadRequest, NotFound) as e:
+            return e.status, {"error": str(e)}
+        except PoolTimeout:
+            return 503, {"error": "Database busy, try again"}
+        except psycopg.Error as e:
+            print("❌ Query failed:", e, file=sys.stderr)
+            return 500, {"error": "Database query failed"}
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3:
+                    break
+                method, target, version = parts
+                self.requests += 1
+
+                if method != "GET":
+                    status, body = 405, {"error": "Only GET is supported"}
+                else:
+                    status, body = await self.dispatch(target)
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                payload = json.dumps(body, default=str).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def _conninfo():
+    # Reads go to the replica when one is configured (see db_connections.py)
+    if READ_REPLICA_CONFIGURED:
+        return make_conninfo(**DB_READ_CONNECTION, target_session_attrs="prefer-standby", **READ_SESSION_OPTIONS)
+    return make_conninfo(**DB_CONNECTION, **READ_SESSION_OPTIONS)
+
+async def _configure(conn):
+    await conn.set_autocommit(True)
+    await conn.set_read_only(True)
+
+async def serve(host=HOST, port=PORT, pool_min=POOL_MIN, pool_max=POOL_MAX, cache_ttl=CACHE_TTL):
+    async with AsyncConnectionPool(_conninfo(), min_size=pool_min, max_size=pool_max,
+                                   configure=_configure, open=False) as pool:
+        await pool.wait(timeout=10)
+        service = QueryService(pool, cache_ttl, min(MAX_CONCURRENT_QUERIES, pool_max))
+        server = await asyncio.start_server(service.handle_client, host, port)
+        print(f"✅ Movie query service on http://{host}:{port} (pool {pool_min}-{pool_max}, cache {cache_ttl:g}s)")
+        async with server:
+            await server.serve_forever()
+
+def main(host=HOST, port=PORT, pool_max=POOL_MAX, cache_ttl=CACHE_TTL):
+    try:
+        asyncio.run(serve(host, port, min(POOL_MIN, pool_max), pool_max, cache_ttl))
+    except PoolTimeout as e:
+        print("❌ Could not connect to the database.")
+        print("Error:", e)
+    except KeyboardInterrupt:
+        print("\nStopped.")
+
+if __name__ == "__main__":
+    main(port=int(sys.argv[1]) if len(sys.argv) > 1 else PORT)
@@ -1,22 +1,57 @@
+import json
 import os
+import time
 import psycopg
 from collections import defaultdict
-from dotenv import load_dotenv
+from db_connections import connect_read, connect_write
+import parallel_pair_counts
+import change_counters
+from movie_database_cli import INSERT_APPEARANCE_SQL, INSERT_STAR_SQL, SELECT_STAR_SQL, insert_or_select
 
-# Load values from .env file
-load_dotenv()
+HEALTH_CACHE_PATH = os.getenv("MOVIES_HEALTH_CACHE", "catalog_health.json")
+HEALTH_CACHE_TTL = 3600   # seconds; the cache is also dropped when any table changes
 
-DB_CONNECTION = {
-    "dbname": os.getenv("PGDATABASE", "Movies"),
-    "user": os.getenv("PGUSER", "postgres"),
-    "password": os.getenv("PGPASSWORD", ""),
-    "host": os.getenv("PGHOST", "localhost"),
-    "port": os.getenv("PGPORT", "5432"),
-}
+# Every catalog check from one scan of `appearances`: GROUPING SETS counts
+# per movie and per star in the same pass, and each section of the report
+# is derived from those two lists.
+HEALTH_REPORT_SQL = """
+    WITH counts AS (
+        SELECT movie_id, star_id, COUNT(*) AS n, GROUPING(movie_id, star_id) AS grouping_id
+        FROM appearances
+        GROUP BY GROUPING SETS ((movie_id), (star_id))
+    ),
+    movie_cast AS (
+        SELECT m.id, m.title, m.release_year, COALESCE(c.n, 0) AS cast_size
+        FROM movies m
+        LEFT JOIN counts c ON c.grouping_id = 1 AND c.movie_id = m.id
+    ),
+    star_roles AS (
+        SELECT s.id, s.actor_name, COALESCE(c.n, 0) AS roles
+        FROM stars s
+        LEFT JOIN counts c ON c.grouping_id = 2 AND c.star_id = s.id
+    )
+    SELECT 'cast_size' AS section, NULL::int AS id, NULL::text AS name, NULL::int AS year,
+           cast_size AS value, COUNT(*) AS movies
+    FROM movie_cast GROUP BY cast_size
+    UNION ALL
+    SELECT 'roles', NULL, NULL, NULL, roles, COUNT(*) FROM star_roles GROUP BY roles
+    UNION ALL
+    SELECT 'movie', id, title, release_year, cast_size, NULL FROM movie_cast WHERE cast_size <= 1
+    UNION ALL
+    SELECT 'idle_star', id, actor_name, NULL, roles, NULL FROM star_roles WHERE roles = 0
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'top_actor', id, actor_name, NULL::int, roles, NULL::bigint
+        FROM star_roles
+        WHERE roles > 0
+        ORDER BY roles DESC, actor_name
+        LIMIT %(top)s
+    ) top_actors;
+"""
 
 def actor_with_most_appearances():
     try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
+        with connect_read() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     SELECT s.actor_name, COUNT(*) AS appearance_count
@@ -37,7 +72,7 @@ def actor_with_most_appearances():
 
 def movies_without_actors():
     try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
+        with connect_read() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     SELECT m.title, m.release_year
@@ -59,7 +94,7 @@ def movies_without_actors():
 
 def actors_without_movies():
     try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
+        with connect_read() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     SELECT s.actor_name
@@ -81,7 +116,11 @@ def actors_without_movies():
 
 def actor_pairs_by_shared_movies():
     try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
+        if parallel_pair_counts.PAIR_SHARDS > 1:
+            print_actor_pairs(parallel_pair_counts.named_pair_counts())
+            return
+
+        with connect_read() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     SELECT
@@ -97,20 +136,22 @@ def actor_pairs_by_shared_movies():
                     HAVING COUNT(*) > 0
                     ORDER BY shared_movies DESC, actor_1, actor_2;
                 """)
-                results = cur.fetchall()
-                print("\n🤝 Actor pairs who have worked together:")
-                if results:
-                    for actor1, actor2, count in results:
-                        print(f"  - {actor1} & {actor2} — {count} movie(s)")
-                else:
-                    print("⚠️ No actor pairs found.")
+                print_actor_pairs(cur.fetchall())
     except psycopg.Error as e:
         print("❌ Query failed.")
         print("Error:", e)
 
+def print_actor_pairs(results):
+    print("\n🤝 Actor pairs who have worked together:")
+    if results:
+        for actor1, actor2, count in results:
+            print(f"  - {actor1} & {actor2} — {count} movie(s)")
+    else:
+        print("⚠️ No actor pairs found.")
+
 def list_movies_with_one_actor():
     try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
+        with connect_read() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     SELECT m.id, m.title, m.release_year
@@ -126,6 +167,112 @@ def list_movies_with_one_actor():
         print("Error:", e)
         return []
 
+def build_health_report(cur, top=10):
+    cur.execute(HEALTH_REPORT_SQL, {"top": top})
+    report = {
+        "cast_size_distribution": {},
+        "roles_distribution": {},
+        "movies_without_actors": [],
+        "movies_with_one_actor": [],
+        "actors_without_movies": [],
+        "top_actors": [],
+    }
+    for section, item_id, name, year, value, count in cur.fetchall():
+        if section == "cast_size":
+            report["cast_size_distribution"][str(value)] = count
+        elif section == "roles":
+            report["roles_distribution"][str(value)] = count
+        elif section == "movie":
+            key = "movies_without_actors" if value == 0 else "movies_with_one_actor"
+            report[key].append({"id": item_id, "title": name, "year": year})
+        elif section == "idle_star":
+            report["actors_without_movies"].append({"id": item_id, "name": name})
+        else:
+            report["top_actors"].append({"id": item_id, "name": name, "appearances": value})
+
+    for key in ("movies_without_actors", "movies_with_one_actor"):
+        report[key].sort(key=lambda m: (m["year"] or 0, m["title"]))
+    report["actors_without_movies"].sort(key=lambda s: s["name"])
+    report["totals"] = {
+        "movies": sum(report["cast_size_distribution"].values()),
+        "stars": sum(report["roles_distribution"].values()),
+        "appearances": sum(int(size) * n for size, n in report["cast_size_distribution"].items()),
+    }
+    return report
+
+def load_health_report(refresh=False, top=10, path=HEALTH_CACHE_PATH):
+    # Returns (report, from_cache). The cache is checked against the change
+    # counters (change_counters.py); without them nothing reliably shows
+    # that a table changed, so the report is always rebuilt.
+    version = change_counters.catalog_version()
+    token, min_lsn = version if version else (None, None)
+
+    if token is not None and not refresh and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            cached = json.load(f)
+        fresh = time.time() - cached.get("generated_at", 0) < HEALTH_CACHE_TTL
+        if fresh and cached.get("token") == token and cached.get("top") == top:
+            return cached, True
+
+    # At least as new as the token, even when read from a replica
+    with connect_read(min_lsn=min_lsn) as conn:
+        with conn.cursor() as cur:
+            report = build_health_report(cur, top)
+
+    report.update({"token": token, "top": top, "generated_at": time.time()})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report, False
+
+def catalog_health_report(refresh=False, top=10, as_json=False):
+    try:
+        report, from_cache = load_health_report(refresh, top)
+    except psycopg.Error as e:
+        print("❌ Query failed.")
+        print("Error:", e)
+        return None
+
+    if as_json:
+        print(json.dumps(report, indent=2))
+        return report
+    if report["token"] is None:
+        print("ℹ️ Run 'python movies.py change-counters' once to let the report be cached.")
+
+    totals = report["totals"]
+    age_minutes = (time.time() - report["generated_at"]) / 60
+    source = f"cached, {age_minutes:.0f} min old" if from_cache else "fresh"
+    print(f"\n🩺 Catalog health report ({source})")
+    print(f"  {totals['movies']:,} movies, {totals['stars']:,} actors, {totals['appearances']:,} appearances")
+
+    if report["top_actors"]:
+        best = report["top_actors"][0]
+        print(f"\n🏆 Actor with most appearances: {best['name']} ({best['appearances']} movies)")
+        for actor in report["top_actors"][1:]:
+            print(f"  - {actor['name']}: {actor['appearances']}")
+
+    print("\n📊 Cast size distribution (actors per movie):")
+    for size, count in sorted(report["cast_size_distribution"].items(), key=lambda item: int(item[0])):
+        print(f"  {int(size):>4}: {count:,} movie(s)")
+
+    print("\n📊 Appearances per actor:")
+    for roles, count in sorted(report["roles_distribution"].items(), key=lambda item: int(item[0])):
+        print(f"  {int(roles):>4}: {count:,} actor(s)")
+
+    for key, label, empty in (
+        ("movies_without_actors", "📋 Movies without any recorded actors", "✅ All movies have at least one actor listed."),
+        ("movies_with_one_actor", "📋 Movies with only one actor", "🎬 All movies have more than one actor."),
+        ("actors_without_movies", "🧍 Actors not linked to any movies", "✅ All actors are linked to at least one movie."),
+    ):
+        items = report[key]
+        print(f"\n{label}: {len(items):,}")
+        if not items:
+            print(empty)
+        for item in items[:20]:
+            print(f"  - {item['title']} ({item['year']})" if "title" in item else f"  - {item['name']}")
+        if len(items) > 20:
+            print(f"  ... and {len(items) - 20:,} more (full list in {HEALTH_CACHE_PATH})")
+    return report
+
 def add_actors_to_movie(movie_id, movie_title):
     print(f"\n➕ Adding actors to '{movie_title}' (Movie ID: {movie_id})")
     while True:
@@ -133,21 +280,17 @@ def add_actors_to_movie(movie_id, movie_title):
         if not actor_name:
             break
         try:
-            with psycopg.connect(DB_CONNECTION) as conn:
+            with connect_write() as conn:
                 with conn.cursor() as cur:
-                    cur.execute("SELECT id FROM stars WHERE actor_name = %s;", (actor_name,))
-                    result = cur.fetchone()
-                    if result:
-                        actor_id = result[0]
+                    # Race-free against other writers without locking rows
+                    # that already exist (see movie_database_cli)
+                    params = {"star": actor_name, "movie_id": movie_id}
+                    params["star_id"], _ = insert_or_select(cur, INSERT_STAR_SQL, SELECT_STAR_SQL, params)
+                    cur.execute(INSERT_APPEARANCE_SQL, params)
+                    if cur.fetchone():
+                        print(f"✅ Added {actor_name}")
                     else:
-                        cur.execute("INSERT INTO stars (actor_name) VALUES (%s) RETURNING id;", (actor_name,))
-                        actor_id = cur.fetchone()[0]
-                    cur.execute("""
-                        INSERT INTO appearances (movie_id, star_id)
-                        VALUES (%s, %s)
-                        ON CONFLICT DO NOTHING;
-                    """, (movie_id, actor_id))
-                    print(f"✅ Added {actor_name}")
+                        print(f"🔁 {actor_name} is already listed")
         except psycopg.Error as e:
             print("❌ Error adding actor.")
             print("Error:", e)
@@ -160,9 +303,10 @@ def main_menu():
         print("3. List actors with no movies recorded")
         print("4. List all actor pairs who have worked together")
         print("5. List movies with one actor and add more")
-        print("6. Exit")
+        print("6. Catalog health report (all checks, one scan)")
+        print("7. Exit")
 
-        choice = input("Choose an option (1–6): ").strip()
+        choice = input("Choose an option (1–7): ").strip()
 
         if choice == "1":
             actor_with_most_appearances()
@@ -190,10 +334,12 @@ def main_menu():
             selected_movie = movies[int(selection) - 1]
             add_actors_to_movie(selected_movie[0], selected_movie[1])
         elif choice == "6":
+            catalog_health_report()
+        elif choice == "7":
             print("👋 Goodbye!")
             break
         else:
-            print("⚠️ Invalid choice. Please enter a number from 1 to 6.")
+            print("⚠️ Invalid choice. Please enter a number from 1 to 7.")
 
 if __name__ == "__main__":
     main_menu()
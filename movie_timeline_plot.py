@@ -1,32 +1,34 @@
-import os
 import psycopg
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import random
-from dotenv import load_dotenv
+import movie_aggregates
+from db_connections import connect_read
+import perf_phases
+import chart_sampling
 
-# Load values from .env file
-load_dotenv()
+# Above this many movies the per-movie scatter is unreadable and slow
+DENSITY_THRESHOLD = 2000
 
-DB_CONNECTION = {
-    "dbname": os.getenv("PGDATABASE", "Movies"),
-    "user": os.getenv("PGUSER", "postgres"),
-    "password": os.getenv("PGPASSWORD", ""),
-    "host": os.getenv("PGHOST", "localhost"),
-    "port": os.getenv("PGPORT", "5432"),
-}
-
-def fetch_movies():
+@perf_phases.timed("fetch")
+def fetch_movies(year_from=None, year_to=None, sample=None):
     try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
+        if sample is not None:
+            rows = movie_aggregates.sampled_movies_with_cast(sample.params())
+            return pd.DataFrame(rows, columns=["title", "release_year", "actor_count"])
+
+        where_sql, params = movie_aggregates.year_range(year_from, year_to, "m.release_year")
+        with connect_read() as conn:
             with conn.cursor() as cur:
-                cur.execute("""
+                cur.execute(f"""
                     SELECT m.title, m.release_year, COUNT(a.star_id) AS actor_count
                     FROM movies m
                     LEFT JOIN appearances a ON m.id = a.movie_id
-                    GROUP BY m.id
+                    {where_sql}
+                    GROUP BY m.id, m.title, m.release_year
                     ORDER BY m.release_year;
-                """)
+                """, params)
                 rows = cur.fetchall()
 
 
@@ -38,7 +40,36 @@ def fetch_movies():
         print("Error:", e)
         return pd.DataFrame()
 
-def plot_timeline(df):
+@perf_phases.timed("fetch")
+def fetch_movie_count(year_from=None, year_to=None):
+    try:
+        return movie_aggregates.movie_count(year_from, year_to)
+    except psycopg.Error as e:
+        print("❌ Failed to count movies.")
+        print("Error:", e)
+        return 0
+
+@perf_phases.timed("fetch")
+def fetch_density_data(top_n=10, year_from=None, year_to=None, sample=None):
+    # Only (year, cast size, movies) cells and the top-N outliers cross the wire,
+    # so memory stays flat no matter how many movies are in the catalog.
+    try:
+        if sample is not None:
+            cells = movie_aggregates.sampled_year_actor_bins(sample.params())
+            outliers = movie_aggregates.sampled_top_movies_by_cast(sample.params(), top_n)
+            return np.array(cells, dtype=np.int64).reshape(-1, 3), outliers
+
+        cells = np.array(movie_aggregates.year_actor_bins(year_from, year_to), dtype=np.int64).reshape(-1, 3)
+        outliers = movie_aggregates.top_movies_by_cast(top_n, year_from, year_to)
+        return cells, outliers
+
+    except psycopg.Error as e:
+        print("❌ Failed to fetch movie data.")
+        print("Error:", e)
+        return np.empty((0, 3), dtype=np.int64), []
+
+@perf_phases.timed("render")
+def plot_timeline(df, sample=None):
     if df.empty:
         print("⚠️ No data to display.")
         return
@@ -75,12 +106,100 @@ def plot_timeline(df):
             )
 
     plt.colorbar(scatter, label="Number of Actors")
+    if sample is not None:
+        sample.annotate()
     plt.tight_layout()
-    plt.show()
+    chart_sampling.show(sample)
+
+@perf_phases.timed("transform")
+def bin_density(cells, max_actor_bins=40):
+    years, actor_counts, movies = cells[:, 0], cells[:, 1], cells[:, 2]
+
+    year_edges = np.arange(years.min(), years.max() + 2) - 0.5
+    top_count = max(int(actor_counts.max()), 1)
+    actor_step = max(1, int(np.ceil((top_count + 1) / max_actor_bins)))
+    actor_edges = np.arange(0, top_count + actor_step + 1, actor_step) - 0.5
+
+    grid, year_edges, actor_edges = np.histogram2d(
+        years, actor_counts, bins=(year_edges, actor_edges), weights=movies
+    )
+    return grid, year_edges, actor_edges
+
+@perf_phases.timed("render")
+def plot_timeline_density(cells, outliers, sample=None):
+    if len(cells) == 0:
+        print("⚠️ No data to display.")
+        return
+
+    grid, year_edges, actor_edges = bin_density(cells)
+    total_movies = int(cells[:, 2].sum())
+
+    plt.figure(figsize=(14, 6))
+    # Log scale keeps sparse years visible next to very busy ones
+    image = plt.imshow(
+        np.log1p(grid.T),
+        origin="lower",
+        aspect="auto",
+        interpolation="nearest",
+        cmap="viridis",
+        extent=(year_edges[0], year_edges[-1], actor_edges[0], actor_edges[-1]),
+    )
+
+    plt.xlabel("Release Year")
+    plt.ylabel("Number of Actors")
+    estimate = "~" if sample is not None else ""
+    plt.title(f"Movie Timeline Density — {estimate}{total_movies:,} Movies by Year and Cast Size")
+    plt.grid(axis="x", linestyle="--", alpha=0.3)
+
+    for title, year, actor_count in outliers:
+        plt.annotate(
+            title,
+            (year, actor_count),
+            textcoords="offset points",
+            xytext=(0, 6),
+            ha='center',
+            fontsize=8,
+            color="white"
+        )
+
+    colorbar = plt.colorbar(image, label="Movies (log scale)")
+    ticks = colorbar.get_ticks()
+    colorbar.set_ticks(ticks)
+    colorbar.set_ticklabels([f"{np.expm1(t):,.0f}" for t in ticks])
+    if sample is not None:
+        sample.annotate()
+    plt.tight_layout()
+    chart_sampling.show(sample)
+
+@perf_phases.profiled("movie_timeline_plot")
+def main(mode="auto", top_n=10, year_from=None, year_to=None, preview=None,
+         sample_size=chart_sampling.PREVIEW_SIZE, preview_only=False):
+    # preview=<method> draws from a sample of movies first (see
+    # chart_sampling.py), then the full data unless preview_only
+    sample = None
+    if preview:
+        try:
+            sample = chart_sampling.sample_movies(preview, sample_size, year_from=year_from, year_to=year_to)
+        except psycopg.Error as e:
+            print("❌ Failed to sample movies.")
+            print("Error:", e)
+            return
+
+    if mode == "auto":
+        movies = sample.population if sample is not None else fetch_movie_count(year_from, year_to)
+        mode = "density" if movies > DENSITY_THRESHOLD else "scatter"
 
-def main():
-    df = fetch_movies()
-    plot_timeline(df)
+    if mode == "density":
+        if sample is not None and not preview_only:
+            sample.follow = (lambda: fetch_density_data(top_n, year_from, year_to),
+                             lambda data: plot_timeline_density(*data))
+        cells, outliers = fetch_density_data(top_n, year_from, year_to, sample)
+        plot_timeline_density(cells, outliers, sample)
+    else:
+        if sample is not None and not preview_only:
+            sample.follow = (lambda: fetch_movies(year_from, year_to), plot_timeline)
+        df = fetch_movies(year_from, year_to, sample)
+        plot_timeline(df, sample)
 
 if __name__ == "__main__":
     main()
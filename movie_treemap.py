@@ -1,71 +1,88 @@
-import os
 import psycopg
 import pandas as pd
 import matplotlib.pyplot as plt
 import squarify  # pip install squarify
-from dotenv import load_dotenv
+import movie_aggregates
 
-# Load values from .env file
-load_dotenv()
+# Blocks smaller than this share of the level are folded into "Other"
+MIN_SHARE = 0.01
+MAX_BLOCKS = 60
 
-DB_CONNECTION = {
-    "dbname": os.getenv("PGDATABASE", "Movies"),
-    "user": os.getenv("PGUSER", "postgres"),
-    "password": os.getenv("PGPASSWORD", ""),
-    "host": os.getenv("PGHOST", "localhost"),
-    "port": os.getenv("PGPORT", "5432"),
-}
 
-
-def fetch_movie_actor_counts():
+def fetch_treemap_level(decade=None, year=None, min_share=MIN_SHARE, max_blocks=MAX_BLOCKS):
     try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT m.title, m.release_year, COUNT(a.star_id) AS actor_count
-                    FROM movies m
-                    LEFT JOIN appearances a ON m.id = a.movie_id
-                    GROUP BY m.id
-                    ORDER BY m.release_year, m.title;
-                """)
-                rows = cur.fetchall()
-
-
-        df = pd.DataFrame(rows, columns=["title", "release_year", "actor_count"])
-        return df
+        rows = movie_aggregates.treemap_level(
+            decade=decade, year=year, min_share=min_share, max_blocks=max_blocks
+        )
+        return pd.DataFrame(rows, columns=["key", "label", "movies", "actors"])
 
     except psycopg.Error as e:
-        print("❌ Failed to fetch movie data.")
+        print("❌ Failed to fetch treemap data.")
         print("Error:", e)
         return pd.DataFrame()
 
-def plot_treemap(df):
+def plot_treemap_level(df, title):
+    df = df[df["actors"] > 0]
     if df.empty:
         print("⚠️ No data to display.")
         return
 
-    # Format labels like: "Titanic (1997)"
-    df["label"] = df.apply(lambda row: f"{row['title']} ({row['release_year']})", axis=1)
-
-    # Actor count determines block size
-    sizes = df["actor_count"].tolist()
-    labels = df["label"].tolist()
-
-    # Optional: hide labels for very small boxes
-    display_labels = [
-        label if size >= 2 else ""
-        for label, size in zip(labels, sizes)
-    ]
+    sizes = df["actors"].tolist()
+    labels = (df["label"] + "\n" + df["movies"].astype(str) + " movies").tolist()
 
     plt.figure(figsize=(16, 10))
-    squarify.plot(sizes=sizes, label=display_labels, alpha=0.8)
+    squarify.plot(sizes=sizes, label=labels, alpha=0.8)
     plt.axis("off")
-    plt.title("Movie TreeMap — Size by Number of Actors")
+    plt.title(title)
     plt.show()
 
+def show_level(decade=None, year=None):
+    if year is not None:
+        title = f"Movie TreeMap — {year} (Size by Number of Actors)"
+    elif decade is not None:
+        title = f"Movie TreeMap — {decade}s by Year (Size by Number of Actors)"
+    else:
+        title = "Movie TreeMap — Decades (Size by Number of Actors)"
+
+    df = fetch_treemap_level(decade=decade, year=year)
+    plot_treemap_level(df, title)
+    return df
+
 def main():
-    df = fetch_movie_actor_counts()
-    plot_treemap(df)
+    decade = year = None
+    while True:
+        df = show_level(decade=decade, year=year)
+
+        if year is not None:
+            prompt = "Press Enter to go back to the decade, or 'exit' to quit: "
+        else:
+            choices = [k for k in df.get("key", []) if k is not None]
+            level = "year" if decade is not None else "decade"
+            print(f"\nAvailable {level}s: {', '.join(choices)}")
+            prompt = f"Enter a {level} to drill into, Enter to go back, or 'exit' to quit: "
+
+        choice = input(prompt).strip().lower()
+        if choice in ("exit", "quit"):
+            break
+
+        if not choice:
+            if year is not None:
+                year = None
+            elif decade is not None:
+                decade = None
+            else:
+                break
+            continue
+
+        value = choice.rstrip("s")
+        if not value.isdigit():
+            print("⚠️ Please enter a number.")
+            continue
+
+        if decade is None:
+            decade = (int(value) // 10) * 10
+        else:
+            year = int(value)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,259 @@
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse
+import importlib
+import os
+import runpy
+import statistics
+import subprocess
+import sys
+import chart_sampling
+
+# Single entry point for every tool in this folder. Only the standard library
+# (and chart_sampling, for its preview settings; it defers its own heavy
+# imports) is imported here; each subcommand imports its own module (and
+# with it psycopg, pandas, matplotlib, networkx, ...) only when it is run.
+#
+#   python movies.py actors "Heat"
+#   python movies.py --timing movies "Al Pacino"
+#   python movies.py check-startup actors
+#   python movies.py --profile-modes cprofile,tracemalloc network
+
+# Target wall time for interpreter start + entry point + subcommand import
+STARTUP_BUDGET_MS = float(os.getenv("MOVIES_STARTUP_BUDGET_MS", "100"))
+
+# --preview/--sample-size/--preview-only for the charts that support it
+PREVIEW_OPTIONS = [
+    ("--preview", {"nargs": "?", "const": chart_sampling.PREVIEW_METHOD, "choices": chart_sampling.METHODS,
+                   "help": "draw from a sample first, then the full data"}),
+    ("--sample-size", {"type": int, "default": chart_sampling.PREVIEW_SIZE}),
+    ("--preview-only", {"action": "store_true", "help": "skip the full render after the preview"}),
+]
+
+# name: (module, function or None to run the module as a script, help, arguments)
+# Positional arguments are passed positionally, "--options" by keyword.
+COMMANDS = {
+    "menu": ("movie_database_cli", "main_menu", "Interactive movie database menu", []),
+    "test-connection": ("db_diagnostics", "test_connection_and_list_tables", "Test the connection and list tables", []),
+    "diagnostics": ("db_diagnostics", "main", "Latency, table/index statistics, bloat and missing indexes", [
+        ("--samples", {"type": int, "default": 20, "help": "round trips to time"}),
+        ("--json", {"action": "store_true", "dest": "as_json"}),
+    ]),
+    "add-movie": ("movie_database_cli", "insert_into_database", "Add a movie with one star", [
+        ("movie_title", {}),
+        ("release_year", {"type": int}),
+        ("star_name", {}),
+    ]),
+    "add-actors": ("movie_database_cli", "add_actors_to_movie", "Add actors to an existing movie", [
+        ("title", {}),
+        ("actor_list", {"nargs": "+", "metavar": "actor"}),
+    ]),
+    "actors": ("movie_database_cli", "list_actors_for_movie", "List the actors in a movie", [("title", {})]),
+    "movies": ("movie_database_cli", "list_movies_for_actor", "List the movies for an actor", [("actor_name", {})]),
+    "search": ("title_search", "main", "Ranked search for partial or misspelled titles", [("query", {})]),
+    "title-index": ("title_search", "main", "Create the pg_trgm index used by title search", []),
+    "batch": ("movie_batch", "main", "Run JSON-lines commands from a file or stdin", [
+        ("source", {"nargs": "?", "default": "-", "metavar": "file"}),
+        ("--batch-size", {"type": int, "default": 500}),
+    ]),
+    "stats": ("movie_stats", "main_menu", "Interactive movie stats menu", []),
+    "health": ("movie_stats", "catalog_health_report", "Catalog health report from a single scan (cached)", [
+        ("--refresh", {"action": "store_true"}),
+        ("--top", {"type": int, "default": 10}),
+        ("--json", {"action": "store_true", "dest": "as_json"}),
+    ]),
+    "collab-summary": ("actor_collab_summary", "main", "Print collaborator lists for every actor", []),
+    "network": ("actor_network", "main", "Draw the full actor collaboration network", [
+        *PREVIEW_OPTIONS,
+    ]),
+    "refresh-graph": ("collab_graph_store", "main", "Incrementally refresh the persisted collaboration graph", [
+        ("--full", {"action": "store_true"}),
+    ]),
+    "top-network": ("actor_nodes_pyvis", "main", "Draw the network of the most connected actors", []),
+    "explore": ("actor_nodes", "main", "Interactive actor collaboration map explorer", []),
+    "csr": ("collab_csr", "main", "Build the memory-mapped CSR graph, or query it for an actor", [
+        ("actor", {"nargs": "?"}),
+        ("--top", {"type": int, "default": 10}),
+        ("--path-to", {"metavar": "ACTOR", "help": "shortest collaboration path to another actor"}),
+        ("--ego", {"type": int, "metavar": "RADIUS", "help": "size of the actor's network within RADIUS steps"}),
+        ("--full", {"action": "store_true"}),
+    ]),
+    "partition": ("partition_migration", "main", "Migrate movies/appearances to partitioned tables online", [
+        ("step", {"nargs": "?", "choices": ["status", "prepare", "copy", "verify", "swap", "run"], "default": "status"}),
+        ("--batch-size", {"type": int, "default": 50_000}),
+        ("--partitions", {"type": int, "default": 16, "help": "hash partitions for appearances"}),
+        ("--pause", {"type": float, "default": 0.0, "help": "seconds to sleep between copy batches"}),
+    ]),
+    "collab-years": ("collab_timeline", "main", "Collaborations per year/decade for a window, or an actor's network growth", [
+        ("actors", {"nargs": "*", "metavar": "actor"}),
+        ("--from-year", {"type": int, "dest": "year_from"}),
+        ("--to-year", {"type": int, "dest": "year_to"}),
+        ("--by", {"choices": ["year", "decade"], "default": "year"}),
+        ("--top", {"type": int, "default": 10}),
+        ("--full", {"action": "store_true", "help": "rebuild the yearly tables from scratch"}),
+        ("--chart", {"action": "store_true", "help": "plot collaborator growth for the given actors"}),
+    ]),
+    "pair-counts": ("parallel_pair_counts", "main", "Count co-appearance pairs across parallel movie_id shards", [
+        ("--shards", {"type": int}),
+    ]),
+    "centrality": ("actor_centrality", "main", "Compute and store PageRank, eigenvector and betweenness scores", [
+        ("--samples", {"type": int, "help": "default: MOVIES_BETWEENNESS_SAMPLES or 256"}),
+        ("--workers", {"type": int, "help": "default: MOVIES_CENTRALITY_WORKERS or the CPU count"}),
+        ("--top", {"type": int, "default": 10}),
+    ]),
+    "role-chart": ("actor_role_chart", "plot_actor_appearance_counts", "Bar chart of roles per actor", [
+        ("--top", {"type": int, "help": "only the N most central actors"}),
+        ("--metric", {"choices": ["weighted_degree", "pagerank", "eigenvector", "betweenness"], "default": "pagerank"}),
+    ]),
+    "per-year": ("movies_per_year", "plot_movies_per_year_with_total", "Bar chart of movies per year", [
+        ("--from-year", {"type": int, "dest": "year_from"}),
+        ("--to-year", {"type": int, "dest": "year_to"}),
+        *PREVIEW_OPTIONS,
+    ]),
+    "decades": ("decade_boxes", "five_year_box_visual_colored", "Movies grouped by 5-year intervals", [
+        ("--from-year", {"type": int, "dest": "year_from"}),
+        ("--to-year", {"type": int, "dest": "year_to"}),
+    ]),
+    "timeline": ("movie_timeline_plot", "main", "Movie timeline (scatter or density)", [
+        ("--mode", {"choices": ["auto", "scatter", "density"], "default": "auto"}),
+        ("--top-n", {"type": int, "default": 10}),
+        ("--from-year", {"type": int, "dest": "year_from"}),
+        ("--to-year", {"type": int, "dest": "year_to"}),
+        *PREVIEW_OPTIONS,
+    ]),
+    "treemap": ("movie_treemap", "main", "Decade/year/movie treemap with drill-down", []),
+    "export-network": ("export_collab_network", "main", "Stream the collaboration network to GraphML/GEXF/CSV/binary", [
+        ("path", {"nargs": "?", "default": "collab_network.graphml"}),
+        ("--fmt", {"choices": ["graphml", "gexf", "csv", "bin"]}),
+        ("--min-weight", {"type": int, "default": 1}),
+    ]),
+    "table": ("nice_title_list", "list_movies_as_table", "Print the movie list as a table", []),
+    "export-markdown": ("export_movies_to_markdown", "export_movies_to_markdown", "Export the movie list to Markdown", [
+        ("--filename", {"default": "movies_export.md"}),
+    ]),
+    "unique-keys": ("unique_keys", "main", "Add the unique keys that make concurrent ingestion race-free", []),
+    "change-counters": ("change_counters", "main", "Install the change counters the caches are checked against", []),
+    "dedupe-stars": ("dedupe_stars", "main", "Find and merge duplicate stars (dry run unless --apply)", [
+        ("--apply", {"action": "store_true"}),
+        ("--threshold", {"type": int, "default": 90}),
+        ("--report", {"metavar": "file.json"}),
+    ]),
+    "sync-local": ("local_backend", "main", "Snapshot the database into a local DuckDB file", [
+        ("path", {"nargs": "?", "default": os.getenv("MOVIES_DUCKDB_PATH", "movies.duckdb")}),
+    ]),
+    "serve": ("movie_query_service", "main", "Run the HTTP/JSON query service", [
+        ("--host", {"default": os.getenv("MOVIES_SERVICE_HOST", "127.0.0.1")}),
+        ("--port", {"type": int, "default": int(os.getenv("MOVIES_SERVICE_PORT", "8765"))}),
+        ("--pool-max", {"type": int, "default": int(os.getenv("MOVIES_POOL_MAX", "10"))}),
+        ("--cache-ttl", {"type": float, "default": float(os.getenv("MOVIES_CACHE_TTL", "30"))}),
+    ]),
+    "list-titles": ("list_titles_in_movies_db", "list_all_titles_in_movies", "List all titles", [
+        ("sort", {"nargs": "?", "choices": ["name", "year", "none"], "default": "none"}),
+    ]),
+    "check-star": ("check_for_stars_in_db", "search_for_stars", "Look up a star by exact name", [("name", {})]),
+    "bulk-appearances": ("update_appearances", None, "Link the actors listed in update_appearances.py", []),
+    "list-tables": ("list_tables_movies_db", None, "Show the server version and tables", []),
+    "connect": ("connect_to_movies_db", None, "Test the connection and optionally add a movie", []),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="movies.py", description="Movie database tools")
+    parser.add_argument("--timing", action="store_true",
+                        help="Report entry point and subcommand import time on stderr")
+    parser.add_argument("--profile", action="store_true", help="Per-phase timing report")
+    parser.add_argument("--profile-modes", metavar="MODES",
+                        help="Comma list of phases,cprofile,tracemalloc (implies --profile)")
+    parser.add_argument("--import-only", action="store_true", help=argparse.SUPPRESS)
+
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    subparsers.required = True
+
+    for name, (module, function, help_text, arguments) in COMMANDS.items():
+        sub = subparsers.add_parser(name, help=help_text, description=help_text)
+        for flag, options in arguments:
+            sub.add_argument(flag, **options)
+
+    check = subparsers.add_parser("check-startup", help="Measure startup time against the budget")
+    check.add_argument("target", nargs="?", default="actors", help="Subcommand to measure (default: actors)")
+    check.add_argument("--runs", type=int, default=5)
+    check.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+
+    return parser
+
+def check_startup(target, runs, budget_ms):
+    if target not in COMMANDS:
+        print(f"⚠️ Unknown command: {target}")
+        return 2
+
+    # Fresh interpreters, so the measurement includes Python's own startup
+    command = [sys.executable, os.path.abspath(__file__), "--import-only", target]
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        try:
+            subprocess.run(command, check=True)
+        except subprocess.CalledProcessError as e:
+            print(f"❌ '{target}' failed to import.")
+            print("Error:", e)
+            return 1
+        timings.append((time.perf_counter() - started) * 1000)
+
+    median = statistics.median(timings)
+    print(f"⏱️ '{target}' startup: median {median:.0f} ms, best {min(timings):.0f} ms over {runs} runs")
+    print(f"   Budget: {budget_ms:.0f} ms")
+    if median > budget_ms:
+        print("❌ Over budget. Run 'python -X importtime movies.py --import-only "
+              f"{target}' to see which imports are slow.")
+        return 1
+
+    print("✅ Within budget.")
+    return 0
+
+def run_command(args):
+    module_name, function_name, _, arguments = COMMANDS[args.command]
+
+    # Read by perf_phases when the subcommand starts profiling
+    if args.profile or args.profile_modes:
+        os.environ["MOVIES_PROFILE"] = args.profile_modes or "phases"
+
+    import_started = time.perf_counter()
+    module = importlib.import_module(module_name) if function_name else None
+    import_ms = (time.perf_counter() - import_started) * 1000
+
+    if args.timing:
+        ready_ms = (import_started - _STARTED) * 1000
+        print(f"⏱️ entry point {ready_ms:.1f} ms, import {module_name} {import_ms:.1f} ms",
+              file=sys.stderr)
+
+    if args.import_only:
+        return 0
+
+    if function_name is None:
+        runpy.run_module(module_name, run_name="__main__")
+        return 0
+
+    positional = []
+    keywords = {}
+    for flag, options in arguments:
+        dest = options.get("dest", flag.lstrip("-").replace("-", "_"))
+        if flag.startswith("-"):
+            keywords[dest] = getattr(args, dest)
+        else:
+            positional.append(getattr(args, dest))
+
+    getattr(module, function_name)(*positional, **keywords)
+    return 0
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command == "check-startup":
+        return check_startup(args.target, args.runs, args.budget_ms)
+
+    return run_command(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
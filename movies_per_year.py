@@ -1,47 +1,61 @@
-import os
 import psycopg
-import pandas as pd
 import matplotlib.pyplot as plt
-from dotenv import load_dotenv
+import movie_aggregates
+import chart_sampling
 
-# Load values from .env file
-load_dotenv()
-
-DB_CONNECTION = {
-    "dbname": os.getenv("PGDATABASE", "Movies"),
-    "user": os.getenv("PGUSER", "postgres"),
-    "password": os.getenv("PGPASSWORD", ""),
-    "host": os.getenv("PGHOST", "localhost"),
-    "port": os.getenv("PGPORT", "5432"),
-}
-
-def plot_movies_per_year_with_total():
+def fetch_per_year(year_from=None, year_to=None, sample=None):
+    # (year_counts, total) or None on error; with a sample both are estimates
     try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT release_year FROM movies;")
-                years = [row[0] for row in cur.fetchall()]
-
-        df = pd.DataFrame(years, columns=["year"])
-        total_movies = len(df)
-
-        # Ensure all years are represented, even with 0 movies
-        full_years = pd.Series(range(df["year"].min(), df["year"].max() + 1))
-        year_counts = df["year"].value_counts().reindex(full_years, fill_value=0)
-
-        # Plot
-        plt.figure(figsize=(10, 6))
-        plt.bar(year_counts.index, year_counts.values, color="skyblue", edgecolor="black")
-        plt.title(f"Movies Per Year (Total: {total_movies})")
-        plt.xlabel("Year")
-        plt.ylabel("Number of Movies")
-        plt.grid(axis="y", linestyle="--", alpha=0.7)
-        plt.tight_layout()
-        plt.show()
+        if sample is not None:
+            return movie_aggregates.sampled_movies_per_year(sample.params()), sample.population
+        # Counts, gap-filling and the total are all computed server-side
+        return movie_aggregates.movies_per_year(year_from, year_to)
 
     except psycopg.Error as e:
         print("❌ Failed to fetch or plot data.")
         print("Error:", e)
+        return None
+
+def draw_per_year(data, year_from=None, year_to=None, sample=None):
+    if not data or not data[0]:
+        print("⚠️ No data to display.")
+        return
+    year_counts, total_movies = data
+
+    years = [year for year, _ in year_counts]
+    counts = [count for _, count in year_counts]
+
+    # Plot
+    plt.figure(figsize=(10, 6))
+    plt.bar(years, counts, color="skyblue", edgecolor="black")
+    span = f", {years[0]}–{years[-1]}" if year_from is not None or year_to is not None else ""
+    total = f"~{total_movies:,}" if sample is not None else f"{total_movies}"
+    plt.title(f"Movies Per Year (Total: {total}{span})")
+    plt.xlabel("Year")
+    plt.ylabel("Number of Movies" + (" (estimated)" if sample is not None else ""))
+    plt.grid(axis="y", linestyle="--", alpha=0.7)
+    if sample is not None:
+        sample.annotate()
+    plt.tight_layout()
+    chart_sampling.show(sample)
+
+def plot_movies_per_year_with_total(year_from=None, year_to=None, preview=None,
+                                    sample_size=chart_sampling.PREVIEW_SIZE, preview_only=False):
+    # preview=<method> draws from a sample first, then the full data
+    # (unless preview_only)
+    sample = None
+    if preview:
+        try:
+            sample = chart_sampling.sample_movies(preview, sample_size, year_from=year_from, year_to=year_to)
+        except psycopg.Error as e:
+            print("❌ Failed to sample movies.")
+            print("Error:", e)
+            return
+        if not preview_only:
+            sample.follow = (lambda: fetch_per_year(year_from, year_to),
+                             lambda data: draw_per_year(data, year_from, year_to))
+
+    draw_per_year(fetch_per_year(year_from, year_to, sample), year_from, year_to, sample)
 
 if __name__ == "__main__":
-    plot_movies_per_year_with_total()
\ No newline at end of file
+    plot_movies_per_year_with_total()
@@ -1,30 +1,17 @@
-import os
 import pandas as pd
 import psycopg
 from tabulate import tabulate
-from dotenv import load_dotenv
-
-# Load values from .env file
-load_dotenv()
-
-DB_CONNECTION = {
-    "dbname": os.getenv("PGDATABASE", "Movies"),
-    "user": os.getenv("PGUSER", "postgres"),
-    "password": os.getenv("PGPASSWORD", ""),
-    "host": os.getenv("PGHOST", "localhost"),
-    "port": os.getenv("PGPORT", "5432"),
-}
-
+from db_connections import connect_read
 
 def list_movies_as_table():
     try:
-        with psycopg.connect(**DB_CONNECTION) as conn:
+        with connect_read() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     SELECT m.title, m.release_year, COUNT(a.star_id) AS actor_count
                     FROM movies m
                     LEFT JOIN appearances a ON m.id = a.movie_id
-                    GROUP BY m.id
+                    GROUP BY m.id, m.title, m.release_year
                     ORDER BY m.release_year;
                 """)
                 data = cur.fetchall()
@@ -0,0 +1,141 @@
+import heapq
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import psycopg
+from db_connections import connect_read
+
+# Sharded co-appearance counting. `appearances` is split into movie_id
+# ranges holding roughly the same number of rows, each range is
+# self-joined and aggregated on its own connection (so on its own backend,
+# all at once), and the partial counts come back sorted by pair. A pair
+# that shares movies in several ranges shows up in several shards, so the
+# sorted streams are combined with a k-way merge that adds up equal pairs
+# as they go past; client memory stays at one fetch batch per shard.
+#
+# MOVIES_PAIR_SHARDS > 1 makes the full graph rebuild
+# (collab_graph_store.py) and movie_stats' pair listing use this path.
+
+PAIR_SHARDS = int(os.getenv("MOVIES_PAIR_SHARDS", "1"))
+FETCH_SIZE = 50_000
+
+SHARD_PAIRS_SQL = """
+    SELECT a1.star_id, a2.star_id, COUNT(*) AS shared_movies
+    FROM appearances a1
+    JOIN appearances a2
+        ON a1.movie_id = a2.movie_id AND a1.star_id < a2.star_id
+    WHERE a1.movie_id >= %(low)s AND a1.movie_id < %(high)s
+      AND a2.movie_id >= %(low)s AND a2.movie_id < %(high)s
+      AND (%(max_id)s::int IS NULL OR (a1.id <= %(max_id)s AND a2.id <= %(max_id)s))
+    GROUP BY a1.star_id, a2.star_id
+    ORDER BY a1.star_id, a2.star_id;
+"""
+
+
+def movie_id_ranges(cur, shards):
+    # Half-open [low, high) movie_id ranges with about equal appearance counts
+    cur.execute("""
+        SELECT MIN(movie_id), MAX(movie_id),
+               percentile_disc(%s::float8[]) WITHIN GROUP (ORDER BY movie_id)
+        FROM appearances;
+    """, ([i / shards for i in range(1, shards)],))
+    low, high, cuts = cur.fetchone()
+    if low is None:
+        return []
+
+    bounds = [low] + sorted({c for c in (cuts or []) if c > low}) + [high + 1]
+    return list(zip(bounds, bounds[1:]))
+
+def _open_shard(movie_range, max_id):
+    # Runs in a worker thread: the first fetch waits for the whole shard's
+    # aggregation, so all shards are computed on the server in parallel
+    conn = connect_read()
+    try:
+        cur = conn.cursor(name="pair_shard")
+        cur.itersize = FETCH_SIZE
+        cur.execute(SHARD_PAIRS_SQL, {"low": movie_range[0], "high": movie_range[1], "max_id": max_id})
+        return conn, cur, cur.fetchmany(FETCH_SIZE)
+    except BaseException:
+        conn.close()
+        raise
+
+def _shard_rows(conn, cur, first_batch):
+    try:
+        batch = first_batch
+        while batch:
+            yield from batch
+            batch = cur.fetchmany(FETCH_SIZE)
+        cur.close()
+    finally:
+        conn.close()
+
+def count_pairs(shards=PAIR_SHARDS, max_id=None):
+    # Yields (star_id, star_id, shared_movies) sorted by pair. max_id limits
+    # the count to appearances.id <= max_id (the graph store's watermark).
+    with connect_read() as conn:
+        with conn.cursor() as cur:
+            ranges = movie_id_ranges(cur, max(1, shards))
+    if not ranges:
+        return
+
+    with ThreadPoolExecutor(len(ranges)) as pool:
+        futures = [pool.submit(_open_shard, r, max_id) for r in ranges]
+    opened, errors = [], []
+    for future in futures:
+        try:
+            opened.append(future.result())
+        except psycopg.Error as e:
+            errors.append(e)
+    if errors:
+        for conn, _, _ in opened:
+            conn.close()
+        raise errors[0]
+
+    streams = [_shard_rows(*shard) for shard in opened]
+    pair, total = None, 0
+    for star_1, star_2, shared in heapq.merge(*streams):
+        if (star_1, star_2) != pair:
+            if pair is not None:
+                yield pair[0], pair[1], total
+            pair, total = (star_1, star_2), 0
+        total += shared
+    if pair is not None:
+        yield pair[0], pair[1], total
+
+def named_pair_counts(shards=PAIR_SHARDS):
+    # Same rows as the single-query listing: (actor_1, actor_2, shared_movies)
+    # merged by name, most shared first
+    with connect_read() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, actor_name FROM stars;")
+            names = dict(cur.fetchall())
+
+    merged = {}
+    for star_1, star_2, shared in count_pairs(shards):
+        name_1, name_2 = names.get(star_1), names.get(star_2)
+        if name_1 is None or name_2 is None or name_1 == name_2:
+            continue
+        key = (name_1, name_2) if name_1 < name_2 else (name_2, name_1)
+        merged[key] = merged.get(key, 0) + shared
+
+    return sorted(((a, b, n) for (a, b), n in merged.items()), key=lambda row: (-row[2], row[0], row[1]))
+
+def main(shards=None):
+    shards = shards or max(PAIR_SHARDS, os.cpu_count() or 1)
+    started = time.perf_counter()
+    try:
+        pairs = total = 0
+        for _, _, shared in count_pairs(shards):
+            pairs += 1
+            total += shared
+    except psycopg.Error as e:
+        print("❌ Pair count failed.")
+        print("Error:", e)
+        return
+
+    print(f"✅ {pairs:,} actor pairs ({total:,} shared appearances) from {shards} shard(s) "
+          f"in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,487 @@
+import sys
+import time
+import psycopg
+from psycopg import sql
+from db_connections import connect_write
+import unique_keys
+import change_counters
+
+# Online migration to the partitioned layout:
+#
+#   movies       RANGE partitions on release_year (one per decade + DEFAULT)
+#   appearances  HASH partitions on movie_id
+#
+# Steps (each can be re-run; "run" does them all):
+#
+#   prepare  create movies_part / appearances_part and their partitions,
+#            and triggers that mirror every write on the old tables
+#   copy     copy existing rows in id-ordered batches, one short
+#            transaction each; progress is saved so an interrupted copy
+#            resumes where it stopped
+#   verify   compare row counts and id checksums of the old and new
+#            tables in one REPEATABLE READ snapshot, without locks (the
+#            mirrors write in the same transaction, so one snapshot sees
+#            both sides in step); the result is saved in the progress table
+#   swap     in one transaction under a short lock_timeout: cheap checks
+#            only (verified, mirrors still in place, same MAX(id) on both
+#            sides), then rename old -> *_unpartitioned and new ->
+#            movies/appearances
+#
+# A partitioned table's unique keys must contain the partition key, so
+# movies gets UNIQUE (id, release_year) (release_year may be NULL, which a
+# primary key would not allow) and appearances
+# PRIMARY KEY (id, movie_id), and appearances can no longer have a foreign
+# key to movies. Triggers take over that job (existence check on insert,
+# cascade on delete). Unique indexes of the old tables are copied with the
+# partition key added, so movies.id is only unique together with
+# release_year (the serial sequence keeps ids distinct). Every other index
+# (e.g. the title trigram index) is copied as is. The ingestion keys from
+# unique_keys.py are created even if the old tables lack them, and swap
+# refuses to run while any index or key is missing. Partition pruning needs
+# a literal filter on the partition key: release_year for movies, movie_id for appearances.
+
+APPEARANCE_PARTITIONS = 16
+BATCH_SIZE = 50_000
+LOCK_TIMEOUT = "5s"
+DECADE_MIN = 1880
+
+# (old table, partitioned copy, partition key)
+PARTITIONED_TABLES = (
+    ("movies", "movies_part", "release_year"),
+    ("appearances", "appearances_part", "movie_id"),
+)
+
+SETUP_SQL = """
+    CREATE TABLE IF NOT EXISTS partition_migration_progress (
+        table_name TEXT PRIMARY KEY,
+        last_id BIGINT NOT NULL DEFAULT 0,
+        copied BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    ALTER TABLE partition_migration_progress
+        ADD COLUMN IF NOT EXISTS verified_at TIMESTAMPTZ;
+
+    CREATE TABLE IF NOT EXISTS movies_part (
+        id INT NOT NULL,
+        title TEXT NOT NULL,
+        release_year INT
+    ) PARTITION BY RANGE (release_year);
+    CREATE TABLE IF NOT EXISTS movies_part_default PARTITION OF movies_part DEFAULT;
+
+    CREATE TABLE IF NOT EXISTS appearances_part (
+        id INT NOT NULL,
+        movie_id INT NOT NULL,
+        star_id INT NOT NULL REFERENCES stars(id) ON DELETE CASCADE,
+        PRIMARY KEY (id, movie_id)
+    ) PARTITION BY HASH (movie_id);
+    CREATE INDEX IF NOT EXISTS appearances_part_star_idx ON appearances_part (star_id);
+    CREATE UNIQUE INDEX IF NOT EXISTS appearances_part_movie_star_key ON appearances_part (movie_id, star_id);
+    CREATE UNIQUE INDEX IF NOT EXISTS movies_part_id_year_key ON movies_part (id, release_year);
+    CREATE INDEX IF NOT EXISTS movies_part_id_idx ON movies_part (id);
+"""
+
+# Mirror writes on the old tables into the new ones while the copy runs.
+# The batch copy locks its source rows (FOR SHARE), so a concurrent update
+# either happens before the batch reads the row or waits for it to commit.
+MIRROR_SQL = """
+    CREATE OR REPLACE FUNCTION movies_mirror() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            DELETE FROM movies_part WHERE id = OLD.id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO movies_part (id, title, release_year)
+            SELECT NEW.id, NEW.title, NEW.release_year
+            WHERE NOT EXISTS (SELECT 1 FROM movies_part WHERE id = NEW.id);
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION appearances_mirror() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            DELETE FROM appearances_part WHERE id = OLD.id AND movie_id = OLD.movie_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO appearances_part (id, movie_id, star_id)
+            VALUES (NEW.id, NEW.movie_id, NEW.star_id)
+            ON CONFLICT DO NOTHING;
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS movies_mirror ON movies;
+    CREATE TRIGGER movies_mirror AFTER INSERT OR UPDATE OR DELETE ON movies
+        FOR EACH ROW EXECUTE FUNCTION movies_mirror();
+    DROP TRIGGER IF EXISTS appearances_mirror ON appearances;
+    CREATE TRIGGER appearances_mirror AFTER INSERT OR UPDATE OR DELETE ON appearances
+        FOR EACH ROW EXECUTE FUNCTION appearances_mirror();
+"""
+
+# Replaces the appearances -> movies foreign key after the swap
+INTEGRITY_SQL = """
+    CREATE OR REPLACE FUNCTION appearances_check_movie() RETURNS trigger AS $$
+    BEGIN
+        PERFORM 1 FROM movies WHERE id = NEW.movie_id FOR KEY SHARE;
+        IF NOT FOUND THEN
+            RAISE foreign_key_violation USING
+                MESSAGE = format('movie %s does not exist', NEW.movie_id);
+        END IF;
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION movies_cascade_appearances() RETURNS trigger AS $$
+    BEGIN
+        DELETE FROM appearances WHERE movie_id = OLD.id;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER appearances_check_movie BEFORE INSERT OR UPDATE OF movie_id ON appearances
+        FOR EACH ROW EXECUTE FUNCTION appearances_check_movie();
+    CREATE TRIGGER movies_cascade_appearances AFTER DELETE ON movies
+        FOR EACH ROW EXECUTE FUNCTION movies_cascade_appearances();
+"""
+
+COPY_BATCH_SQL = {
+    "movies": """
+        WITH batch AS (
+            SELECT id, title, release_year FROM movies
+            WHERE id > %(last_id)s
+            ORDER BY id
+            LIMIT %(batch_size)s
+            FOR SHARE
+        ), copied AS (
+            INSERT INTO movies_part (id, title, release_year)
+            SELECT id, title, release_year FROM batch b
+            WHERE NOT EXISTS (SELECT 1 FROM movies_part p WHERE p.id = b.id)
+        )
+        SELECT MAX(id), COUNT(*) FROM batch;
+    """,
+    "appearances": """
+        WITH batch AS (
+            SELECT id, movie_id, star_id FROM appearances
+            WHERE id > %(last_id)s
+            ORDER BY id
+            LIMIT %(batch_size)s
+            FOR SHARE
+        ), copied AS (
+            INSERT INTO appearances_part (id, movie_id, star_id)
+            SELECT id, movie_id, star_id FROM batch
+            ON CONFLICT DO NOTHING
+        )
+        SELECT MAX(id), COUNT(*) FROM batch;
+    """,
+}
+
+
+def _is_partitioned(cur, table):
+    cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s);", (table,))
+    row = cur.fetchone()
+    return bool(row and row[0])
+
+def _index_definitions(cur, table):
+    # [(name, unique, "btree (...)" part of the definition, key columns, has expressions)]
+    cur.execute("""
+        SELECT c.relname, i.indisunique,
+               substring(pg_get_indexdef(i.indexrelid) from ' USING (.*)$'),
+               ARRAY(
+                   SELECT a.attname::text
+                   FROM unnest(i.indkey) WITH ORDINALITY AS k(attnum, n)
+                   JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+                   WHERE k.n <= i.indnkeyatts
+               ),
+               i.indexprs IS NOT NULL
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = to_regclass(%s) AND i.indisvalid
+        ORDER BY c.relname;
+    """, (table,))
+    return cur.fetchall()
+
+def _partitioned_definition(unique, using, columns, expressions, partition_key):
+    # A unique index on a partitioned table must contain the partition key;
+    # None when it cannot be added (expression indexes)
+    if not unique or partition_key in columns:
+        return using
+    if expressions:
+        return None
+    head, paren, tail = using.partition(")")
+    return f"{head}, {partition_key}{paren}{tail}"
+
+def _ingestion_keys(table):
+    # The unique keys the ON CONFLICT writes rely on (all contain the partition key)
+    return [(columns, name) for key_table, columns, name in unique_keys.KEYS if key_table == table]
+
+def missing_indexes(cur, table, target, partition_key):
+    existing = {(unique, using) for _, unique, using, _, _ in _index_definitions(cur, target)}
+    missing = [
+        name for name, unique, using, columns, expressions in _index_definitions(cur, table)
+        if (unique, _partitioned_definition(unique, using, columns, expressions, partition_key)) not in existing
+    ]
+    return missing + [
+        name for columns, name in _ingestion_keys(table)
+        if not unique_keys.has_unique_key(cur, target, columns)
+    ]
+
+def copy_indexes(cur, table, target, partition_key):
+    # Recreate every index of table on target; returns the names of those
+    # that cannot exist on a partitioned table
+    existing = {(unique, using) for _, unique, using, _, _ in _index_definitions(cur, target)}
+    skipped = []
+    for name, unique, using, columns, expressions in _index_definitions(cur, table):
+        definition = _partitioned_definition(unique, using, columns, expressions, partition_key)
+        if definition is None:
+            skipped.append(name)
+            continue
+        if (unique, definition) in existing:
+            continue
+        cur.execute(sql.SQL("CREATE {unique}INDEX IF NOT EXISTS {name} ON {target} USING {definition};").format(
+            unique=sql.SQL("UNIQUE " if unique else ""),
+            name=sql.Identifier(f"{name}_part"),
+            target=sql.Identifier(target),
+            definition=sql.SQL(definition),
+        ))
+        existing.add((unique, definition))
+    return skipped
+
+def prepare(conn, appearance_partitions=APPEARANCE_PARTITIONS):
+    with conn.transaction():
+        with conn.cursor() as cur:
+            if _is_partitioned(cur, "movies"):
+                print("ℹ️ movies is already partitioned; nothing to prepare.")
+                return False
+
+            cur.execute(SETUP_SQL)
+
+            # One partition per decade over the data's range (plus headroom);
+            # NULL or out-of-range years land in the DEFAULT partition
+            cur.execute("SELECT COALESCE(MIN(release_year), %s), COALESCE(MAX(release_year), %s) FROM movies;",
+                        (DECADE_MIN, DECADE_MIN))
+            first, last = cur.fetchone()
+            for decade in range((min(first, DECADE_MIN) // 10) * 10, (last // 10) * 10 + 30, 10):
+                cur.execute(sql.SQL(
+                    "CREATE TABLE IF NOT EXISTS {} PARTITION OF movies_part FOR VALUES FROM ({}) TO ({});"
+                ).format(sql.Identifier(f"movies_{decade}s"), sql.Literal(decade), sql.Literal(decade + 10)))
+
+            for remainder in range(appearance_partitions):
+                cur.execute(sql.SQL(
+                    "CREATE TABLE IF NOT EXISTS {} PARTITION OF appearances_part "
+                    "FOR VALUES WITH (MODULUS {}, REMAINDER {});"
+                ).format(
+                    sql.Identifier(f"appearances_p{remainder:02d}"),
+                    sql.Literal(appearance_partitions),
+                    sql.Literal(remainder),
+                ))
+
+            # Indexes last: the partitioned index cascades to every partition
+            for table, target, partition_key in PARTITIONED_TABLES:
+                for name in copy_indexes(cur, table, target, partition_key):
+                    print(f"⚠️ {table}: index {name} cannot be recreated on a partitioned table; "
+                          f"replace it before the swap.")
+                # Even when `unique-keys` has not been run on the old table yet
+                for columns, name in _ingestion_keys(table):
+                    if not unique_keys.has_unique_key(cur, target, columns):
+                        unique_keys.create_unique_key(conn, target, columns, f"{name}_part")
+
+            cur.execute(MIRROR_SQL)
+            cur.execute("""
+                INSERT INTO partition_migration_progress (table_name)
+                VALUES ('movies'), ('appearances')
+                ON CONFLICT DO NOTHING;
+                UPDATE partition_migration_progress SET verified_at = NULL;
+            """)
+    return True
+
+def copy_table(conn, table, batch_size=BATCH_SIZE, pause=0.0):
+    with conn.cursor() as cur:
+        cur.execute("SELECT last_id, copied FROM partition_migration_progress WHERE table_name = %s;", (table,))
+        last_id, copied = cur.fetchone()
+        conn.commit()
+
+        started = time.perf_counter()
+        while True:
+            # One short transaction per batch: row locks only, no table locks
+            with conn.transaction():
+                cur.execute(COPY_BATCH_SQL[table], {"last_id": last_id, "batch_size": batch_size})
+                batch_last, batch_rows = cur.fetchone()
+                if not batch_rows:
+                    break
+                last_id, copied = batch_last, copied + batch_rows
+                cur.execute("""
+                    UPDATE partition_migration_progress
+                    SET last_id = %s, copied = %s, updated_at = now()
+                    WHERE table_name = %s;
+                """, (last_id, copied, table))
+
+            rate = copied / max(time.perf_counter() - started, 1e-9)
+            print(f"  {table}: {copied:,} rows copied (up to id {last_id}, {rate:,.0f} rows/s)", end="\r")
+            if pause:
+                time.sleep(pause)
+    print()
+    return copied
+
+def _mirrors_enabled(cur):
+    cur.execute("""
+        SELECT COUNT(*) FROM pg_trigger
+        WHERE (tgrelid, tgname) IN (('movies'::regclass, 'movies_mirror'), ('appearances'::regclass, 'appearances_mirror'))
+          AND tgenabled <> 'D';
+    """)
+    return cur.fetchone()[0] == 2
+
+def verify(conn):
+    # Full comparison, but without table locks: a single REPEATABLE READ
+    # snapshot sees every write on both sides or on neither
+    counts = {}
+    with conn.transaction():
+        with conn.cursor() as cur:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY;")
+            if not _mirrors_enabled(cur):
+                raise RuntimeError("the mirror triggers are missing or disabled; run the prepare step again")
+            for table, target, _ in PARTITIONED_TABLES:
+                cur.execute(sql.SQL("""
+                    SELECT * FROM
+                        (SELECT COUNT(*), COALESCE(SUM(id::bigint), 0) FROM {table}) old,
+                        (SELECT COUNT(*), COALESCE(SUM(id::bigint), 0) FROM {target}) new;
+                """).format(table=sql.Identifier(table), target=sql.Identifier(target)))
+                rows, id_sum, target_rows, target_id_sum = cur.fetchone()
+                if (rows, id_sum) != (target_rows, target_id_sum):
+                    raise RuntimeError(
+                        f"{table} and {target} differ ({rows} vs {target_rows} rows, "
+                        f"id sum {id_sum} vs {target_id_sum}); run the copy step again"
+                    )
+                counts[table] = rows
+
+    with conn.transaction():
+        with conn.cursor() as cur:
+            cur.execute("UPDATE partition_migration_progress SET verified_at = now();")
+    return counts
+
+def swap(conn):
+    with conn.transaction():
+        with conn.cursor() as cur:
+            cur.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}';")
+            cur.execute("LOCK TABLE movies, appearances IN ACCESS EXCLUSIVE MODE;")
+
+            # Nothing can write now. The full comparison ran in verify();
+            # while the mirrors stayed in place since then, both sides took
+            # the same writes, so only index lookups are needed here
+            cur.execute("SELECT COUNT(*) FROM partition_migration_progress WHERE verified_at IS NOT NULL;")
+            if cur.fetchone()[0] < len(PARTITIONED_TABLES):
+                raise RuntimeError("the copy has not been verified; run the verify step first")
+            if not _mirrors_enabled(cur):
+                raise RuntimeError("the mirror triggers are missing or disabled; run prepare, copy and verify again")
+            for table, target, _ in PARTITIONED_TABLES:
+                cur.execute(sql.SQL("SELECT (SELECT MAX(id) FROM {}), (SELECT MAX(id) FROM {});").format(
+                    sql.Identifier(table), sql.Identifier(target)))
+                old_max, new_max = cur.fetchone()
+                if old_max != new_max:
+                    raise RuntimeError(
+                        f"{table} and {target} end at different ids ({old_max} vs {new_max}); "
+                        f"run the copy and verify steps again"
+                    )
+
+            # Title search, unique keys etc. must keep their indexes
+            for table, target, partition_key in PARTITIONED_TABLES:
+                missing = missing_indexes(cur, table, target, partition_key)
+                if missing:
+                    raise RuntimeError(
+                        f"{target} lacks indexes of {table} ({', '.join(missing)}); run the prepare step again"
+                    )
+
+            # Keep counting changes for the caches (change_counters.py)
+            cur.execute("SELECT to_regproc('count_table_changes') IS NOT NULL;")
+            if cur.fetchone()[0]:
+                for table, target, _ in PARTITIONED_TABLES:
+                    change_counters.install_triggers(cur, target, table)
+
+            cur.execute("""
+                DROP TRIGGER movies_mirror ON movies;
+                DROP TRIGGER appearances_mirror ON appearances;
+
+                ALTER TABLE appearances RENAME TO appearances_unpartitioned;
+                ALTER TABLE movies RENAME TO movies_unpartitioned;
+                ALTER TABLE movies_part RENAME TO movies;
+                ALTER TABLE appearances_part RENAME TO appearances;
+            """)
+
+            # Keep the serial sequences (and so the ids, which the graph
+            # store uses as its watermark) with the live tables
+            for table in ("movies", "appearances"):
+                cur.execute("SELECT pg_get_serial_sequence(%s, 'id');", (f"{table}_unpartitioned",))
+                sequence = cur.fetchone()[0]
+                if sequence:
+                    cur.execute(sql.SQL("ALTER TABLE {} ALTER COLUMN id SET DEFAULT nextval({});").format(
+                        sql.Identifier(table), sql.Literal(sequence)))
+                    cur.execute(sql.SQL("ALTER TABLE {} ALTER COLUMN id DROP DEFAULT;").format(
+                        sql.Identifier(f"{table}_unpartitioned")))
+                    cur.execute(sql.SQL("ALTER SEQUENCE {} OWNED BY {}.id;").format(
+                        sql.SQL(sequence), sql.Identifier(table)))
+
+            cur.execute(INTEGRITY_SQL)
+            cur.execute("ANALYZE movies; ANALYZE appearances;")
+
+def status(conn):
+    with conn.cursor() as cur:
+        partitioned = _is_partitioned(cur, "movies") and _is_partitioned(cur, "appearances")
+        print(f"\n📦 Partitioned layout: {'yes' if partitioned else 'no'}")
+        cur.execute("SELECT to_regclass('partition_migration_progress') IS NOT NULL;")
+        if cur.fetchone()[0]:
+            cur.execute("""
+                SELECT table_name, copied, last_id, updated_at, verified_at
+                FROM partition_migration_progress ORDER BY 1;
+            """)
+            for table, copied, last_id, updated, verified in cur.fetchall():
+                note = f", verified {verified:%Y-%m-%d %H:%M}" if verified else ""
+                print(f"  - {table}: {copied:,} rows copied (last id {last_id}, {updated:%Y-%m-%d %H:%M}{note})")
+        cur.execute("""
+            SELECT parent.relname, COUNT(*), pg_size_pretty(SUM(pg_total_relation_size(child.oid)))
+            FROM pg_inherits i
+            JOIN pg_class parent ON parent.oid = i.inhparent
+            JOIN pg_class child ON child.oid = i.inhrelid
+            WHERE parent.relname IN ('movies', 'appearances', 'movies_part', 'appearances_part')
+            GROUP BY parent.relname
+            ORDER BY 1;
+        """)
+        for parent, partitions, size in cur.fetchall():
+            print(f"  - {parent}: {partitions} partitions, {size}")
+    conn.commit()
+
+def main(step="status", batch_size=BATCH_SIZE, partitions=APPEARANCE_PARTITIONS, pause=0.0):
+    try:
+        with connect_write() as conn:
+            if step == "status":
+                status(conn)
+                return
+
+            if step in ("prepare", "run"):
+                if prepare(conn, partitions):
+                    print(f"✅ Partitioned tables and mirror triggers created ({partitions} appearance partitions).")
+                elif step == "run":
+                    return
+
+            if step in ("copy", "run"):
+                print("🚚 Copying rows in batches...")
+                for table in ("movies", "appearances"):
+                    copy_table(conn, table, batch_size, pause)
+                print("✅ Copy complete; new writes are mirrored until the swap.")
+
+            if step in ("verify", "run"):
+                counts = verify(conn)
+                print("✅ Partitioned copies match: " +
+                      ", ".join(f"{table} {rows:,} rows" for table, rows in counts.items()) + ".")
+
+            if step in ("swap", "run"):
+                swap(conn)
+                print("✅ Swapped in the partitioned tables. Old tables kept as *_unpartitioned.")
+                print("   Set MOVIES_PARTITIONED=1 to enable partition-wise joins and aggregates.")
+
+    except psycopg.errors.LockNotAvailable:
+        print(f"⚠️ Could not lock the tables within {LOCK_TIMEOUT}; nothing changed. Try again when quieter.")
+    except RuntimeError as e:
+        print(f"❌ {step.capitalize()} aborted: {e}")
+    except psycopg.Error as e:
+        print("❌ Migration step failed.")
+        print("Error:", e)
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "status")
@@ -0,0 +1,208 @@
+import cProfile
+import functools
+import io
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# Phase timers for the graph and chart scripts. A script wraps main() in
+# @profiled("tool") (or calls start()/finish() itself) and marks its work
+# with phase("fetch") blocks or @timed("layout") decorators. Phase times are
+# self times: a nested phase is not counted again in its parent, and time
+# spent waiting on an interactive window (show()) is left out entirely.
+#
+# MOVIES_PROFILE (or "movies.py --profile-modes ...") turns on reporting, as a
+# comma-separated list of:
+#
+#   phases       print the phase table and write a JSON report
+#   cprofile     also run cProfile (top functions + a .prof file)
+#   tracemalloc  also record peak memory per phase and top allocation sites
+#
+# Reports go to MOVIES_PROFILE_DIR (default "profiles"). Without
+# MOVIES_PROFILE the timers still run but nothing is printed or written.
+
+def profile_modes():
+    # Read when a run starts, not at import: movies.py sets MOVIES_PROFILE
+    # after it has imported chart_sampling (and with it this module)
+    return {m.strip() for m in os.getenv("MOVIES_PROFILE", "").lower().split(",") if m.strip()}
+
+PROFILE_DIR = os.getenv("MOVIES_PROFILE_DIR", "profiles")
+TOP_FUNCTIONS = 25
+
+_current = None
+
+
+class PhaseTimer:
+    def __init__(self, tool, modes=None):
+        self.tool = tool
+        self.modes = profile_modes() if modes is None else set(modes)
+        self.phases = {}
+        self.counters = {}
+        self._stack = []
+        self._thread = threading.get_ident()
+        self._started_at = time.time()
+        self._started = time.perf_counter()
+        self._excluded = 0.0
+
+        self._profiler = None
+        if "cprofile" in self.modes:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._tracing = "tracemalloc" in self.modes and not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+
+    @property
+    def enabled(self):
+        return bool(self.modes)
+
+    @contextmanager
+    def phase(self, name):
+        # Only the thread that started the run is timed (prefetch threads
+        # would otherwise interleave with its phases)
+        if threading.get_ident() != self._thread:
+            yield
+            return
+
+        frame = {"children": 0.0, "excluded": self._excluded}
+        self._stack.append(frame)
+        if self._tracing:
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started - (self._excluded - frame["excluded"])
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1]["children"] += elapsed
+
+            stats = self.phases.setdefault(name, {"seconds": 0.0, "calls": 0})
+            stats["seconds"] += elapsed - frame["children"]
+            stats["calls"] += 1
+            if self._tracing:
+                peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+                stats["peak_kb"] = max(stats.get("peak_kb", 0), round(peak_kb, 1))
+
+    @contextmanager
+    def excluded(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if threading.get_ident() == self._thread:
+                self._excluded += time.perf_counter() - started
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self):
+        total = time.perf_counter() - self._started - self._excluded
+        report = {
+            "tool": self.tool,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self._started_at)),
+            "total_seconds": round(total, 4),
+            "unaccounted_seconds": round(total - sum(p["seconds"] for p in self.phases.values()), 4),
+            "phases": {name: {**p, "seconds": round(p["seconds"], 4)} for name, p in self.phases.items()},
+            "counters": self.counters,
+        }
+
+        if self._profiler:
+            self._profiler.disable()
+            import pstats  # only needed for a report; slow to import
+            stats = pstats.Stats(self._profiler, stream=io.StringIO()).sort_stats("cumulative")
+            report["top_functions"] = [
+                {
+                    "function": f"{os.path.basename(filename)}:{line}({function})",
+                    "calls": calls,
+                    "self_seconds": round(self_time, 4),
+                    "cumulative_seconds": round(cumulative, 4),
+                }
+                for (filename, line, function), (_, calls, self_time, cumulative, _) in
+                sorted(stats.stats.items(), key=lambda item: -item[1][3])[:TOP_FUNCTIONS]
+            ]
+
+        if self._tracing:
+            snapshot = tracemalloc.take_snapshot()
+            report["peak_memory_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+            report["top_allocations"] = [
+                {"site": str(stat.traceback[0]), "kb": round(stat.size / 1024, 1), "blocks": stat.count}
+                for stat in snapshot.statistics("lineno")[:10]
+            ]
+            tracemalloc.stop()
+        return report
+
+    def finish(self):
+        report = self.report()
+        if not self.enabled:
+            return report
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self._started_at))
+        base = os.path.join(PROFILE_DIR, f"{self.tool}-{stamp}")
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        if self._profiler:
+            self._profiler.dump_stats(base + ".prof")
+
+        print(f"\n⏱️ {self.tool}: {report['total_seconds']:.3f}s", file=sys.stderr)
+        for name, p in sorted(report["phases"].items(), key=lambda item: -item[1]["seconds"]):
+            memory = f", peak {p['peak_kb']:,.0f} KB" if "peak_kb" in p else ""
+            print(f"  {name:<12} {p['seconds']:>8.3f}s  ({p['calls']} call(s){memory})", file=sys.stderr)
+        print(f"  {'(other)':<12} {report['unaccounted_seconds']:>8.3f}s", file=sys.stderr)
+        print(f"📝 Profile written to: {base}.json", file=sys.stderr)
+        return report
+
+
+def start(tool, modes=None):
+    global _current
+    _current = PhaseTimer(tool, modes)
+    return _current
+
+def finish():
+    global _current
+    timer, _current = _current, None
+    return timer.finish() if timer else None
+
+def phase(name):
+    return _current.phase(name) if _current else nullcontext()
+
+def count(name, amount=1):
+    if _current:
+        _current.count(name, amount)
+
+def timed(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def profiled(tool):
+    # Wraps a script's main(): one report per run
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start(tool)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                finish()
+        return wrapper
+    return decorator
+
+def show():
+    # plt.show() with an explicit, timed draw first; the time the window
+    # stays open is not counted
+    import matplotlib.pyplot as plt
+    if _current and _current.enabled:
+        with phase("render"):
+            plt.gcf().canvas.draw()
+    with _current.excluded() if _current else nullcontext():
+        plt.show()
@@ -0,0 +1,121 @@
+import sys
+import psycopg
+from db_connections import connect_read, connect_write
+
+# Ranked title search for partial and misspelled titles, backed by a
+# pg_trgm GIN index on lower(title). The same index serves the substring
+# (LIKE '%...%'), word-similarity (<%) and similarity (%) filters, so a
+# lookup stays in the milliseconds on a large catalog.
+#
+# Create the index once with: python movies.py title-index
+
+MATCH_KINDS = ("exact", "prefix", "contains", "similar")
+
+INDEX_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+    "CREATE INDEX IF NOT EXISTS movies_title_trgm_idx ON movies USING gin (lower(title) gin_trgm_ops);",
+]
+
+SEARCH_SQL = """
+    SELECT id, title, release_year, kind, score
+    FROM (
+        SELECT
+            id, title, release_year,
+            CASE
+                WHEN lower(title) = lower(%(q)s) THEN 'exact'
+                WHEN lower(title) LIKE %(prefix)s THEN 'prefix'
+                WHEN lower(title) LIKE %(contains)s THEN 'contains'
+                ELSE 'similar'
+            END AS kind,
+            GREATEST(similarity(lower(title), lower(%(q)s)),
+                     word_similarity(lower(%(q)s), lower(title))) AS score
+        FROM movies
+        WHERE lower(title) LIKE %(contains)s
+           OR lower(%(q)s) <%% lower(title)
+           OR lower(title) %% lower(%(q)s)
+    ) candidates
+    ORDER BY
+        array_position(ARRAY['exact', 'prefix', 'contains', 'similar'], kind),
+        score DESC, release_year, id
+    LIMIT %(limit)s;
+"""
+
+# Without pg_trgm (or on the DuckDB backend) only substring matches are found
+FALLBACK_SQL = """
+    SELECT id, title, release_year,
+        CASE
+            WHEN lower(title) = lower(%(q)s) THEN 'exact'
+            WHEN lower(title) LIKE %(prefix)s ESCAPE '\\' THEN 'prefix'
+            ELSE 'contains'
+        END AS kind,
+        1.0 AS score
+    FROM movies
+    WHERE lower(title) LIKE %(contains)s ESCAPE '\\'
+    ORDER BY
+        CASE WHEN lower(title) = lower(%(q)s) THEN 0
+             WHEN lower(title) LIKE %(prefix)s ESCAPE '\\' THEN 1 ELSE 2 END,
+        length(title), release_year, id
+    LIMIT %(limit)s;
+"""
+
+
+def _like_escape(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def search_titles(cur, query, limit=10):
+    # [(id, title, release_year, kind, score)], best first; kind is one of
+    # MATCH_KINDS
+    query = query.strip()
+    if not query:
+        return []
+
+    escaped = _like_escape(query.lower())
+    params = {
+        "q": query,
+        "prefix": escaped + "%",
+        "contains": "%" + escaped + "%",
+        "limit": limit,
+    }
+    try:
+        with cur.connection.transaction():
+            cur.execute(SEARCH_SQL, params)
+            return cur.fetchall()
+    except psycopg.Error:
+        cur.execute(FALLBACK_SQL, params)
+        return cur.fetchall()
+
+def create_index():
+    with connect_write() as conn:
+        with conn.cursor() as cur:
+            for statement in INDEX_SQL:
+                cur.execute(statement)
+        conn.commit()
+
+def main(query=None):
+    if query is None:
+        try:
+            create_index()
+        except psycopg.Error as e:
+            print("❌ Failed to create the title search index.")
+            print("Error:", e)
+            return
+        print("✅ Title search index ready (pg_trgm, movies_title_trgm_idx).")
+        return
+
+    try:
+        with connect_read() as conn:
+            with conn.cursor() as cur:
+                results = search_titles(cur, query)
+    except psycopg.Error as e:
+        print("❌ Title search failed.")
+        print("Error:", e)
+        return
+
+    if not results:
+        print(f"❌ No titles match '{query}'.")
+        return
+    for movie_id, title, year, kind, score in results:
+        print(f"  {title} ({year})  [{kind}, {score:.2f}]  ID {movie_id}")
+
+if __name__ == "__main__":
+    main(" ".join(sys.argv[1:]) or None)
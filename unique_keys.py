@@ -0,0 +1,116 @@
+import psycopg
+from psycopg import sql
+from db_connections import connect_write
+
+# Unique keys that make concurrent ingestion safe. Every write path inserts
+# with INSERT ... ON CONFLICT on one of these keys, so two workers adding
+# the same star (or movie, or appearance) at the same moment end up with one
+# row: the second insert waits for the first to commit, then takes the
+# conflict branch and returns the existing id.
+#
+#   movies       (title, release_year)   NULL years compare equal on
+#                                        PostgreSQL 15+ (NULLS NOT DISTINCT)
+#   stars        (actor_name)
+#   appearances  (movie_id, star_id)
+#
+# Indexes are built CONCURRENTLY (no write lock) except on partitioned
+# tables, where PostgreSQL does not support it. Existing duplicates stop the
+# build; merge them first (python movies.py dedupe-stars --apply for stars).
+
+KEYS = (
+    ("movies", ("title", "release_year"), "movies_title_year_key"),
+    ("stars", ("actor_name",), "stars_actor_name_key"),
+    ("appearances", ("movie_id", "star_id"), "appearances_movie_star_key"),
+)
+
+
+def has_unique_key(cur, table, columns):
+    # True if a usable unique index on exactly these columns (in any order)
+    # exists; a failed CONCURRENTLY build leaves an invalid one behind, which
+    # ON CONFLICT ignores
+    cur.execute("""
+        SELECT EXISTS (
+            SELECT 1
+            FROM pg_index i
+            WHERE i.indrelid = to_regclass(%s)
+              AND i.indisunique AND i.indisvalid AND i.indisready
+              AND i.indpred IS NULL AND i.indexprs IS NULL
+              AND (
+                  SELECT array_agg(a.attname::text ORDER BY a.attname)
+                  FROM pg_attribute a
+                  WHERE a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+              ) = (SELECT array_agg(c ORDER BY c) FROM unnest(%s::text[]) AS c)
+        );
+    """, (table, list(columns)))
+    return cur.fetchone()[0]
+
+def find_duplicates(cur, table, columns, limit=5):
+    key = sql.SQL(", ").join(map(sql.Identifier, columns))
+    cur.execute(sql.SQL("""
+        SELECT {key}, COUNT(*) FROM {table}
+        GROUP BY {key}
+        HAVING COUNT(*) > 1
+        ORDER BY COUNT(*) DESC
+        LIMIT {limit};
+    """).format(key=key, table=sql.Identifier(table), limit=sql.Literal(limit)))
+    return cur.fetchall()
+
+def create_unique_key(conn, table, columns, name):
+    # conn must be in autocommit mode (CREATE INDEX CONCURRENTLY)
+    with conn.cursor() as cur:
+        cur.execute("SELECT relkind = 'p', current_setting('server_version_num')::int >= 150000 "
+                    "FROM pg_class WHERE oid = to_regclass(%s);", (table,))
+        partitioned, nulls_not_distinct = cur.fetchone()
+
+        cur.execute(sql.SQL("DROP INDEX IF EXISTS {};").format(sql.Identifier(name)))  # left invalid by a failed build
+        cur.execute(sql.SQL("CREATE UNIQUE INDEX {concurrently} {name} ON {table} ({columns}){nulls};").format(
+            concurrently=sql.SQL("" if partitioned else "CONCURRENTLY"),
+            name=sql.Identifier(name),
+            table=sql.Identifier(table),
+            columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+            nulls=sql.SQL(" NULLS NOT DISTINCT" if nulls_not_distinct else ""),
+        ))
+
+def ensure_unique_keys(conn):
+    # [(table, columns, status)] with status "present", "created" or the
+    # duplicates that prevent the key
+    results = []
+    for table, columns, name in KEYS:
+        with conn.cursor() as cur:
+            if has_unique_key(cur, table, columns):
+                results.append((table, columns, "present"))
+                continue
+            duplicates = find_duplicates(cur, table, columns)
+        if duplicates:
+            results.append((table, columns, duplicates))
+            continue
+        create_unique_key(conn, table, columns, name)
+        results.append((table, columns, "created"))
+    return results
+
+def main():
+    try:
+        with connect_write(autocommit=True) as conn:
+            results = ensure_unique_keys(conn)
+    except psycopg.Error as e:
+        print("❌ Failed to create unique keys.")
+        print("Error:", e)
+        return
+
+    blocked = False
+    for table, columns, status in results:
+        key = f"{table}({', '.join(columns)})"
+        if status == "present":
+            print(f"✅ {key} already unique")
+        elif status == "created":
+            print(f"🔑 {key} unique key created")
+        else:
+            blocked = True
+            print(f"⚠️ {key} has duplicates; merge them first:")
+            for row in status:
+                print(f"    {row[:-1]} × {row[-1]}")
+    if blocked:
+        print("\nConcurrent ingestion is only race-free once every key is in place.")
+
+if __name__ == "__main__":
+    main()
@@ -41,31 +41,33 @@ def add_bulk_appearances(data):
                         continue
                     movie_id = movie[0]
 
+                    # Known stars, then every missing link in one insert; the
+                    # unique (movie_id, star_id) key makes re-runs and
+                    # concurrent runs safe (see unique_keys.py)
+                    cur.execute(
+                        "SELECT actor_name, id FROM stars WHERE actor_name = ANY(%s)",
+                        (actor_list,)
+                    )
+                    star_ids = dict(cur.fetchall())
                     for actor in actor_list:
-                        # Get star ID
-                        cur.execute(
-                            "SELECT id FROM stars WHERE actor_name = %s",
-                            (actor,)
-                        )
-                        star = cur.fetchone()
-                        if not star:
+                        if actor not in star_ids:
                             print(f"⚠️ Star not found: {actor}")
-                            continue
-                        star_id = star[0]
 
-                        # Check and insert into appearances
-                        cur.execute(
-                            "SELECT id FROM appearances WHERE movie_id = %s AND star_id = %s",
-                            (movie_id, star_id)
-                        )
-                        if cur.fetchone():
+                    cur.execute("""
+                        INSERT INTO appearances (movie_id, star_id)
+                        SELECT %s, star_id FROM unnest(%s::int[]) AS s(star_id) ORDER BY star_id
+                        ON CONFLICT (movie_id, star_id) DO NOTHING
+                        RETURNING star_id, id
+                    """, (movie_id, sorted(set(star_ids.values()))))
+                    linked = dict(cur.fetchall())
+
+                    for actor in actor_list:
+                        if actor not in star_ids:
+                            continue
+                        new_id = linked.get(star_ids[actor])
+                        if new_id is None:
                             print(f"🔁 Appearance already exists: {actor} in '{title}'")
                         else:
-                            cur.execute(
-                                "INSERT INTO appearances (movie_id, star_id) VALUES (%s, %s) RETURNING id",
-                                (movie_id, star_id)
-                            )
-                            new_id = cur.fetchone()[0]
                             print(f"✅ Linked {actor} to '{title}' (ID: {new_id})")
 
             conn.commit()
@@ -79,4 +81,5 @@ def add_bulk_appearances(data):
             conn.close()
 
 # Run it
-add_bulk_appearances(existing_appearances)
+if __name__ == "__main__":
+    add_bulk_appearances(existing_appearances)